@@ -0,0 +1,105 @@
+import re
+from PyQt6.QtCore import QThread, pyqtSignal
+from tag_stats import split_tags
+
+# 批量编辑操作
+OP_REGEX_REPLACE = 'regex_replace'  # 正则查找替换
+OP_PREPEND_TAG = 'prepend_tag'      # 在开头添加标签（已存在时移到开头）
+OP_APPEND_TAG = 'append_tag'        # 在末尾添加标签（已存在时不重复添加）
+OP_REMOVE_TAG = 'remove_tag'        # 删除标签
+OP_DEDUPE_TAGS = 'dedupe_tags'      # 删除重复标签，保留第一次出现的位置
+OP_TRUNCATE = 'truncate'            # 按标签边界截断到最大长度
+
+def join_tags(tags):
+    return ", ".join(tags)
+
+def truncate_caption(text, max_length):
+    """在标签边界截断打标，使长度不超过 max_length；第一个标签本身过长时直接截断"""
+    if len(text) <= max_length:
+        return text
+    result = []
+    length = 0
+    for tag in split_tags(text):
+        added = len(tag) if not result else len(tag) + 2
+        if length + added > max_length:
+            break
+        result.append(tag)
+        length += added
+    if not result:
+        return text[:max_length].rstrip()
+    return join_tags(result)
+
+def build_transform(spec):
+    """
+    根据操作配置创建打标转换函数 text -> text
+    spec 示例: {'op': 'regex_replace', 'pattern': 'girl', 'replacement': 'woman', 'ignore_case': True}
+    正则表达式无效时抛出 re.error
+    """
+    op = spec['op']
+    if op == OP_REGEX_REPLACE:
+        flags = re.IGNORECASE if spec.get('ignore_case') else 0
+        pattern = re.compile(spec['pattern'], flags)
+        replacement = spec.get('replacement', '')
+        return lambda text: pattern.sub(replacement, text)
+
+    if op == OP_PREPEND_TAG:
+        tag = spec['tag'].strip()
+        return lambda text: join_tags([tag] + [t for t in split_tags(text) if t != tag])
+
+    if op == OP_APPEND_TAG:
+        tag = spec['tag'].strip()
+        def append_tag(text):
+            tags = split_tags(text)
+            return text if tag in tags else join_tags(tags + [tag])
+        return append_tag
+
+    if op == OP_REMOVE_TAG:
+        tag = spec['tag'].strip()
+        def remove_tag(text):
+            tags = split_tags(text)
+            return join_tags([t for t in tags if t != tag]) if tag in tags else text
+        return remove_tag
+
+    if op == OP_DEDUPE_TAGS:
+        def dedupe_tags(text):
+            tags = split_tags(text)
+            unique = list(dict.fromkeys(tags))
+            return join_tags(unique) if len(unique) != len(tags) else text
+        return dedupe_tags
+
+    if op == OP_TRUNCATE:
+        max_length = int(spec['max_length'])
+        return lambda text: truncate_caption(text, max_length)
+
+    raise ValueError(f"未知的批量编辑操作: {op}")
+
+def apply_transform(transform, rows, texts):
+    """对一组打标执行转换，返回发生变化的 [(行号, 原文本, 新文本), ...]，空打标跳过"""
+    new_texts = [transform(text) if text else text for text in texts]
+    return [
+        (row, old, new)
+        for row, old, new in zip(rows, texts, new_texts)
+        if new != old
+    ]
+
+class BulkEditThread(QThread):
+    """在后台线程中对打标快照执行批量转换，结果由主线程一次性写入表格"""
+
+    # 转换完成：[(行号, 原文本, 新文本), ...]
+    edit_ready = pyqtSignal(list)
+    # 转换失败：错误信息
+    edit_failed = pyqtSignal(str)
+
+    def __init__(self, transform, rows, texts, parent=None):
+        super().__init__(parent)
+        self.transform = transform
+        self.rows = rows
+        self.texts = texts
+
+    def run(self):
+        try:
+            changes = apply_transform(self.transform, self.rows, self.texts)
+        except Exception as e:
+            self.edit_failed.emit(str(e))
+            return
+        self.edit_ready.emit(changes)
@@ -0,0 +1,98 @@
+import re
+
+# 英文按单词分词，中文按相邻两字（bigram）分词
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+CJK_PATTERN = re.compile(r"[\u3400-\u9fff]+")
+
+def tokenize(text):
+    """返回文本的索引词集合：英文小写单词、中文 bigram（单字的中文词直接作为一个词）"""
+    text = text.lower()
+    tokens = set(WORD_PATTERN.findall(text))
+    for run in CJK_PATTERN.findall(text):
+        if len(run) == 1:
+            tokens.add(run)
+        else:
+            tokens.update(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+class CaptionIndex:
+    """
+    英文打标和中文翻译的倒排索引（词 -> 行号集合）。
+    每次编辑、打标、翻译或读取标签文件时只更新该行前后文本的差异词，
+    查询时先用索引缩小候选行，再在候选行中确认是否包含查询文本。
+    """
+
+    def __init__(self, text_fn):
+        self.text_fn = text_fn  # 行号 -> 该行的全部标签文本
+        self.postings = {}  # 词 -> 行号集合
+
+    def clear(self):
+        self.postings = {}
+
+    def update(self, row, old_text, new_text):
+        """行文本从 old_text 变为 new_text 时更新索引"""
+        old_tokens = tokenize(old_text) if old_text else set()
+        new_tokens = tokenize(new_text) if new_text else set()
+        for token in old_tokens - new_tokens:
+            rows = self.postings.get(token)
+            if rows is not None:
+                rows.discard(row)
+                if not rows:
+                    del self.postings[token]
+        for token in new_tokens - old_tokens:
+            self.postings.setdefault(token, set()).add(row)
+
+    def rows_with_token(self, token):
+        """包含该词的行；英文词按前缀匹配，便于边输入边筛选"""
+        if CJK_PATTERN.match(token):
+            return self.postings.get(token, set())
+        rows = set()
+        for key, key_rows in self.postings.items():
+            if key.startswith(token):
+                rows |= key_rows
+        return rows
+
+    def rows_with_term(self, term, row_count):
+        """包含查询文本的行（不区分大小写）"""
+        term = term.lower()
+        candidates = None
+        for token in tokenize(term):
+            # 单个中文字可能位于更长的词中，没有对应的 bigram，只能逐行确认
+            if len(token) == 1 and CJK_PATTERN.match(token):
+                continue
+            rows = self.rows_with_token(token)
+            candidates = rows if candidates is None else candidates & rows
+            if not candidates:
+                return set()
+        if candidates is None:
+            candidates = range(row_count)
+        return {row for row in candidates if term in self.text_fn(row).lower()}
+
+    def search(self, query, row_count):
+        """
+        按空格分隔的多个关键词查询，返回同时包含所有关键词的行号集合。
+        以 - 开头的关键词表示不包含（如 -触发词 用于查找缺少触发词的行），
+        查询为空时返回None。
+        """
+        include = []
+        exclude = []
+        for term in query.split():
+            if term.startswith('-') and len(term) > 1:
+                exclude.append(term[1:])
+            elif term != '-':
+                include.append(term)
+        if not include and not exclude:
+            return None
+
+        if include:
+            result = None
+            for term in include:
+                rows = self.rows_with_term(term, row_count)
+                result = rows if result is None else result & rows
+                if not result:
+                    return set()
+        else:
+            result = set(range(row_count))
+        for term in exclude:
+            result -= self.rows_with_term(term, row_count)
+        return result
@@ -0,0 +1,286 @@
+import os
+import sys
+import time
+import queue
+import argparse
+import threading
+import config
+from label_io import collect_images, write_sidecar
+from metrics import RunMetrics, format_duration, format_snapshot
+from profiling import start_profiling, stop_profiling
+
+# 命令行不导入PyQt，可以在没有图形界面的服务器和定时任务中运行
+
+BACKENDS = ('florence2', 'gemini', 'zhipu')
+# 各后端默认的并发数和每个工作线程两次请求之间的最小间隔（秒），与图形界面的任务调度器一致
+DEFAULT_WORKERS = {
+    'florence2': 1,
+    'gemini': 2,
+    'zhipu': 2,
+}
+DEFAULT_INTERVALS = {
+    'gemini': 1.0,
+    'zhipu': 1.0,
+}
+# 各后端模型配置在配置文件中的位置
+MODEL_CONFIG_KEYS = {
+    'florence2': 'florence2_config',
+    'gemini': 'gemini_config',
+    'zhipu': 'zhipu_label_config',
+}
+
+def find_directory_key(cfg, directory):
+    """
+    在配置的目录列表中查找 directory（忽略路径写法差异），返回配置中的原始路径，
+    用于读取目录提示词；目录未添加到配置中时返回 directory 本身
+    """
+    target = os.path.normcase(os.path.abspath(directory))
+    for path in cfg.get_directory_prompts():
+        if os.path.normcase(os.path.abspath(path)) == target:
+            return path
+    return directory
+
+def make_config_snapshot(backend, directory_key, model=None, prompt=None):
+    """获取配置快照，按命令行参数覆盖模型和目录提示词（只影响本次运行，不写入配置文件）"""
+    cfg = config.snapshot()
+    if model:
+        key = MODEL_CONFIG_KEYS[backend]
+        section = getattr(cfg, f"get_{key}")()
+        cfg.data[key] = {**section, 'model': model}
+    if prompt:
+        cfg.directory_prompts[directory_key] = prompt
+    return cfg
+
+def format_caption(result, trigger_word=""):
+    """打标结果转换为标签文本，有触发词时加在开头（与图形界面一致）"""
+    description = str(result.get('description', '')).strip()
+    if trigger_word:
+        description = f"{trigger_word}, {description}"
+    return description
+
+def label_files(labeler, labeler_type, image_paths, directory_key, cfg, workers=1, interval=0.0,
+                trigger_word="", progress=True, stop_event=None):
+    """
+    用 workers 个线程对 image_paths 打标并原子地写入标签文件，返回 (成功数, 失败数, 每张图片的结果)。
+    每张图片的结果为 {图片路径: 错误信息，成功时为None}，只包含实际处理过的图片；
+    progress 为 True 时每完成一张图片输出一行进度；stop_event 被设置后不再领取新的图片。
+    """
+    from image_labeler import is_failed_result
+
+    total = len(image_paths)
+    if total == 0:
+        return 0, 0, {}
+    stop_event = stop_event or threading.Event()
+    metrics = RunMetrics.create(total, labeler_type.value)
+    pending = iter(image_paths)
+    pending_lock = threading.Lock()
+    results = queue.Queue()
+
+    def worker():
+        while not stop_event.is_set():
+            with pending_lock:
+                image_path = next(pending, None)
+            if image_path is None:
+                break
+            timings = {}
+            start = time.perf_counter()
+            error = None
+            try:
+                result = labeler.label_image(image_path, directory_key, cfg, labeler_type, timings)
+                if is_failed_result(result):
+                    error = result.get('description') if isinstance(result, dict) else "返回结果格式不正确"
+                else:
+                    write_sidecar(image_path, format_caption(result, trigger_word))
+            except Exception as e:
+                error = str(e)
+            metrics.record(image_path, time.perf_counter() - start, timings, error is None)
+            results.put((image_path, error))
+            # 批量调用在线API时控制请求频率
+            if interval:
+                stop_event.wait(interval)
+        results.put(None)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, min(workers, total)))]
+    for thread in threads:
+        thread.start()
+
+    succeeded = failed = 0
+    outcomes = {}
+    running = len(threads)
+    try:
+        while running:
+            try:
+                item = results.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is None:
+                running -= 1
+                continue
+            image_path, error = item
+            outcomes[image_path] = error
+            if error is None:
+                succeeded += 1
+            else:
+                failed += 1
+                print(f"打标失败: {image_path}: {error}", file=sys.stderr)
+            if progress:
+                done = succeeded + failed
+                print(f"[{done}/{total}] {image_path}  {format_snapshot(metrics.snapshot())}", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("正在停止，等待进行中的图片完成...", file=sys.stderr)
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+        raise
+    finally:
+        summary = metrics.close('cancelled' if stop_event.is_set() else 'finished')
+    if progress and summary['elapsed'] > 0:
+        print(
+            f"耗时 {format_duration(summary['elapsed'])}，平均 {summary['done'] / summary['elapsed']:.2f} 张/秒",
+            file=sys.stderr
+        )
+    return succeeded, failed, outcomes
+
+def run_label(args):
+    """label 子命令：对目录中的图片打标"""
+    # 打标服务依赖较重（torch、transformers），在需要时才导入，--help 等命令不受影响
+    from image_labeler import ImageLabeler, LabelerType
+
+    directory = args.directory
+    if not os.path.isdir(directory):
+        print(f"目录不存在: {directory}", file=sys.stderr)
+        return 2
+    directory_key = find_directory_key(config.snapshot(), directory)
+    cfg = make_config_snapshot(args.backend, directory_key, args.model, args.prompt)
+    images, skipped = collect_images(directory, args.recursive, args.skip_existing)
+    if not args.quiet:
+        print(f"共 {len(images)} 张图片需要打标，跳过已有标签的 {skipped} 张", file=sys.stderr)
+    if not images:
+        return 0
+
+    labeler = ImageLabeler()
+    labeler_type = LabelerType(args.backend)
+    workers = args.workers or DEFAULT_WORKERS[args.backend]
+    interval = DEFAULT_INTERVALS.get(args.backend, 0.0) if args.interval is None else args.interval
+    try:
+        succeeded, failed, _ = label_files(
+            labeler, labeler_type, images, directory_key, cfg, workers, interval,
+            args.trigger_word.strip(), not args.quiet
+        )
+    except KeyboardInterrupt:
+        return 130
+    print(f"成功标注了 {succeeded} 张图像，失败 {failed} 张")
+    return 1 if failed else 0
+
+def run_watch(args):
+    """watch 子命令：监视配置中登记的目录，为新图片打标"""
+    import signal
+    from image_labeler import ImageLabeler
+    from watcher import WatchDaemon
+
+    recursive = args.recursive
+    if recursive is None:
+        recursive = config.get_ui_config().get('scan_recursive', False)
+    daemon = WatchDaemon(
+        ImageLabeler(), args.backend, recursive, args.debounce, args.workers, args.interval,
+        args.state_file, args.poll, args.poll_interval, args.quiet
+    )
+    # 收到 SIGTERM 时处理完进行中的图片后退出
+    signal.signal(signal.SIGTERM, lambda signum, frame: daemon.stop())
+    try:
+        daemon.run(args.once)
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+def run_serve(args):
+    """serve 子命令：启动本地HTTP打标服务"""
+    import signal
+    from image_labeler import ImageLabeler
+    from server import LabelService, serve
+
+    labeler = ImageLabeler()
+    if args.backend == 'florence2' and args.preload:
+        labeler.preload_florence2_model(config.snapshot())
+    service = LabelService(labeler, args.backend, args.max_batch, args.max_wait_ms, args.max_queue)
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    # 收到 SIGTERM 时与 Ctrl+C 一样关闭服务
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        serve(service, args.host, args.port, args.verbose)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='image-label-assistant',
+        description="图像打标助手命令行：不启动图形界面，直接对目录中的图片打标并写入同名 .txt 标签文件",
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    label_parser = subparsers.add_parser('label', help="对目录中的图片批量打标")
+    label_parser.add_argument('directory', help="图片目录")
+    label_parser.add_argument('--backend', choices=BACKENDS, default='florence2', help="打标服务（默认 florence2）")
+    label_parser.add_argument('--model', help="覆盖配置文件中该打标服务的模型名称")
+    label_parser.add_argument('--prompt', help="覆盖目录提示词（默认使用配置中该目录的提示词，Florence2 使用其任务提示词）")
+    label_parser.add_argument('--workers', type=int, help="并发数（默认 Florence2 为1，在线API为2）")
+    label_parser.add_argument('--interval', type=float, help="每个工作线程两次请求之间的最小间隔秒数（默认在线API为1秒）")
+    label_parser.add_argument('--trigger-word', default="", help="写入标签时加在开头的触发词")
+    label_parser.add_argument(
+        '--skip-existing', action=argparse.BooleanOptionalAction, default=True,
+        help="跳过已有非空标签文件的图片（默认开启，--no-skip-existing 重新打标并覆盖）"
+    )
+    label_parser.add_argument('-r', '--recursive', action='store_true', help="包含子目录中的图片")
+    label_parser.add_argument('-q', '--quiet', action='store_true', help="不输出逐张进度")
+    label_parser.set_defaults(func=run_label)
+
+    watch_parser = subparsers.add_parser('watch', help="监视登记的目录，自动为新图片打标")
+    watch_parser.add_argument(
+        '--backend', choices=BACKENDS, default='florence2',
+        help="目录没有配置 backend 时使用的打标服务（默认 florence2）"
+    )
+    watch_parser.add_argument('--workers', type=int, help="并发数（默认 Florence2 为1，在线API为2）")
+    watch_parser.add_argument('--interval', type=float, help="每个工作线程两次请求之间的最小间隔秒数（默认在线API为1秒）")
+    watch_parser.add_argument('--debounce', type=float, default=2.0, help="新图片多少秒内没有再写入才开始打标（默认2秒）")
+    watch_parser.add_argument(
+        '-r', '--recursive', action=argparse.BooleanOptionalAction, default=None,
+        help="是否监视子目录（默认与界面的“包含子目录”设置一致）"
+    )
+    watch_parser.add_argument('--poll', action='store_true', help="强制使用轮询监视（网络文件系统等 inotify 收不到事件时使用）")
+    watch_parser.add_argument('--poll-interval', type=float, default=5.0, help="轮询间隔秒数（默认5秒）")
+    watch_parser.add_argument('--state-file', default=None, help="监视状态文件路径（默认 runs/watch_state.json）")
+    watch_parser.add_argument('--once', action='store_true', help="只处理启动时发现的未打标图片，然后退出（适合定时任务）")
+    watch_parser.add_argument('-q', '--quiet', action='store_true', help="不输出逐张进度")
+    watch_parser.set_defaults(func=run_watch)
+
+    # 服务参数的默认值与 server 模块一致（此处不导入 server，避免 --help 时加载多余模块）
+    serve_parser = subparsers.add_parser('serve', help="启动本地HTTP打标服务，模型只加载一次，并发请求合并为批量推理")
+    serve_parser.add_argument('--host', default='127.0.0.1', help="监听地址（默认 127.0.0.1，只允许本机访问）")
+    serve_parser.add_argument('--port', type=int, default=8765, help="监听端口（默认 8765）")
+    serve_parser.add_argument('--backend', choices=BACKENDS, default='florence2', help="请求未指定 backend 时使用的打标服务")
+    serve_parser.add_argument('--max-batch', type=int, default=8, help="Florence2 一次推理最多合并的图片数（默认8）")
+    serve_parser.add_argument('--max-wait-ms', type=float, default=20, help="第一个请求到达后最多等待多少毫秒凑批（默认20）")
+    serve_parser.add_argument('--max-queue', type=int, default=256, help="每个打标服务最多排队的请求数，超出返回503（默认256）")
+    serve_parser.add_argument(
+        '--preload', action=argparse.BooleanOptionalAction, default=True,
+        help="启动时加载 Florence2 模型（默认开启）"
+    )
+    serve_parser.add_argument('-v', '--verbose', action='store_true', help="输出每个HTTP请求的日志")
+    serve_parser.set_defaults(func=run_serve)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # 设置环境变量 IMAGE_LABEL_PROFILE=spans/cprofile/torch 开启性能分析
+    start_profiling()
+    try:
+        return args.func(args)
+    finally:
+        stop_profiling()
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,10 @@
 import os
 import json
+import copy
+import atexit
+import tempfile
+import threading
+from label_io import copy_file_mode
 
 # 定义保存配置的JSON文件路径
 DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data.json')
@@ -61,6 +66,35 @@ DEFAULT_FLORENCE2_CONFIG = {
     'top_p': 0.9,
 }
 
+# 翻译服务默认配置
+DEFAULT_TRANSLATE_CONFIG = {
+    'provider': 'bing',  # 'bing'（在线）、'local'（本地离线模型）或 'zhipu'（智谱语言模型）
+    'local_model': 'Helsinki-NLP/opus-mt-en-zh',
+    'batch_size': 16,    # 本地模型每批翻译的句子数
+    'max_length': 512,   # 本地模型单句最大token数
+    'llm_batch_size': 20,           # 智谱语言模型每次请求翻译的条数
+    'llm_concurrency': 4,           # 智谱语言模型并发请求数
+    'llm_requests_per_minute': 60,  # 智谱语言模型每分钟最大请求数
+}
+
+# 界面相关默认配置
+DEFAULT_UI_CONFIG = {
+    'scan_recursive': False,  # 加载目录时是否包含子目录（如 kohya 风格的 10_concept 目录）
+    'thumbnail_disk_cache_mb': 512,  # 缩略图磁盘缓存容量上限（MB）
+    'thumbnail_memory_cache_mb': 256,  # 缩略图内存缓存容量上限（MB）
+    'thumbnail_prefetch_rows': 10,  # 预加载可见区域上下各多少行的缩略图
+    'autosave': False,  # 英文打标修改后是否自动保存
+    'autosave_delay_ms': 2000,  # 最后一次修改后等待多久（毫秒）自动保存
+}
+
+# 可用翻译服务
+TRANSLATE_PROVIDERS = ['bing', 'local', 'zhipu']
+
+# 可用本地翻译模型列表（英译中seq2seq模型）
+LOCAL_TRANSLATE_MODELS = [
+    'Helsinki-NLP/opus-mt-en-zh',
+]
+
 # 可用Florence2 prompt选项
 FLORENCE2_PROMPT_OPTIONS = [
     '<CAPTION>',
@@ -91,35 +125,166 @@ FLORENCE2_MODELS = [
     'microsoft/Florence-2-base',
 ]
 
+class ConfigStore:
+    """
+    进程内共享的配置存储。
+    缓存解析后的配置快照，仅在配置文件修改时间变化时重新读取；
+    写入先更新内存快照，再延迟合并写入磁盘，写盘时先写临时文件再原子替换。
+    """
+
+    def __init__(self, path, flush_delay=0.2):
+        self.path = path
+        self.flush_delay = flush_delay  # 合并写入的延迟时间（秒）
+        self.lock = threading.RLock()
+        self.data = None
+        self.mtime = None
+        self.dirty = False
+        self.flush_timer = None
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _default_data(self):
+        return copy.deepcopy({
+            'directories': [],
+            'gemini_config': DEFAULT_GEMINI_CONFIG,
+            'zhipu_llm_config': DEFAULT_ZHIPU_LLM_CONFIG,
+            'zhipu_label_config': DEFAULT_ZHIPU_LABEL_CONFIG,
+            'florence2_config': DEFAULT_FLORENCE2_CONFIG,
+            'translate_config': DEFAULT_TRANSLATE_CONFIG,
+            'ui_config': DEFAULT_UI_CONFIG
+        })
+
+    def load(self):
+        """返回内部配置快照（调用方不可修改），文件被外部修改时重新读取"""
+        with self.lock:
+            # 有未写盘的修改时以内存为准
+            if self.dirty:
+                return self.data
+            mtime = self._file_mtime()
+            if self.data is None or mtime != self.mtime:
+                if mtime is None:
+                    self.data = self._default_data()
+                else:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self.data = json.load(f)
+                self.mtime = mtime
+            return self.data
+
+    def get(self, key=None, default=None):
+        """获取配置副本，指定key时只复制对应的配置段"""
+        with self.lock:
+            data = self.load()
+            if key is None:
+                return copy.deepcopy(data)
+            return copy.deepcopy(data.get(key, default))
+
+    def save(self, config_data):
+        """更新配置快照，并安排合并写盘"""
+        with self.lock:
+            self.data = copy.deepcopy(config_data)
+            self.dirty = True
+            if self.flush_timer is None:
+                self.flush_timer = threading.Timer(self.flush_delay, self.flush)
+                self.flush_timer.daemon = True
+                self.flush_timer.start()
+        return True
+
+    def flush(self):
+        """立即将未写盘的修改原子写入配置文件"""
+        with self.lock:
+            if self.flush_timer is not None:
+                self.flush_timer.cancel()
+                self.flush_timer = None
+            if not self.dirty:
+                return True
+            try:
+                directory = os.path.dirname(self.path)
+                fd, temp_path = tempfile.mkstemp(prefix='.data.', suffix='.tmp', dir=directory)
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        json.dump(self.data, f, ensure_ascii=False, indent=4)
+                        f.flush()
+                        os.fsync(f.fileno())
+                    copy_file_mode(temp_path, self.path)
+                    os.replace(temp_path, self.path)
+                except Exception:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+                self.mtime = self._file_mtime()
+                self.dirty = False
+                return True
+            except Exception as e:
+                print(f"保存配置文件时出错: {e}")
+                return False
+
+    def snapshot(self):
+        """获取冻结的配置快照，供批量任务在整个运行期间使用"""
+        return ConfigSnapshot(self.get())
+
+class ConfigSnapshot:
+    """
+    某一时刻的只读配置快照，提供与模块级 get_* 函数同名的方法，
+    批量打标线程持有快照后，运行期间不再访问配置文件。
+    """
+
+    def __init__(self, config_data):
+        self.data = config_data
+        self.directories = _normalize_directories(config_data.get('directories', []))
+        self.directory_prompts = {d['path']: d.get('prompt', DEFAULT_PROMPT) for d in self.directories}
+
+    def get_gemini_config(self):
+        return self.data.get('gemini_config', DEFAULT_GEMINI_CONFIG)
+
+    def get_zhipu_llm_config(self):
+        return self.data.get('zhipu_llm_config', DEFAULT_ZHIPU_LLM_CONFIG)
+
+    def get_zhipu_label_config(self):
+        return self.data.get('zhipu_label_config', DEFAULT_ZHIPU_LABEL_CONFIG)
+
+    def get_florence2_config(self):
+        return self.data.get('florence2_config', DEFAULT_FLORENCE2_CONFIG)
+
+    def get_translate_config(self):
+        return self.data.get('translate_config', DEFAULT_TRANSLATE_CONFIG)
+
+    def get_ui_config(self):
+        return self.data.get('ui_config', DEFAULT_UI_CONFIG)
+
+    def get_directories(self):
+        return self.directories
+
+    def get_directory_prompts(self):
+        return self.directory_prompts
+
+# 进程内唯一的配置存储实例
+_store = ConfigStore(DATA_FILE)
+# 进程退出前写入尚未写盘的修改
+atexit.register(_store.flush)
+
 def load_config():
-    """加载配置文件"""
-    if os.path.exists(DATA_FILE):
-        with open(DATA_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    return {
-        'directories': [],
-        'gemini_config': DEFAULT_GEMINI_CONFIG,
-        'zhipu_llm_config': DEFAULT_ZHIPU_LLM_CONFIG,
-        'zhipu_label_config': DEFAULT_ZHIPU_LABEL_CONFIG,
-        'florence2_config': DEFAULT_FLORENCE2_CONFIG
-    }
+    """加载配置（返回副本，修改后需调用save_config保存）"""
+    return _store.get()
 
 def save_config(config_data):
-    """保存配置到文件"""
-    try:
-        with open(DATA_FILE, 'w', encoding='utf-8') as f:
-            json.dump(config_data, f, ensure_ascii=False, indent=4)
-        return True
-    except Exception as e:
-        print(f"保存配置文件时出错: {e}")
-        return False
+    """保存配置，短时间内的多次保存会合并为一次原子写入"""
+    return _store.save(config_data)
+
+def flush_config():
+    """立即写入尚未写盘的配置修改"""
+    return _store.flush()
+
+def snapshot():
+    """获取当前配置的冻结快照"""
+    return _store.snapshot()
 
 def get_gemini_config():
     """获取Gemini配置"""
-    config = load_config()
-    if 'gemini_config' in config:
-        return config['gemini_config']
-    return DEFAULT_GEMINI_CONFIG
+    return _store.get('gemini_config', DEFAULT_GEMINI_CONFIG)
 
 def save_gemini_config(gemini_config):
     """保存Gemini配置"""
@@ -129,10 +294,7 @@ def save_gemini_config(gemini_config):
 
 def get_zhipu_llm_config():
     """获取智谱AI语言模型配置"""
-    config = load_config()
-    if 'zhipu_llm_config' in config:
-        return config['zhipu_llm_config']
-    return DEFAULT_ZHIPU_LLM_CONFIG
+    return _store.get('zhipu_llm_config', DEFAULT_ZHIPU_LLM_CONFIG)
 
 def save_zhipu_llm_config(config_data):
     """保存智谱AI语言模型配置"""
@@ -142,10 +304,7 @@ def save_zhipu_llm_config(config_data):
 
 def get_zhipu_label_config():
     """获取智谱AI打标配置"""
-    config = load_config()
-    if 'zhipu_label_config' in config:
-        return config['zhipu_label_config']
-    return DEFAULT_ZHIPU_LABEL_CONFIG
+    return _store.get('zhipu_label_config', DEFAULT_ZHIPU_LABEL_CONFIG)
 
 def save_zhipu_label_config(config_data):
     """保存智谱AI打标配置"""
@@ -155,10 +314,7 @@ def save_zhipu_label_config(config_data):
 
 def get_florence2_config():
     """获取Florence2配置"""
-    config_data = load_config()
-    if 'florence2_config' in config_data:
-        return config_data['florence2_config']
-    return DEFAULT_FLORENCE2_CONFIG
+    return _store.get('florence2_config', DEFAULT_FLORENCE2_CONFIG)
 
 def save_florence2_config(florence2_config):
     """保存Florence2配置"""
@@ -166,6 +322,26 @@ def save_florence2_config(florence2_config):
     config_data['florence2_config'] = florence2_config
     return save_config(config_data)
 
+def get_translate_config():
+    """获取翻译服务配置"""
+    return _store.get('translate_config', DEFAULT_TRANSLATE_CONFIG)
+
+def save_translate_config(translate_config):
+    """保存翻译服务配置"""
+    config_data = load_config()
+    config_data['translate_config'] = translate_config
+    return save_config(config_data)
+
+def get_ui_config():
+    """获取界面配置"""
+    return _store.get('ui_config', DEFAULT_UI_CONFIG)
+
+def save_ui_config(ui_config):
+    """保存界面配置"""
+    config_data = load_config()
+    config_data['ui_config'] = ui_config
+    return save_config(config_data)
+
 def update_directories(directories):
     """
     更新目录列表（支持带 prompt 字段）
@@ -185,22 +361,23 @@ def update_directories(directories):
     config['directories'] = dirs
     return save_config(config)
 
+def _normalize_directories(dirs):
+    """兼容老格式（字符串列表）和无 prompt 字段的目录项"""
+    result = []
+    for d in dirs:
+        if isinstance(d, str):
+            d = {"path": d, "prompt": DEFAULT_PROMPT}
+        elif 'prompt' not in d:
+            d = dict(d, prompt=DEFAULT_PROMPT)
+        result.append(d)
+    return result
+
 def get_directories():
     """
     获取目录列表，返回 [{"path":..., "prompt":...}]，兼容老格式
+    读取时只在内存中转换老格式，下次保存目录时写回新格式
     """
-    config = load_config()
-    dirs = config.get('directories', [])
-    # 兼容老格式（字符串列表）
-    if dirs and isinstance(dirs[0], str):
-        dirs = [{"path": d, "prompt": DEFAULT_PROMPT} for d in dirs]
-        config['directories'] = dirs
-        save_config(config)
-    # 兼容无 prompt 字段
-    for d in dirs:
-        if 'prompt' not in d:
-            d['prompt'] = DEFAULT_PROMPT
-    return dirs
+    return _normalize_directories(_store.get('directories', []))
 
 def get_directory_prompts():
     """
@@ -0,0 +1,202 @@
+import time
+from PyQt6.QtCore import QObject, QThread, pyqtSignal
+from label_io import collect_images, write_sidecar
+from job_scheduler import JOB_CANCELLED
+from metrics import RunMetrics
+
+# 全部目录打标任务的类型（与当前目录的 'label' 任务区分：结果直接写入标签文件，不按行号写回表格）
+DATASET_JOB_KIND = 'dataset_label'
+# 每个工作项包含的图片数：Florence2 合并为一次批量推理，在线API不支持批量，逐张请求
+DATASET_BATCH_SIZES = {
+    'florence2': 4,
+}
+
+class DatasetScanThread(QThread):
+    """后台扫描全部目录，找出没有标签文件（或标签文件为空）的图片"""
+
+    # 扫描完成：[(目录, [图片路径, ...]), ...]，按目录列表顺序
+    scan_finished = pyqtSignal(list)
+
+    def __init__(self, directories, recursive=False, parent=None):
+        super().__init__(parent)
+        self.directories = directories
+        self.recursive = recursive
+        self.cancelled = False
+
+    def cancel(self):
+        """取消扫描"""
+        self.cancelled = True
+
+    def run(self):
+        results = []
+        for directory in self.directories:
+            if self.cancelled:
+                return
+            try:
+                images, _ = collect_images(directory, self.recursive)
+            except OSError as e:
+                print(f"扫描目录出错: {directory}, {e}")
+                images = []
+            results.append((directory, images))
+        if not self.cancelled:
+            self.scan_finished.emit(results)
+
+def group_by_prompt(dataset_images, prompts, labeler_type):
+    """
+    按目录提示词分组 [(目录, [图片路径, ...]), ...]，返回 [(代表目录, [目录, ...]), ...]
+    提示词相同的目录可以合并为同一批推理；Florence2 使用固定的任务提示词，全部目录为一组
+    """
+    groups = {}
+    for directory, images in dataset_images:
+        if not images:
+            continue
+        key = None if labeler_type.value == 'florence2' else prompts.get(directory)
+        groups.setdefault(key, []).append(directory)
+    return [(directories[0], directories) for directories in groups.values()]
+
+def make_dataset_label_handler(labeler, labeler_type, prompt_directory, config_snapshot, items, trigger_words, metrics=None):
+    """
+    创建全部目录打标的工作项处理函数，工作项为 [(序号, 图片路径), ...]，序号对应 items 中的 (目录, 图片路径)。
+    同一工作项的图片使用 prompt_directory 的提示词一次批量打标，成功的结果立即写入标签文件；
+    trigger_words 为 {目录: 触发词}，传入 metrics（RunMetrics）时记录每张图片的平均耗时
+    """
+    from image_labeler import is_failed_result
+
+    def handle(item):
+        indexes = [index for index, _ in item]
+        image_paths = [image_path for _, image_path in item]
+        timings = {} if metrics is not None else None
+        start = time.perf_counter()
+        try:
+            labels = labeler.label_images(image_paths, prompt_directory, config_snapshot, labeler_type, timings)
+        except Exception as e:
+            labels = [{"description": f"[调用失败] {e}", "zh": ""} for _ in image_paths]
+        if len(labels) < len(image_paths):
+            # 返回的结果少于图片数量时，缺少结果的图片按失败处理
+            missing = len(image_paths) - len(labels)
+            labels = list(labels) + [{"description": "[调用失败] 没有返回该图片的结果", "zh": ""} for _ in range(missing)]
+        results = []
+        for index, image_path, result in zip(indexes, image_paths, labels):
+            if is_failed_result(result):
+                error = result.get('description') if isinstance(result, dict) else "返回结果格式不正确"
+                results.append((index, False, f"打标失败: {error}"))
+                continue
+            description = str(result['description']).strip()
+            trigger_word = trigger_words.get(items[index][0], "")
+            if trigger_word:
+                description = f"{trigger_word}, {description}"
+            try:
+                write_sidecar(image_path, description)
+            except Exception as e:
+                results.append((index, False, f"保存标签失败: {e}"))
+                continue
+            results.append((index, True, {'path': image_path, 'description': description, 'zh': result.get('zh', '')}))
+        if metrics is not None:
+            # 批量推理无法区分单张耗时，按平均值记录
+            elapsed = (time.perf_counter() - start) / len(item)
+            per_image = {name: value / len(item) for name, value in timings.items()}
+            for image_path, (_, ok, _) in zip(image_paths, results):
+                metrics.record(image_path, elapsed, per_image, ok)
+        return results
+    return handle
+
+class DatasetLabelRun(QObject):
+    """
+    一次全部目录打标：按提示词分组为若干任务，共用主窗口的调度器和同一个打标器（模型只加载一次），
+    统计并通知每个目录的进度
+    """
+
+    # 目录进度：目录, 成功数, 失败数, 总数
+    directory_progress = pyqtSignal(str, int, int, int)
+    # 一张图片已打标并写入标签文件：图片路径, 标签文本, 中文翻译
+    image_labeled = pyqtSignal(str, str, str)
+    # 一张图片打标失败：目录, 图片路径, 错误信息
+    image_failed = pyqtSignal(str, str, str)
+    # 全部任务结束：成功数, 失败数, 是否被取消
+    run_finished = pyqtSignal(int, int, bool)
+
+    def __init__(self, scheduler, dataset_images, parent=None):
+        """dataset_images 为 DatasetScanThread 的扫描结果 [(目录, [图片路径, ...]), ...]"""
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.dataset_images = [(directory, images) for directory, images in dataset_images if images]
+        self.items = [(directory, image_path) for directory, images in self.dataset_images for image_path in images]
+        self.totals = {directory: len(images) for directory, images in self.dataset_images}
+        self.succeeded = dict.fromkeys(self.totals, 0)
+        self.failed = dict.fromkeys(self.totals, 0)
+        self.job_ids = set()
+        self.metrics = {}  # 任务ID -> RunMetrics
+        self.cancelled = False
+        scheduler.item_done.connect(self.on_item_done)
+        scheduler.item_failed.connect(self.on_item_failed)
+        scheduler.job_finished.connect(self.on_job_finished)
+
+    def directories(self):
+        return [directory for directory, _ in self.dataset_images]
+
+    def submit(self, labeler, labeler_type, config_snapshot, trigger_words):
+        """按提示词分组提交打标任务，返回任务ID列表"""
+        backend = labeler_type.value
+        batch_size = DATASET_BATCH_SIZES.get(backend, 1)
+        prompts = config_snapshot.get_directory_prompts()
+        indexes = {}
+        for index, (directory, _) in enumerate(self.items):
+            indexes.setdefault(directory, []).append(index)
+        groups = group_by_prompt(self.dataset_images, prompts, labeler_type)
+        for number, (prompt_directory, directories) in enumerate(groups, 1):
+            pairs = [(index, self.items[index][1]) for directory in directories for index in indexes[directory]]
+            work_items = [pairs[start:start + batch_size] for start in range(0, len(pairs), batch_size)]
+            metrics = RunMetrics.create(len(pairs), backend)
+            handler = make_dataset_label_handler(
+                labeler, labeler_type, prompt_directory, config_snapshot, self.items, trigger_words, metrics
+            )
+            title = f"全部目录打标 ({backend}，{len(directories)} 个目录"
+            title += f"，提示词 {number}/{len(groups)})" if len(groups) > 1 else ")"
+            job_id = self.scheduler.submit(DATASET_JOB_KIND, backend, title, work_items, handler)
+            self.job_ids.add(job_id)
+            self.metrics[job_id] = metrics
+        for directory in self.totals:
+            self.emit_progress(directory)
+        return list(self.job_ids)
+
+    def cancel(self):
+        """取消全部任务，已写入的标签文件保留，正在处理的图片完成后结束"""
+        self.cancelled = True
+        for job_id in list(self.job_ids):
+            self.scheduler.cancel(job_id)
+
+    def is_active(self):
+        return bool(self.job_ids)
+
+    def emit_progress(self, directory):
+        self.directory_progress.emit(
+            directory, self.succeeded[directory], self.failed[directory], self.totals[directory]
+        )
+
+    def on_item_done(self, job_id, index, result):
+        if job_id not in self.job_ids:
+            return
+        directory = self.items[index][0]
+        self.succeeded[directory] += 1
+        self.image_labeled.emit(result['path'], result['description'], result.get('zh', ''))
+        self.emit_progress(directory)
+
+    def on_item_failed(self, job_id, index, error_msg):
+        if job_id not in self.job_ids:
+            return
+        directory, image_path = self.items[index]
+        self.failed[directory] += 1
+        self.image_failed.emit(directory, image_path, error_msg)
+        self.emit_progress(directory)
+
+    def on_job_finished(self, job_id, success_count, state):
+        if job_id not in self.job_ids:
+            return
+        self.job_ids.discard(job_id)
+        metrics = self.metrics.pop(job_id, None)
+        if metrics is not None:
+            metrics.close(state)
+        if state == JOB_CANCELLED:
+            self.cancelled = True
+        if not self.job_ids:
+            self.run_finished.emit(sum(self.succeeded.values()), sum(self.failed.values()), self.cancelled)
@@ -0,0 +1,58 @@
+import time
+from PyQt6.QtCore import QThread, pyqtSignal
+from label_io import iter_image_files
+
+class DirectoryScanner(QThread):
+    """
+    后台扫描目录中的图像文件，分块流式发送结果。
+    第一块很小以便尽快显示第一屏，之后块逐渐增大以减少信号开销。
+    """
+
+    # 发现一批图像：generation, [路径, ...]
+    images_found = pyqtSignal(int, list)
+    # 扫描完成：generation, 图像总数
+    scan_finished = pyqtSignal(int, int)
+    # 扫描失败：generation, 错误信息
+    scan_failed = pyqtSignal(int, str)
+
+    FIRST_CHUNK_SIZE = 64
+    MAX_CHUNK_SIZE = 4096
+    FLUSH_INTERVAL = 0.1  # 距离上次发送超过该时间（秒）时立即发送已发现的图像
+
+    def __init__(self, path, generation, recursive=False, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.generation = generation
+        self.recursive = recursive
+        self.cancelled = False
+
+    def cancel(self):
+        """取消扫描"""
+        self.cancelled = True
+
+    def run(self):
+        chunk = []
+        chunk_size = self.FIRST_CHUNK_SIZE
+        total = 0
+        last_emit = time.monotonic()
+        try:
+            for image_path in iter_image_files(self.path, self.recursive, lambda: self.cancelled):
+                chunk.append(image_path)
+                now = time.monotonic()
+                if len(chunk) >= chunk_size or now - last_emit >= self.FLUSH_INTERVAL:
+                    total += len(chunk)
+                    self.images_found.emit(self.generation, chunk)
+                    chunk = []
+                    chunk_size = min(chunk_size * 2, self.MAX_CHUNK_SIZE)
+                    last_emit = now
+        except Exception as e:
+            if not self.cancelled:
+                self.scan_failed.emit(self.generation, str(e))
+            return
+
+        if self.cancelled:
+            return
+        if chunk:
+            total += len(chunk)
+            self.images_found.emit(self.generation, chunk)
+        self.scan_finished.emit(self.generation, total)
@@ -0,0 +1,320 @@
+import itertools
+import threading
+import time
+from collections import deque
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from utils import translate_text, iter_translate_texts
+
+# 任务状态
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_PAUSED = 'paused'
+JOB_CANCELLED = 'cancelled'
+JOB_FINISHED = 'finished'
+
+# 各后端的并发工作线程数：本地模型独占GPU只用1个，在线API可以并发
+BACKEND_WORKERS = {
+    'florence2': 1,
+    'gemini': 2,
+    'zhipu': 2,
+    'translate': 1,
+}
+# 在线API批量任务每个工作线程两次请求之间的最小间隔（秒）
+BACKEND_INTERVALS = {
+    'gemini': 1.0,
+    'zhipu': 1.0,
+}
+# 批量翻译任务每个工作项包含的文本数量（暂停、取消和抢占的粒度）
+TRANSLATE_CHUNK_SIZE = 100
+
+class Job:
+    """
+    一个打标或翻译任务，由若干工作项组成。
+    handler(item) 在工作线程中处理一个工作项，返回 [(行号, 是否成功, 结果或错误信息), ...]
+    """
+
+    def __init__(self, job_id, kind, backend, title, items, handler, interactive=False):
+        self.job_id = job_id
+        self.kind = kind          # 'label' 或 'translate'
+        self.backend = backend
+        self.title = title
+        self.items = deque(items)
+        self.handler = handler
+        self.interactive = interactive  # 单行任务优先于批量任务执行
+        self.total = sum(item_row_count(item) for item in items)
+        self.done = 0
+        self.succeeded = 0
+        self.running = 0          # 正在处理的工作项数量
+        self.state = JOB_QUEUED
+        self.discard_results = False  # 取消时丢弃正在处理的工作项结果（切换目录后行号不再有效）
+        self.finished = False     # 已发出 job_finished
+
+    def is_active(self):
+        return self.state in (JOB_QUEUED, JOB_RUNNING, JOB_PAUSED)
+
+def item_row_count(item):
+    """工作项包含的行数：打标工作项为 (行号, 图片路径)，翻译工作项为 [(行号, 文本), ...]"""
+    return len(item) if isinstance(item, list) else 1
+
+class WorkerTask(QRunnable):
+    """后端工作线程：循环领取该后端的工作项，没有可执行的工作项时退出"""
+
+    def __init__(self, scheduler, backend):
+        super().__init__()
+        self.scheduler = scheduler
+        self.backend = backend
+
+    def run(self):
+        interval = BACKEND_INTERVALS.get(self.backend, 0)
+        while True:
+            job, item = self.scheduler.next_item(self.backend)
+            if job is None:
+                return
+            try:
+                results = job.handler(item)
+            except Exception as e:
+                rows = [row for row, _ in item] if isinstance(item, list) else [item[0]]
+                results = [(row, False, str(e)) for row in rows]
+            self.scheduler.item_finished(job, results)
+            # 批量调用在线API时控制请求频率，单行任务不等待
+            if interval and not job.interactive:
+                time.sleep(interval)
+
+class JobScheduler(QObject):
+    """
+    打标和翻译任务调度器。
+    每个后端有独立的有界线程池，单行（交互式）任务排在批量任务之前，
+    正在处理的工作项完成后立即执行单行任务；任务可以暂停、继续和取消，并按任务报告进度。
+    """
+
+    # 一行处理成功：任务ID, 行号, 结果（打标为dict，翻译为str）
+    item_done = pyqtSignal(int, int, object)
+    # 一行处理失败：任务ID, 行号, 错误信息
+    item_failed = pyqtSignal(int, int, str)
+    # 任务进度：任务ID, 已处理行数, 总行数
+    job_progress = pyqtSignal(int, int, int)
+    # 任务状态变化：任务ID, 状态
+    job_state_changed = pyqtSignal(int, str)
+    # 任务结束（完成或取消）：任务ID, 成功行数, 最终状态；发出后任务即从调度器中移除
+    job_finished = pyqtSignal(int, int, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.lock = threading.Lock()
+        self.jobs = {}        # 任务ID -> Job
+        self.queues = {}      # 后端 -> [Job, ...]（提交顺序）
+        self.pools = {}       # 后端 -> QThreadPool
+        self.workers = {}     # 后端 -> 运行中的工作线程数
+        self.ids = itertools.count(1)
+
+    def submit(self, kind, backend, title, items, handler, interactive=False):
+        """提交任务，返回任务ID"""
+        job = Job(next(self.ids), kind, backend, title, items, handler, interactive)
+        with self.lock:
+            self.jobs[job.job_id] = job
+            self.queues.setdefault(backend, []).append(job)
+        self.job_state_changed.emit(job.job_id, job.state)
+        self.job_progress.emit(job.job_id, 0, job.total)
+        self.spawn_workers(backend)
+        return job.job_id
+
+    def pool(self, backend):
+        pool = self.pools.get(backend)
+        if pool is None:
+            pool = QThreadPool(self)
+            pool.setMaxThreadCount(BACKEND_WORKERS.get(backend, 1))
+            self.pools[backend] = pool
+        return pool
+
+    def spawn_workers(self, backend):
+        """在线程数上限内为后端启动工作线程"""
+        pool = self.pool(backend)
+        with self.lock:
+            runnable = sum(len(job.items) for job in self.queues.get(backend, []) if job.state in (JOB_QUEUED, JOB_RUNNING))
+            count = min(runnable, pool.maxThreadCount()) - self.workers.get(backend, 0)
+            self.workers[backend] = self.workers.get(backend, 0) + max(count, 0)
+        for _ in range(count):
+            pool.start(WorkerTask(self, backend))
+
+    def next_item(self, backend):
+        """
+        工作线程领取下一个工作项：单行任务优先，其次按提交顺序的批量任务；
+        没有可执行的工作项时返回 (None, None)，工作线程随之退出
+        """
+        started = None
+        with self.lock:
+            queue = self.queues.get(backend, [])
+            candidates = [job for job in queue if job.interactive] + [job for job in queue if not job.interactive]
+            for job in candidates:
+                if job.state in (JOB_QUEUED, JOB_RUNNING) and job.items:
+                    item = job.items.popleft()
+                    job.running += 1
+                    if job.state == JOB_QUEUED:
+                        job.state = started = JOB_RUNNING
+                    break
+            else:
+                self.workers[backend] -= 1
+                return None, None
+        if started:
+            self.job_state_changed.emit(job.job_id, started)
+        return job, item
+
+    def item_finished(self, job, results):
+        """工作线程处理完一个工作项"""
+        with self.lock:
+            discard = job.discard_results
+        # 用户取消时正在处理的工作项结果照常通知，切换目录而取消的任务结果丢弃
+        if not discard:
+            for row, ok, result in results:
+                if ok:
+                    self.item_done.emit(job.job_id, row, result)
+                else:
+                    self.item_failed.emit(job.job_id, row, result)
+        # 发出结果之后才减少运行计数：多个工作线程并发时，最后完成的线程发出的 job_finished
+        # 一定排在其他线程的结果之后，主线程不会在任务结束后才收到结果
+        finished = False
+        with self.lock:
+            job.running -= 1
+            discard = job.discard_results
+            if not discard:
+                job.done += len(results)
+                job.succeeded += sum(1 for _, ok, _ in results if ok)
+                if not job.items and job.running == 0 and job.state != JOB_PAUSED:
+                    # 已取消的任务等最后一个正在处理的工作项完成后才结束
+                    if job.state != JOB_CANCELLED:
+                        job.state = JOB_FINISHED
+                    finished = True
+        if discard:
+            return
+        self.job_progress.emit(job.job_id, job.done, job.total)
+        if finished:
+            self.finish_job(job)
+
+    def finish_job(self, job):
+        """任务结束：通知状态和结果后从调度器中移除"""
+        with self.lock:
+            if job.finished:
+                return
+            job.finished = True
+            queue = self.queues.get(job.backend, [])
+            if job in queue:
+                queue.remove(job)
+        self.job_state_changed.emit(job.job_id, job.state)
+        self.job_finished.emit(job.job_id, job.succeeded, job.state)
+        with self.lock:
+            self.jobs.pop(job.job_id, None)
+
+    def pause(self, job_id):
+        """暂停任务：正在处理的工作项完成后不再领取新的工作项"""
+        job = self.jobs.get(job_id)
+        with self.lock:
+            if job is None or job.state not in (JOB_QUEUED, JOB_RUNNING):
+                return
+            job.state = JOB_PAUSED
+        self.job_state_changed.emit(job_id, JOB_PAUSED)
+
+    def resume(self, job_id):
+        """继续已暂停的任务"""
+        job = self.jobs.get(job_id)
+        finished = False
+        with self.lock:
+            if job is None or job.state != JOB_PAUSED:
+                return
+            if not job.items and job.running == 0:
+                # 暂停期间最后的工作项已完成
+                job.state = JOB_FINISHED
+                finished = True
+            else:
+                job.state = JOB_RUNNING if job.running else JOB_QUEUED
+        if finished:
+            self.finish_job(job)
+            return
+        self.job_state_changed.emit(job_id, job.state)
+        self.spawn_workers(job.backend)
+
+    def cancel(self, job_id, discard_results=False):
+        """
+        取消任务：丢弃尚未处理的工作项。正在处理的工作项结果照常通知，全部完成后任务结束；
+        discard_results 为 True 时（切换目录、关闭窗口）不再通知这些结果，任务立即结束
+        """
+        job = self.jobs.get(job_id)
+        with self.lock:
+            if job is None or job.finished:
+                return
+            if job.state == JOB_CANCELLED and not discard_results:
+                return
+            job.state = JOB_CANCELLED
+            job.items.clear()
+            job.discard_results = job.discard_results or discard_results
+            finish_now = job.discard_results or job.running == 0
+        if finish_now:
+            self.finish_job(job)
+        else:
+            self.job_state_changed.emit(job_id, JOB_CANCELLED)
+
+    def cancel_all(self, discard_results=False):
+        for job_id in list(self.jobs):
+            self.cancel(job_id, discard_results)
+
+    def shutdown(self):
+        """取消全部任务并等待工作线程结束（关闭窗口时调用）"""
+        self.cancel_all(discard_results=True)
+        for pool in self.pools.values():
+            pool.waitForDone()
+
+    def job(self, job_id):
+        return self.jobs.get(job_id)
+
+    def active_jobs(self):
+        """尚未结束的任务，包括已取消、正在等待工作项完成的任务"""
+        return [job for job in self.jobs.values() if not job.finished]
+
+def make_label_handler(labeler, labeler_type, current_directory, config_snapshot, metrics=None):
+    """创建打标工作项处理函数，工作项为 (行号, 图片路径)；传入 metrics（RunMetrics）时记录每张图片的耗时"""
+    from image_labeler import is_failed_result
+
+    def label(row, image_path, timings):
+        try:
+            result = labeler.label_image(image_path, current_directory, config_snapshot, labeler_type, timings)
+        except Exception as e:
+            return [(row, False, f"打标失败: {str(e)}")]
+        if is_failed_result(result):
+            # 在线API出错时返回的错误信息不作为打标结果
+            error = result.get('description') if isinstance(result, dict) else None
+            return [(row, False, f"打标失败: {error or '返回结果格式不正确'}")]
+        return [(row, True, result)]
+
+    def handle(item):
+        row, image_path = item
+        if metrics is None:
+            return label(row, image_path, None)
+        timings = {}
+        start = time.perf_counter()
+        results = label(row, image_path, timings)
+        metrics.record(image_path, time.perf_counter() - start, timings, results[0][1])
+        return results
+    return handle
+
+def translate_handler(item):
+    """翻译工作项处理函数，工作项为 [(行号, 英文文本), ...]"""
+    rows = [row for row, _ in item]
+    texts = [text for _, text in item]
+    if len(texts) == 1:
+        translated = [translate_text(texts[0])]
+    else:
+        # 批量翻译：多条短文本打包为一次请求
+        translated = [""] * len(texts)
+        for batch in iter_translate_texts(texts):
+            for index, text in batch:
+                translated[index] = text
+    results = []
+    for row, text in zip(rows, translated):
+        if not text or text.startswith("[翻译失败]"):
+            results.append((row, False, text or "[翻译失败] 翻译结果为空"))
+        else:
+            results.append((row, True, text))
+    return results
+
+def chunk_items(items, size=TRANSLATE_CHUNK_SIZE):
+    """将 [(行号, 文本), ...] 按 size 分为多个翻译工作项"""
+    return [items[start:start + size] for start in range(0, len(items), size)]
@@ -0,0 +1,104 @@
+import os
+import tempfile
+from profiling import span
+
+# 支持的图像扩展名
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.webp')
+
+def sidecar_path(image_path):
+    """获取图像对应的标签文件路径（同名.txt）"""
+    return os.path.splitext(image_path)[0] + ".txt"
+
+def read_sidecar(image_path):
+    """
+    读取图像对应的标签文件
+    返回 (标签文本, 标签文件是否存在)，读取失败时返回空文本
+    """
+    txt_file_path = sidecar_path(image_path)
+    try:
+        with span('sidecar.read'), open(txt_file_path, 'r', encoding='utf-8') as f:
+            return f.read().strip(), True
+    except FileNotFoundError:
+        return "", False
+    except Exception as e:
+        print(f"读取标签文件出错: {e}")
+        return "", True
+
+# 进程的 umask，新建文件的权限与直接 open 创建时一致（在导入时读取，避免多线程下临时修改 umask）
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+def copy_file_mode(tmp_path, target_path):
+    """
+    mkstemp 创建的临时文件权限为 0600，替换前改为目标文件原有的权限，
+    目标文件不存在时使用 0666 & ~umask，避免共享存储上的其他用户无法读取
+    """
+    try:
+        mode = os.stat(target_path).st_mode & 0o7777
+    except FileNotFoundError:
+        mode = 0o666 & ~_UMASK
+    os.chmod(tmp_path, mode)
+
+def write_sidecar(image_path, text):
+    """
+    原子地写入图像对应的标签文件：先写入同目录下的临时文件，
+    落盘后用 os.replace 替换，写入中途崩溃不会留下写了一半的标签文件
+    """
+    with span('sidecar.write'):
+        txt_file_path = sidecar_path(image_path)
+        directory = os.path.dirname(txt_file_path)
+        fd, tmp_path = tempfile.mkstemp(prefix='.', suffix='.txt.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            copy_file_mode(tmp_path, txt_file_path)
+            os.replace(tmp_path, txt_file_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+
+def iter_image_files(path, recursive=False, should_stop=None):
+    """
+    使用 os.scandir 遍历目录中的图像文件，逐个产出完整路径。
+    每个目录内按文件名排序，recursive 为 True 时按名称顺序深度优先进入子目录
+    （如 kohya 风格的 10_concept 子目录），保证每次遍历的顺序一致。
+    should_stop 返回 True 时立即停止遍历。
+    """
+    with os.scandir(path) as it:
+        entries = sorted(it, key=lambda entry: entry.name)
+
+    subdirs = []
+    for entry in entries:
+        if should_stop is not None and should_stop():
+            return
+        if entry.name.startswith('.'):
+            continue
+        try:
+            if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                yield entry.path
+            elif recursive and entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+        except OSError as e:
+            print(f"读取目录项出错: {e}")
+
+    for subdir in subdirs:
+        try:
+            yield from iter_image_files(subdir, recursive, should_stop)
+        except OSError as e:
+            print(f"读取子目录出错: {e}")
+
+def collect_images(directory, recursive=False, skip_existing=True):
+    """返回 (需要打标的图片路径列表, 已有标签而跳过的数量)"""
+    images = []
+    skipped = 0
+    for image_path in iter_image_files(directory, recursive):
+        if skip_existing and read_sidecar(image_path)[0]:
+            skipped += 1
+            continue
+        images.append(image_path)
+    return images, skipped
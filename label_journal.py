@@ -0,0 +1,146 @@
+import os
+import json
+import time
+
+# 批量打标日志目录
+RUNS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "runs")
+# 每写入多少条结果强制落盘一次
+FSYNC_INTERVAL = 20
+# 最多保留多少个已结束的打标日志
+MAX_FINISHED_RUNS = 20
+
+# 打标日志结束状态
+RUN_FINISHED = 'finished'    # 全部完成
+RUN_CANCELLED = 'cancelled'  # 用户取消
+RUN_ABANDONED = 'abandoned'  # 启动时选择不再继续
+
+class LabelJournal:
+    """
+    批量打标日志（只追加的JSONL文件）。
+    第一行记录任务队列（目录、打标服务、全部图片路径），之后每完成一张图片追加一条结果，
+    任务结束时追加结束记录。程序中途退出或崩溃后，没有结束记录的日志可以在下次启动时继续。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'a', encoding='utf-8')
+        self.unsynced = 0
+
+    @classmethod
+    def create(cls, directory, labeler_type, image_paths):
+        """为一次批量打标创建新日志并写入任务队列"""
+        os.makedirs(RUNS_DIR, exist_ok=True)
+        prune_finished_runs()
+        run_id = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+        journal = cls(os.path.join(RUNS_DIR, f"label-{run_id}.jsonl"))
+        journal.write({
+            'type': 'start',
+            'run_id': run_id,
+            'time': time.time(),
+            'directory': directory,
+            'labeler_type': labeler_type,
+            'items': list(image_paths),
+        }, sync=True)
+        return journal
+
+    def write(self, record, sync=False):
+        self.file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.file.flush()
+        self.unsynced += 1
+        if sync or self.unsynced >= FSYNC_INTERVAL:
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+
+    def record_result(self, image_path, en_label, zh_label=""):
+        """记录一张图片的打标结果（写入表格的最终文本）"""
+        self.write({'type': 'result', 'path': image_path, 'en': en_label, 'zh': zh_label})
+
+    def finish(self, status=RUN_FINISHED):
+        """写入结束记录，之后启动时不再提示继续"""
+        self.write({'type': 'end', 'status': status, 'time': time.time()}, sync=True)
+        self.close()
+
+    def close(self):
+        if not self.file.closed:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+
+def load_run(path):
+    """
+    读取打标日志，返回 {'path', 'run_id', 'directory', 'labeler_type', 'items', 'results', 'status'}
+    results 为 {图片路径: (英文打标, 中文翻译)}；崩溃时写了一半的最后一行会被忽略，日志无效时返回None
+    """
+    run = None
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            record_type = record.get('type')
+            if record_type == 'start':
+                run = {
+                    'path': path,
+                    'run_id': record.get('run_id', ''),
+                    'directory': record.get('directory', ''),
+                    'labeler_type': record.get('labeler_type', ''),
+                    'items': record.get('items', []),
+                    'results': {},
+                    'status': None,
+                }
+            elif run is None:
+                continue
+            elif record_type == 'result':
+                run['results'][record['path']] = (record.get('en', ''), record.get('zh', ''))
+            elif record_type == 'end':
+                run['status'] = record.get('status', RUN_FINISHED)
+    return run
+
+def list_runs():
+    """按修改时间从新到旧列出所有打标日志文件"""
+    if not os.path.isdir(RUNS_DIR):
+        return []
+    paths = [
+        os.path.join(RUNS_DIR, name) for name in os.listdir(RUNS_DIR)
+        if name.startswith('label-') and name.endswith('.jsonl')
+    ]
+    return sorted(paths, key=os.path.getmtime, reverse=True)
+
+def find_unfinished_runs():
+    """返回尚未结束且仍有未完成图片的打标日志（从新到旧）"""
+    runs = []
+    for path in list_runs():
+        try:
+            run = load_run(path)
+        except OSError as e:
+            print(f"读取打标日志出错: {e}")
+            continue
+        if run is not None and run['status'] is None:
+            runs.append(run)
+    return runs
+
+def remaining_items(run):
+    """日志中尚未完成的图片路径（保持原队列顺序）"""
+    results = run['results']
+    return [image_path for image_path in run['items'] if image_path not in results]
+
+def mark_abandoned(run):
+    """启动时选择不再继续的日志追加结束记录"""
+    LabelJournal(run['path']).finish(RUN_ABANDONED)
+
+def prune_finished_runs():
+    """删除多余的已结束日志，只保留最近的 MAX_FINISHED_RUNS 个"""
+    finished = []
+    for path in list_runs():
+        try:
+            run = load_run(path)
+        except OSError:
+            continue
+        if run is None or run['status'] is not None:
+            finished.append(path)
+    for path in finished[MAX_FINISHED_RUNS:]:
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"删除打标日志出错: {e}")
@@ -0,0 +1,44 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+from label_io import write_sidecar
+
+class LabelSaveThread(QThread):
+    """
+    后台保存标签文件。
+    只写入传入的已修改行，每个文件通过临时文件 + os.replace 原子替换，
+    分批通知主线程已保存的行，并报告保存进度。
+    """
+
+    # 保存进度：已处理数量, 总数
+    progress = pyqtSignal(int, int)
+    # 一批行已保存：[(行号, 图片路径, 保存的文本), ...]
+    rows_saved = pyqtSignal(list)
+    # 保存完成：成功数量, 失败数量
+    save_finished = pyqtSignal(int, int)
+
+    BATCH_SIZE = 50
+
+    def __init__(self, items, parent=None):
+        """items 为 [(行号, 图片路径, 英文打标), ...]，在主线程中取好快照"""
+        super().__init__(parent)
+        self.items = items
+
+    def run(self):
+        saved = []
+        saved_count = 0
+        failed_count = 0
+        total = len(self.items)
+        for done, (row, image_path, text) in enumerate(self.items, 1):
+            try:
+                write_sidecar(image_path, text)
+                saved.append((row, image_path, text))
+                saved_count += 1
+            except Exception as e:
+                print(f"保存标签时出错: {image_path}, {e}")
+                failed_count += 1
+
+            if len(saved) >= self.BATCH_SIZE or done == total:
+                if saved:
+                    self.rows_saved.emit(saved)
+                    saved = []
+                self.progress.emit(done, total)
+        self.save_finished.emit(saved_count, failed_count)
@@ -0,0 +1,65 @@
+# 行状态标志位（每行一个字节）
+FLAG_LABELING = 0x01      # 正在打标
+FLAG_TRANSLATING = 0x02   # 正在翻译
+FLAG_DIRTY = 0x04         # 英文打标已修改，尚未保存到标签文件
+FLAG_LABEL_LOADED = 0x08  # 英文打标已确定（标签文件已读取，或已被编辑/打标覆盖）
+FLAG_HAS_SIDECAR = 0x10   # 磁盘上存在标签文件
+
+class LabelStore:
+    """
+    数据集行数据存储。
+    按列保存为平行数组（路径、英文打标、中文翻译、状态标志），
+    不为每行创建对象或控件，内存占用只与文本本身的大小相关。
+    """
+
+    def __init__(self):
+        self.paths = []
+        self.en_labels = []
+        self.zh_labels = []
+        self.flags = bytearray()
+        self.row_index = {}  # 图片路径 -> 行号
+
+    def __len__(self):
+        return len(self.paths)
+
+    def reset(self, paths, en_labels=None):
+        """用新的图像列表替换全部数据"""
+        self.paths = list(paths)
+        self.en_labels = list(en_labels) if en_labels is not None else [""] * len(self.paths)
+        self.zh_labels = [""] * len(self.paths)
+        self.flags = bytearray(len(self.paths))
+        self.row_index = {path: row for row, path in enumerate(self.paths)}
+
+    def extend(self, paths):
+        """在末尾追加一批图像"""
+        start = len(self.paths)
+        self.row_index.update((path, start + i) for i, path in enumerate(paths))
+        self.paths.extend(paths)
+        self.en_labels.extend([""] * len(paths))
+        self.zh_labels.extend([""] * len(paths))
+        self.flags.extend(bytearray(len(paths)))
+
+    def row_of(self, path):
+        """根据图片路径查找行号，不存在时返回-1"""
+        return self.row_index.get(path, -1)
+
+    def has_flag(self, row, flag):
+        return bool(self.flags[row] & flag)
+
+    def set_flag(self, row, flag, on=True):
+        if on:
+            self.flags[row] |= flag
+        else:
+            self.flags[row] &= ~flag & 0xFF
+
+    def rows_with_flag(self, flag):
+        """返回设置了指定标志的所有行"""
+        return [row for row, value in enumerate(self.flags) if value & flag]
+
+    def clear_flag(self, flag):
+        """清除所有行的指定标志，返回被清除的行"""
+        rows = self.rows_with_flag(flag)
+        mask = ~flag & 0xFF
+        for row in rows:
+            self.flags[row] &= mask
+        return rows
@@ -0,0 +1,140 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from zhipuai import ZhipuAI
+import config
+
+# 批量翻译提示词：输入为JSON数组，要求输出等长的JSON数组
+TRANSLATE_SYSTEM_PROMPT = """You are a professional English to Simplified Chinese translator for image captions.
+The user sends a JSON array of English captions. Translate every caption into Simplified Chinese.
+Return only a JSON array of strings with exactly the same number of elements in the same order.
+Do not merge, split, skip or explain any element."""
+
+class RateLimiter:
+    """简单的请求速率限制器，保证相邻请求的发起间隔不小于 60/每分钟请求数 秒"""
+
+    def __init__(self, requests_per_minute):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self.next_time = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            wait_time = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if wait_time > 0:
+            time.sleep(wait_time)
+
+def parse_json_array(result_text):
+    """从模型返回文本中提取JSON数组，兼容Markdown代码块包裹"""
+    result_text = result_text.strip()
+    if result_text.startswith('```') and '```' in result_text[3:]:
+        code_block = result_text.split('```', 2)[1]
+        if code_block.startswith('json'):
+            code_block = code_block[4:]
+        result_text = code_block.strip()
+
+    start_idx = result_text.find('[')
+    end_idx = result_text.rfind(']') + 1
+    if start_idx < 0 or end_idx <= start_idx:
+        return None
+    try:
+        result = json.loads(result_text[start_idx:end_idx])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(result, list) or not all(isinstance(item, str) for item in result):
+        return None
+    return result
+
+class ZhipuTranslator:
+    """使用智谱语言模型批量翻译，每次请求发送多条文本组成的JSON数组"""
+
+    def __init__(self, llm_config, translate_config):
+        self.client = ZhipuAI(api_key=llm_config.get('api_key', ''))
+        self.model = llm_config.get('model', 'glm-4-flash-250414')
+        self.temperature = llm_config.get('temperature', 0.7)
+        self.max_tokens = llm_config.get('max_tokens', 2048)
+        self.batch_size = max(1, translate_config.get('llm_batch_size', 20))
+        self.concurrency = max(1, translate_config.get('llm_concurrency', 4))
+        self.rate_limiter = RateLimiter(translate_config.get('llm_requests_per_minute', 60))
+
+    def request_translations(self, texts):
+        """发送一次翻译请求，返回译文列表；数量不匹配或无法解析时返回None"""
+        self.rate_limiter.wait()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": TRANSLATE_SYSTEM_PROMPT},
+                {"role": "user", "content": json.dumps(texts, ensure_ascii=False)}
+            ],
+            temperature=self.temperature,
+            max_tokens=self.max_tokens
+        )
+        if not response or not getattr(response, 'choices', None):
+            return None
+        result = parse_json_array(response.choices[0].message.content or "")
+        if result is None or len(result) != len(texts):
+            return None
+        return [item.strip() for item in result]
+
+    def translate_chunk(self, texts):
+        """
+        翻译一组文本，输出数量与输入不一致或无法解析时二分后重试，
+        直到单条仍失败时返回失败信息。
+        请求本身出错（鉴权、网络、额度、限流等）时整组失败，不再二分，避免在接口拒绝请求时成倍增加请求。
+        """
+        try:
+            result = self.request_translations(texts)
+        except Exception as e:
+            return [f"[翻译失败] {str(e)}"] * len(texts)
+
+        if result is not None:
+            return result
+        if len(texts) == 1:
+            return ["[翻译失败] 智谱模型返回结果格式不正确"]
+
+        middle = len(texts) // 2
+        return self.translate_chunk(texts[:middle]) + self.translate_chunk(texts[middle:])
+
+    def iter_translate(self, texts):
+        """并发发送多个批量请求，每完成一个请求产出一批结果 [(索引, 译文), ...]"""
+        chunks = [
+            list(range(start, min(start + self.batch_size, len(texts))))
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        executor = ThreadPoolExecutor(max_workers=self.concurrency)
+        try:
+            futures = {
+                executor.submit(self.translate_chunk, [texts[i] for i in chunk]): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                yield list(zip(futures[future], future.result()))
+        finally:
+            # 调用方提前停止迭代时取消尚未开始的请求，不等待它们完成
+            executor.shutdown(wait=False, cancel_futures=True)
+
+def create_zhipu_translator():
+    """根据当前配置创建智谱翻译器，未配置API密钥时返回None"""
+    llm_config = config.get_zhipu_llm_config()
+    if not llm_config.get('api_key'):
+        return None
+    return ZhipuTranslator(llm_config, config.get_translate_config())
+
+def iter_translate_texts_zhipu(texts):
+    """使用智谱语言模型批量翻译多条文本，每完成一次请求产出一批结果"""
+    translator = create_zhipu_translator()
+    if translator is None:
+        yield [(i, "[翻译失败] 智谱AI API密钥未配置") for i in range(len(texts))]
+        return
+    yield from translator.iter_translate(texts)
+
+def translate_texts_zhipu(texts):
+    """使用智谱语言模型翻译多条文本，返回与输入顺序一致的译文列表"""
+    results = [""] * len(texts)
+    for batch in iter_translate_texts_zhipu(texts):
+        for index, translated in batch:
+            results[index] = translated
+    return results
@@ -0,0 +1,99 @@
+import re
+import threading
+import torch
+from transformers import AutoTokenizer, AutoModelForSeq2SeqLM
+import config
+from utils import get_model_local_path
+
+# 句子拆分：在英文句末标点后的空白处断开
+SENTENCE_SPLIT_PATTERN = re.compile(r'(?<=[.!?])\s+')
+
+class LocalTranslator:
+    """本地离线翻译器，使用models目录下的seq2seq模型在CPU上批量翻译"""
+
+    def __init__(self):
+        self.model = None
+        self.tokenizer = None
+        self.model_id = None
+        # 模型推理不是线程安全的，多个翻译线程共用时需要加锁
+        self.lock = threading.Lock()
+
+    def load_model(self, model_id):
+        """加载本地翻译模型，模型ID变化时重新加载"""
+        if self.model is not None and self.model_id == model_id:
+            return
+
+        print(f"正在加载本地翻译模型: {model_id}")
+        local_model_path = get_model_local_path(model_id)
+        self.tokenizer = AutoTokenizer.from_pretrained(local_model_path)
+        self.model = AutoModelForSeq2SeqLM.from_pretrained(local_model_path)
+        self.model.to("cpu")
+        self.model.eval()
+        self.model_id = model_id
+
+    def translate_sentences(self, sentences, batch_size=16, max_length=512):
+        """
+        批量翻译句子列表，返回与输入顺序一致的译文列表。
+        先按token长度排序分桶，使同一批次内句子长度接近，减少padding带来的无效计算。
+        """
+        if not sentences:
+            return []
+
+        lengths = [len(ids) for ids in self.tokenizer(sentences, truncation=True, max_length=max_length)["input_ids"]]
+        order = sorted(range(len(sentences)), key=lambda i: lengths[i])
+
+        results = [""] * len(sentences)
+        for start in range(0, len(order), batch_size):
+            batch_indices = order[start:start + batch_size]
+            batch = [sentences[i] for i in batch_indices]
+            inputs = self.tokenizer(batch, return_tensors="pt", padding=True, truncation=True, max_length=max_length)
+            with torch.inference_mode():
+                generated_ids = self.model.generate(**inputs, max_length=max_length)
+            decoded = self.tokenizer.batch_decode(generated_ids, skip_special_tokens=True)
+            for i, text in zip(batch_indices, decoded):
+                results[i] = text.strip()
+        return results
+
+    def translate_texts(self, texts):
+        """
+        翻译多条文本，按段落和句子拆分后统一批量推理，再按原有结构组合返回。
+        """
+        translate_config = config.get_translate_config()
+        model_id = translate_config.get('local_model', 'Helsinki-NLP/opus-mt-en-zh')
+        batch_size = translate_config.get('batch_size', 16)
+        max_length = translate_config.get('max_length', 512)
+
+        # 拆分为句子并记录每条文本的段落结构：[[句子序号, ...], ...]
+        sentences = []
+        sentence_index = {}
+        structures = []
+        for text in texts:
+            paragraphs = []
+            for para in (text or "").split('\n'):
+                para_indices = []
+                for sent in SENTENCE_SPLIT_PATTERN.split(para.strip()):
+                    if not sent:
+                        continue
+                    # 相同句子只翻译一次
+                    if sent not in sentence_index:
+                        sentence_index[sent] = len(sentences)
+                        sentences.append(sent)
+                    para_indices.append(sentence_index[sent])
+                paragraphs.append(para_indices)
+            structures.append(paragraphs)
+
+        with self.lock:
+            self.load_model(model_id)
+            translated = self.translate_sentences(sentences, batch_size, max_length)
+
+        return [
+            '\n'.join(''.join(translated[i] for i in para) for para in paragraphs)
+            for paragraphs in structures
+        ]
+
+# 全局共享的本地翻译器实例，避免重复加载模型
+_local_translator = LocalTranslator()
+
+def translate_texts_local(texts):
+    """使用本地离线模型翻译多条文本，返回译文列表"""
+    return _local_translator.translate_texts(texts)
@@ -2,69 +2,41 @@ import sys
 import os
 import json
 from PyQt6.QtWidgets import (
-    QApplication, QMainWindow, QSplitter, QListWidget, QTableWidget, QTableWidgetItem,
+    QApplication, QMainWindow, QSplitter, QListWidget, QTableView,
     QVBoxLayout, QHBoxLayout, QWidget, QPushButton, QLineEdit, QHeaderView, QFileDialog, QMessageBox,
     QLabel, QStyledItemDelegate, QTextEdit, QAbstractItemView, QComboBox, QDoubleSpinBox, QSpinBox,
-    QTabWidget, QRadioButton, QButtonGroup, QGroupBox, QFormLayout, QDialog
+    QTabWidget, QRadioButton, QButtonGroup, QGroupBox, QFormLayout, QDialog, QStyle, QCheckBox
 )
-from PyQt6.QtCore import QEvent, Qt, QSize, QThread, pyqtSignal, QTimer
-from PyQt6.QtGui import QPixmap, QIcon
-from image_labeler import ImageLabeler, LabelerType
-from utils import translate_text
+from PyQt6.QtCore import QEvent, Qt, QSize, pyqtSignal, QTimer, QPersistentModelIndex
+from PyQt6.QtGui import QPixmap, QIcon, QColor, QFont
+from image_labeler import ImageLabeler, LabelerType, is_failed_result
 from windows.model_config_dialog import ModelConfigDialog
 from windows.image_dialog import ImageDialog
+from windows.tag_stats_dialog import TagStatsDialog
+from windows.bulk_edit_dialog import BulkEditDialog
+from label_store import FLAG_LABELING, FLAG_TRANSLATING
+from sidecar_loader import SidecarLoader
+from directory_scanner import DirectoryScanner
+from thumbnail_loader import ThumbnailLoader, pixmap_bytes
+from memory_cache import MemoryLRUCache
+from thumbnail_cache import ThumbnailDiskCache
+from visible_range import VisibleRangeTracker
+from label_saver import LabelSaveThread
+from label_io import write_sidecar
+from bulk_ops import build_transform, BulkEditThread
+from job_scheduler import JobScheduler, JOB_CANCELLED, make_label_handler, translate_handler, chunk_items
+from windows.job_panel import JobPanel
+from windows.dataset_progress_dialog import DatasetProgressDialog
+from dataset_labeler import DatasetScanThread, DatasetLabelRun, DATASET_JOB_KIND
+from metrics import RunMetrics, format_duration
+from profiling import start_profiling, stop_profiling
+from label_journal import LabelJournal, find_unfinished_runs, remaining_items, mark_abandoned, RUN_FINISHED, RUN_CANCELLED
+from table_model import (
+    LabelTableModel, ButtonEnabledRole, COL_IMAGE, COL_EN, COL_TRANSLATE, COL_LABEL,
+    FILTER_ALL, FILTER_MISSING_SIDECAR, FILTER_EMPTY_EN, FILTER_EMPTY_ZH, FILTER_DIRTY
+)
 import config
 
-# 创建翻译线程类
-class TranslateThread(QThread):
-    # 定义信号
-    translation_done = pyqtSignal(int, str)
-    translation_failed = pyqtSignal(int, str)
-    all_translations_completed = pyqtSignal(int)  # 新增信号，参数为成功翻译的数量
-    
-    def __init__(self, text, row):
-        super().__init__()
-        self.text = text
-        self.row = row
-        self.batch_mode = False
-        self.translations = []  # [(row, text), ...]
-        
-    def set_batch_mode(self, translations):
-        """设置批量翻译模式"""
-        self.batch_mode = True
-        self.translations = translations
-        
-    def run(self):
-        if self.batch_mode:
-            # 批量翻译模式
-            translated_count = 0
-            for row, text in self.translations:
-                try:
-                    translated = translate_text(text)
-                    if translated.startswith("[翻译失败]"):
-                        self.translation_failed.emit(row, translated)
-                    else:
-                        self.translation_done.emit(row, translated)
-                        translated_count += 1
-                except Exception as e:
-                    self.translation_failed.emit(row, f"[翻译失败] {str(e)}")
-                
-                # 短暂延时，避免API请求过于频繁
-                QThread.msleep(100)
-            
-            # 所有翻译完成后发送信号
-            self.all_translations_completed.emit(translated_count)
-        else:
-            # 单个翻译模式
-            try:
-                translated = translate_text(self.text)
-                if translated.startswith("[翻译失败]"):
-                    self.translation_failed.emit(self.row, translated)
-                else:
-                    self.translation_done.emit(self.row, translated)
-            except Exception as e:
-                self.translation_failed.emit(self.row, f"[翻译失败] {str(e)}")
-
 class TextEditDelegate(QStyledItemDelegate):
     """自定义委托，用于实现多行文本编辑"""
     
@@ -79,15 +51,8 @@ class TextEditDelegate(QStyledItemDelegate):
             editor.setText(value)
             
     def setModelData(self, editor, model, index):
+        # 内容修改标记由模型的 label_edited 信号通知主窗口
         model.setData(index, editor.toPlainText(), Qt.ItemDataRole.EditRole)
-        # 仅在英文打标列被编辑时设置内容修改
-        # 递归查找父级窗口，直到找到 ImageLabelAssistant 实例
-        widget = model.parent()
-        while widget is not None:
-            if widget.metaObject().className() == 'ImageLabelAssistant':
-                widget.content_modified = True
-                break
-            widget = widget.parent()
             
     def updateEditorGeometry(self, editor, option, index):
         editor.setGeometry(option.rect)
@@ -95,31 +60,73 @@ class TextEditDelegate(QStyledItemDelegate):
 class ImageDelegate(QStyledItemDelegate):
     """自定义委托，用于在表格中显示自适应大小的图片"""
     
+    # 按尺寸缓存的缩放结果的内存上限
+    SCALED_CACHE_BYTES = 64 * 1024 * 1024
+    # 停止调整行高/列宽多久后（毫秒）恢复平滑缩放
+    RESIZE_SETTLE_MS = 200
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent_widget = parent  # 允许访问主窗口方法
+        # 按 (图片路径, 宽, 高) 缓存缩放后的缩略图，滚动重绘时直接绘制
+        self.scaled_cache = MemoryLRUCache(self.SCALED_CACHE_BYTES, pixmap_bytes)
+        # 交互式调整行高/列宽期间使用快速缩放，停止调整后再平滑缩放
+        self.resizing = False
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(self.RESIZE_SETTLE_MS)
+        self.resize_timer.timeout.connect(self.on_resize_settled)
+
+    def on_section_resized(self, logical_index, old_size, new_size):
+        """行高或列宽变化时切换为快速缩放"""
+        self.resizing = True
+        self.resize_timer.start()
+
+    def on_resize_settled(self):
+        """调整结束，丢弃旧尺寸的缓存并以平滑缩放重绘"""
+        self.resizing = False
+        self.scaled_cache.clear()
+        self.parent_widget.table.viewport().update()
+
+    def get_scaled_thumbnail(self, image_path, base_thumbnail, width, height):
+        """获取缩放到单元格大小的缩略图"""
+        if self.resizing:
+            # 调整过程中尺寸不断变化，快速缩放且不缓存
+            return base_thumbnail.scaled(width, height, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.FastTransformation)
+        key = (image_path, width, height)
+        scaled_image = self.scaled_cache.get(key)
+        if scaled_image is None:
+            scaled_image = base_thumbnail.scaled(
+                width,
+                height,
+                Qt.AspectRatioMode.KeepAspectRatio,
+                Qt.TransformationMode.SmoothTransformation
+            )
+            self.scaled_cache.put(key, scaled_image)
+        return scaled_image
 
     def paint(self, painter, option, index):
         if index.data(Qt.ItemDataRole.UserRole):
             image_path = index.data(Qt.ItemDataRole.UserRole)
-            # 先从缓存获取原始缩略图（100x100），再根据单元格实际大小缩放显示
-            if self.parent_widget and hasattr(self.parent_widget, 'get_thumbnail'):
-                base_thumbnail = self.parent_widget.get_thumbnail(image_path)
-            else:
-                base_thumbnail = QPixmap(image_path).scaled(100, 100, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
+            # 从缓存获取缩略图，尚未解码时由主窗口提交后台解码并返回None
+            base_thumbnail = self.parent_widget.get_thumbnail(image_path)
             # 跟随单元格大小等比例缩放
             cell_width = option.rect.width() - 10  # 保持原有边距
             cell_height = option.rect.height() - 10
-            scaled_image = base_thumbnail.scaled(
-                cell_width,
-                cell_height,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation
-            )
-            # 绘制图片，在单元格中居中
-            x = option.rect.x() + (option.rect.width() - scaled_image.width()) / 2
-            y = option.rect.y() + (option.rect.height() - scaled_image.height()) / 2
-            painter.drawPixmap(int(x), int(y), scaled_image)
+            if base_thumbnail is None or base_thumbnail.isNull():
+                # 缩略图未就绪时绘制占位框，解码完成后该行会被刷新
+                painter.save()
+                placeholder = option.rect.adjusted(5, 5, -5, -25)
+                painter.fillRect(placeholder, QColor("#eeeeee"))
+                painter.setPen(QColor("#999999"))
+                painter.drawText(placeholder, Qt.AlignmentFlag.AlignCenter, "加载中..." if base_thumbnail is None else "无法加载")
+                painter.restore()
+            else:
+                scaled_image = self.get_scaled_thumbnail(image_path, base_thumbnail, cell_width, cell_height)
+                # 绘制图片，在单元格中居中
+                x = option.rect.x() + (option.rect.width() - scaled_image.width()) / 2
+                y = option.rect.y() + (option.rect.height() - scaled_image.height()) / 2
+                painter.drawPixmap(int(x), int(y), scaled_image)
             # 在图片下方绘制文件名
             file_name = os.path.basename(image_path)
             painter.drawText(
@@ -134,72 +141,71 @@ class ImageDelegate(QStyledItemDelegate):
         # 设置单元格的默认大小，行高会自动调整
         return QSize(200, 200)  # 增加默认高度
 
-# 创建打标线程类
-class LabelingThread(QThread):
-    # 定义信号
-    labeling_done = pyqtSignal(int, dict)
-    labeling_failed = pyqtSignal(int, str)
-    all_labeling_completed = pyqtSignal(int)  # 新增信号，参数为成功打标的数量
-    
-    def __init__(self, image_path, row, labeler, current_directory=None):
-        super().__init__()
-        self.image_path = image_path
-        self.row = row
-        
-        # 确保复制labeler的配置，而不是直接引用
-        self.labeler = labeler
-        
-        # 添加当前目录路径
-        self.current_directory = current_directory
-        
-        self.batch_mode = False
-        self.image_paths = []  # [(row, image_path), ...]
-        
-    def set_batch_mode(self, image_paths):
-        """设置批量打标模式"""
-        self.batch_mode = True
-        self.image_paths = image_paths
-        
-    def run(self):
-        if self.batch_mode:
-            # 批量打标模式
-            labeled_count = 0
-            for row, image_path in self.image_paths:
-                try:
-                    # 调用打标器进行打标，传入当前目录参数
-                    result = self.labeler.label_image(image_path, self.current_directory)
-                    
-                    # 检查返回结果
-                    if isinstance(result, dict) and 'description' in result:
-                        self.labeling_done.emit(row, result)
-                        labeled_count += 1
-                    else:
-                        error_msg = f"打标失败: 返回结果格式不正确"
-                        self.labeling_failed.emit(row, error_msg)
-                except Exception as e:
-                    error_msg = f"打标失败: {str(e)}"
-                    self.labeling_failed.emit(row, error_msg)
-                
-                # 暂停1秒，避免API请求过于频繁
-                QThread.sleep(1)  # 增加到1秒
-            
-            # 所有打标完成后发送信号
-            self.all_labeling_completed.emit(labeled_count)
+class ButtonDelegate(QStyledItemDelegate):
+    """自定义委托，在单元格中绘制按钮并处理点击，替代为每一行创建 QPushButton"""
+    
+    # 按钮被点击，参数为行号
+    clicked = pyqtSignal(int)
+    
+    # 与 style.qss 中 QPushButton 的配色保持一致
+    COLOR_NORMAL = QColor("#4a86e8")
+    COLOR_HOVER = QColor("#3a76d8")
+    COLOR_PRESSED = QColor("#2a66c8")
+    COLOR_DISABLED = QColor("#a0a0a0")
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pressed_index = None  # 当前按下的按钮所在单元格
+    
+    def button_rect(self, option):
+        return option.rect.adjusted(4, 4, -4, -4)
+    
+    def paint(self, painter, option, index):
+        enabled = bool(index.data(ButtonEnabledRole))
+        if not enabled:
+            color = self.COLOR_DISABLED
+        elif self.pressed_index is not None and self.pressed_index == QPersistentModelIndex(index):
+            color = self.COLOR_PRESSED
+        elif option.state & QStyle.StateFlag.State_MouseOver:
+            color = self.COLOR_HOVER
         else:
-            # 单个打标模式
-            try:
-                # 调用打标器进行打标，传入当前目录参数
-                result = self.labeler.label_image(self.image_path, self.current_directory)
-                
-                # 检查返回结果
-                if isinstance(result, dict) and 'description' in result:
-                    self.labeling_done.emit(self.row, result)
-                else:
-                    error_msg = f"打标失败: 返回结果格式不正确"
-                    self.labeling_failed.emit(self.row, error_msg)
-            except Exception as e:
-                error_msg = f"打标失败: {str(e)}"
-                self.labeling_failed.emit(self.row, error_msg)
+            color = self.COLOR_NORMAL
+        
+        painter.save()
+        painter.setRenderHint(painter.RenderHint.Antialiasing)
+        painter.setPen(Qt.PenStyle.NoPen)
+        painter.setBrush(color)
+        rect = self.button_rect(option)
+        painter.drawRoundedRect(rect, 4, 4)
+        font = QFont(option.font)
+        font.setBold(True)
+        painter.setFont(font)
+        painter.setPen(QColor("white"))
+        painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, index.data(Qt.ItemDataRole.DisplayRole) or "")
+        painter.restore()
+    
+    def editorEvent(self, event, model, option, index):
+        # 命中测试：只处理按钮区域内的鼠标左键
+        if event.type() not in (QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonRelease, QEvent.Type.MouseButtonDblClick):
+            return False
+        if event.button() != Qt.MouseButton.LeftButton:
+            return False
+        if not index.data(ButtonEnabledRole) or not self.button_rect(option).contains(event.position().toPoint()):
+            self.pressed_index = None
+            return False
+        
+        if event.type() in (QEvent.Type.MouseButtonPress, QEvent.Type.MouseButtonDblClick):
+            self.pressed_index = QPersistentModelIndex(index)
+            return True
+        
+        # 鼠标在同一按钮上松开时视为点击
+        if self.pressed_index is not None and self.pressed_index == QPersistentModelIndex(index):
+            self.pressed_index = None
+            # 发送数据行号（表格筛选时视图行号与数据行号不同）
+            self.clicked.emit(model.store_row(index.row()))
+        else:
+            self.pressed_index = None
+        return True
 
 class ImageLabelAssistant(QMainWindow):
     def __init__(self):
@@ -212,9 +218,31 @@ class ImageLabelAssistant(QMainWindow):
         screen = QApplication.primaryScreen().availableGeometry()
         self.setMinimumSize(int(screen.width() / 4 * 3), int(screen.height() / 4 * 3))
         
+        # 打标和翻译任务调度器：每个后端一个有界线程池，单行任务优先于批量任务
+        self.scheduler = JobScheduler(self)
+        self.job_rows = {}  # 任务ID -> 任务包含的行号
+        self.job_kinds = {}  # 任务ID -> (任务类型, 是否单行任务)，任务结束后调度器不再保留
+        # 批量打标日志：程序中途退出后可以在下次启动时继续
+        self.journals = {}  # 任务ID -> LabelJournal
+        self.run_metrics = {}  # 任务ID -> RunMetrics（批量打标任务的性能统计）
+        self.pending_resume = None  # 等待目录加载完成后继续的打标日志
+        self.interrupting_jobs = False  # 正在因切换目录或关闭窗口而中断任务（日志保留为未完成）
+        # 全部目录打标：扫描线程、进行中的打标、进度对话框，以及当前目录中参与打标的图片路径
+        self.dataset_scan = None
+        self.dataset_run = None
+        self.dataset_dialog = None
+        self.dataset_paths = set()
+        
         self.init_ui()
+        
+        self.scheduler.item_done.connect(self.on_job_item_done)
+        self.scheduler.item_failed.connect(self.on_job_item_failed)
+        self.scheduler.job_finished.connect(self.on_job_finished)
 
-        self.thumbnail_cache = {}  # 缩略图缓存
+        # 缩略图内存缓存，按字节预算进行LRU淘汰
+        ui_config = config.get_ui_config()
+        self.thumbnail_cache = MemoryLRUCache(ui_config.get('thumbnail_memory_cache_mb', 256) * 1024 * 1024, pixmap_bytes)
+        self.thumbnail_prefetch_rows = ui_config.get('thumbnail_prefetch_rows', 10)
         self.current_path = ""
         self.image_files = []
         self.content_modified = False  # 标记内容是否被修改
@@ -222,9 +250,50 @@ class ImageLabelAssistant(QMainWindow):
         # 初始化标注器
         self.labeler = ImageLabeler()
         
+        # 后台读取标签文件
+        self.sidecar_loader = SidecarLoader(self)
+        self.sidecar_loader.labels_loaded.connect(self.on_sidecar_labels_loaded)
+        self.sidecar_loader.all_loaded.connect(self.on_all_sidecars_loaded)
+        
+        # 后台解码缩略图，解码结果保存到磁盘缓存，重新打开数据集时直接读取
+        try:
+            disk_cache = ThumbnailDiskCache(max_bytes=ui_config.get('thumbnail_disk_cache_mb', 512) * 1024 * 1024)
+        except Exception as e:
+            print(f"初始化缩略图磁盘缓存失败: {e}")
+            disk_cache = None
+        self.thumbnail_loader = ThumbnailLoader(self, disk_cache=disk_cache)
+        self.thumbnail_loader.thumbnail_ready.connect(self.on_thumbnail_ready)
+        
+        # 滚动停顿后计算一次可见范围，只为新进入可见区域的行读取标签文件并预加载缩略图
+        self.visible_tracker = VisibleRangeTracker(self.table, self.thumbnail_prefetch_rows, parent=self)
+        self.visible_tracker.set_model(self.table_model)
+        self.visible_tracker.range_changed.connect(self.on_visible_range_changed)
+        
+        # 后台保存已修改的标签文件；开启自动保存时，最后一次修改后延迟保存
+        self.save_thread = None
+        self.autosave_timer = QTimer(self)
+        self.autosave_timer.setSingleShot(True)
+        self.autosave_timer.setInterval(ui_config.get('autosave_delay_ms', 2000))
+        self.autosave_timer.timeout.connect(self.autosave_labels)
+        
+        # 批量编辑线程和最近一次批量编辑的撤销记录 [(行号, 图片路径, 原文本, 新文本), ...]
+        self.bulk_edit_thread = None
+        self.bulk_edit_paths = []
+        self.bulk_undo = []
+        
+        # 标签统计对话框（首次打开时创建）
+        self.tag_stats_dialog = None
+        
+        # 后台扫描目录，scan_generation 用于丢弃已切换目录的扫描结果
+        self.scanner = None
+        self.scan_generation = 0
+        
         # 加载保存的目录列表和配置
         self.load_data()
         
+        # 窗口显示后检查是否有未完成的批量打标
+        QTimer.singleShot(0, self.offer_resume_runs)
+        
     def init_ui(self):
         self.setWindowTitle("图像打标助手 by liuqianhong")
         
@@ -266,6 +335,10 @@ class ImageLabelAssistant(QMainWindow):
         self.trigger_input.setPlaceholderText("自动提取或手动输入触发词")
         trigger_layout.addWidget(trigger_label)
         trigger_layout.addWidget(self.trigger_input)
+        # 标签频率统计、触发词推荐和异常打标
+        self.tag_stats_btn = QPushButton("标签统计")
+        self.tag_stats_btn.clicked.connect(self.show_tag_stats)
+        trigger_layout.addWidget(self.tag_stats_btn)
         trigger_layout.setContentsMargins(0, 10, 0, 0)  # 上下各留10像素
         trigger_prompt_layout.addLayout(trigger_layout)
         # 数据集提示词配置区域
@@ -337,18 +410,71 @@ class ImageLabelAssistant(QMainWindow):
         self.save_all_btn.clicked.connect(self.save_all_labels)
         self.translate_all_btn = QPushButton("一键翻译")
         self.translate_all_btn.clicked.connect(self.translate_all_labels)
+        # 为目录列表中的全部目录打标，结果直接写入标签文件
+        self.label_datasets_btn = QPushButton("全部目录打标")
+        self.label_datasets_btn.clicked.connect(self.label_all_datasets)
         
         button_layout.addWidget(self.label_all_btn)
+        button_layout.addWidget(self.label_datasets_btn)
         button_layout.addWidget(self.translate_all_btn)
         button_layout.addWidget(self.save_all_btn)
+        
+        # 批量编辑打标及撤销
+        self.bulk_edit_btn = QPushButton("批量编辑")
+        self.bulk_edit_btn.clicked.connect(self.bulk_edit_labels)
+        button_layout.addWidget(self.bulk_edit_btn)
+        self.undo_bulk_btn = QPushButton("撤销批量编辑")
+        self.undo_bulk_btn.setEnabled(False)
+        self.undo_bulk_btn.clicked.connect(self.undo_bulk_edit)
+        button_layout.addWidget(self.undo_bulk_btn)
+        
+        # 是否扫描子目录
+        self.recursive_check = QCheckBox("包含子目录")
+        self.recursive_check.setChecked(config.get_ui_config().get('scan_recursive', False))
+        self.recursive_check.toggled.connect(self.on_recursive_toggled)
+        button_layout.addWidget(self.recursive_check)
+        
+        # 修改后自动保存
+        self.autosave_check = QCheckBox("自动保存")
+        self.autosave_check.setChecked(config.get_ui_config().get('autosave', False))
+        self.autosave_check.toggled.connect(self.on_autosave_toggled)
+        button_layout.addWidget(self.autosave_check)
         button_layout.addStretch()
         
         right_layout.addLayout(button_layout)
         
-        # 图像表格
-        self.table = QTableWidget()
-        self.table.setColumnCount(5)
-        self.table.setHorizontalHeaderLabels(["图像", "英文打标", "中文翻译", "翻译", "打标"])
+        # 标签筛选：关键词（空格分隔，-开头表示不包含）和筛选模式
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(QLabel("筛选:"))
+        self.filter_input = QLineEdit()
+        self.filter_input.setPlaceholderText("输入关键词筛选英文打标和中文翻译，多个关键词用空格分隔，-开头表示不包含")
+        self.filter_input.setClearButtonEnabled(True)
+        self.filter_input.textChanged.connect(lambda: self.filter_timer.start())
+        filter_layout.addWidget(self.filter_input, 1)
+        self.filter_mode_combo = QComboBox()
+        self.filter_mode_combo.addItem("全部图像", FILTER_ALL)
+        self.filter_mode_combo.addItem("缺少标签文件", FILTER_MISSING_SIDECAR)
+        self.filter_mode_combo.addItem("英文打标为空", FILTER_EMPTY_EN)
+        self.filter_mode_combo.addItem("中文翻译为空", FILTER_EMPTY_ZH)
+        self.filter_mode_combo.addItem("未保存", FILTER_DIRTY)
+        self.filter_mode_combo.currentIndexChanged.connect(self.apply_filter)
+        filter_layout.addWidget(self.filter_mode_combo)
+        self.filter_count_label = QLabel()
+        filter_layout.addWidget(self.filter_count_label)
+        right_layout.addLayout(filter_layout)
+        # 输入停顿后再筛选
+        self.filter_timer = QTimer(self)
+        self.filter_timer.setSingleShot(True)
+        self.filter_timer.setInterval(200)
+        self.filter_timer.timeout.connect(self.apply_filter)
+        
+        # 图像表格：模型/视图结构，行数据保存在模型中，按钮由委托绘制
+        self.table_model = LabelTableModel(parent=self)
+        self.label_store = self.table_model.store
+        self.table_model.label_edited.connect(self.on_label_edited)
+        self.table_model.row_dirtied.connect(self.on_row_dirtied)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
         # 设置列宽：图片列固定200，英文和中文列自动拉伸，按钮列固定宽度
         self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
         self.table.setColumnWidth(0, 200)  # 图片列固定200宽度
@@ -367,26 +493,41 @@ class ImageLabelAssistant(QMainWindow):
 
         # 设置可编辑模式
         self.table.setEditTriggers(QAbstractItemView.EditTrigger.DoubleClicked | QAbstractItemView.EditTrigger.EditKeyPressed)
-        # 连接表格修改信号
-        self.table.itemChanged.connect(self.on_table_item_changed)
         # 设置委托
         self.image_delegate = ImageDelegate(self)
-        self.table.setItemDelegateForColumn(0, self.image_delegate)
+        self.table.setItemDelegateForColumn(COL_IMAGE, self.image_delegate)
+        # 只有图片列宽度变化才会影响缩略图尺寸
+        self.table.horizontalHeader().sectionResized.connect(
+            lambda column, old_size, new_size: column == COL_IMAGE and self.image_delegate.on_section_resized(column, old_size, new_size)
+        )
+        self.table.verticalHeader().sectionResized.connect(self.image_delegate.on_section_resized)
         # 设置文本编辑委托，仅英文打标使用多行编辑
         self.text_delegate = TextEditDelegate()
-        self.table.setItemDelegateForColumn(1, self.text_delegate)  # 英文打标使用多行编辑
+        self.table.setItemDelegateForColumn(COL_EN, self.text_delegate)  # 英文打标使用多行编辑
+        # 翻译和打标按钮由委托绘制并处理点击
+        self.translate_delegate = ButtonDelegate(self.table)
+        self.translate_delegate.clicked.connect(self.translate_label)
+        self.table.setItemDelegateForColumn(COL_TRANSLATE, self.translate_delegate)
+        self.label_delegate = ButtonDelegate(self.table)
+        self.label_delegate.clicked.connect(self.label_image)
+        self.table.setItemDelegateForColumn(COL_LABEL, self.label_delegate)
+        # 按钮悬停效果需要视口接收悬停事件
+        self.table.setMouseTracking(True)
+        self.table.viewport().setAttribute(Qt.WidgetAttribute.WA_Hover)
         # 设置默认行高
         self.table.verticalHeader().setDefaultSectionSize(200)
         # 设置行高可以手动调整
         self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
         
         # 绑定双击信号
-        self.table.cellDoubleClicked.connect(self.on_table_cell_double_clicked)
-        # 懒加载支持：滚动时动态加载可见区域的内容
-        self.table.viewport().installEventFilter(self)
+        self.table.doubleClicked.connect(self.on_table_cell_double_clicked)
 
         right_layout.addWidget(self.table)
         
+        # 批量任务进度（暂停、继续、取消）
+        self.job_panel = JobPanel(self.scheduler)
+        right_layout.addWidget(self.job_panel)
+        
         main_splitter.addWidget(right_widget)
 
         # 设置 main_splitter 的初始大小，left_widget 占 20%，right_widget 占 80%
@@ -435,13 +576,14 @@ class ImageLabelAssistant(QMainWindow):
         """保存目录列表到配置模块"""
         # 获取目录列表
         directories = []
-        dir_prompts = config.get_directory_prompts()
+        existing = {d['path']: d for d in config.get_directories()}
         
         for i in range(self.dir_list.count()):
             path = self.dir_list.item(i).text()
-            # 保留原有提示词配置，如果有的话
-            prompt = dir_prompts.get(path, config.DEFAULT_PROMPT)
-            directories.append({"path": path, "prompt": prompt})
+            # 保留原有提示词和其他目录配置（如监视打标使用的 backend），如果有的话
+            entry = dict(existing.get(path, {}), path=path)
+            entry.setdefault("prompt", config.DEFAULT_PROMPT)
+            directories.append(entry)
         
         # 更新目录列表
         config.update_directories(directories)
@@ -493,7 +635,9 @@ class ImageLabelAssistant(QMainWindow):
             if current_item.text() == self.current_path:
                 self.current_path = ""
                 self.image_files = []
+                self.interrupt_jobs()
                 self.thumbnail_cache.clear()
+                self.thumbnail_loader.cancel_all()
                 self.update_table()
                 
             # 保存目录列表到配置模块
@@ -538,8 +682,15 @@ class ImageLabelAssistant(QMainWindow):
             if result != QMessageBox.StandardButton.Yes:
                 return
 
-        # 清理缩略图缓存
+        # 取消当前目录未完成的打标和翻译任务（结果按行号写回，切换目录后不再适用）
+        self.interrupt_jobs()
+        
+        # 清理缩略图缓存，取消未完成的缩略图解码
+        self.print_thumbnail_cache_stats()
         self.thumbnail_cache.clear()
+        self.thumbnail_cache.reset_stats()
+        self.image_delegate.scaled_cache.clear()
+        self.thumbnail_loader.cancel_all()
 
         # 切换目录并重置修改状态
         self.current_path = selected_dir
@@ -548,146 +699,352 @@ class ImageLabelAssistant(QMainWindow):
         # 加载该目录的提示词配置
         self.load_directory_prompt(selected_dir)
 
-        # 加载目录中的图像
+        # 加载目录中的图像，标签文件全部读取后自动提取触发词
         self.load_images_from_directory(selected_dir)
 
-        # 自动提取触发词
-        self.auto_extract_trigger_word()
-
     def auto_extract_trigger_word(self):
-        """自动从任意两张图像的打标文本中提取触发词"""
-        labels = []
-        # 收集所有非空英文打标文本
-        for row in range(self.table.rowCount()):
-            item = self.table.item(row, 1)
-            if item and item.text():
-                labels.append(item.text().strip())
-            if len(labels) == 2:
-                break
-        if len(labels) < 2:
-            self.trigger_input.setText("")
+        """根据全部打标的标签统计自动推荐触发词（大多数打标共同的第一个标签）"""
+        self.trigger_input.setText(self.table_model.tag_stats.suggest_trigger_word())
+    
+    def show_tag_stats(self):
+        """显示标签统计对话框（非模态，可以边查看边编辑表格）"""
+        if self.tag_stats_dialog is None:
+            self.tag_stats_dialog = TagStatsDialog(self.table_model.tag_stats, self.label_store, parent=self)
+            self.tag_stats_dialog.filter_requested.connect(self.filter_by_keyword)
+            self.tag_stats_dialog.row_requested.connect(self.reveal_row)
+            self.tag_stats_dialog.trigger_word_requested.connect(self.trigger_input.setText)
+        self.tag_stats_dialog.set_trigger_word(self.trigger_input.text().strip())
+        self.tag_stats_dialog.show()
+        self.tag_stats_dialog.raise_()
+    
+    def filter_by_keyword(self, keyword):
+        """按关键词筛选表格"""
+        self.filter_mode_combo.setCurrentIndex(self.filter_mode_combo.findData(FILTER_ALL))
+        self.filter_input.setText(keyword)
+        self.apply_filter()
+    
+    def reveal_row(self, row):
+        """在表格中定位并选中某一数据行，该行被筛选掉时先清除筛选"""
+        if row >= len(self.label_store):
             return
-        # 提取第一个英文逗号前的部分
-        def get_prefix(label):
-            idx = label.find(",")
-            return label[:idx].strip() if idx != -1 else label.strip()
-        prefix1 = get_prefix(labels[0])
-        prefix2 = get_prefix(labels[1])
-        if prefix1 and prefix1 == prefix2:
-            self.trigger_input.setText(prefix1)
-        else:
-            self.trigger_input.setText("")
+        if self.table_model.view_row(row) < 0:
+            self.filter_input.clear()
+            self.filter_mode_combo.setCurrentIndex(self.filter_mode_combo.findData(FILTER_ALL))
+            self.apply_filter()
+        view_row = self.table_model.view_row(row)
+        self.table.selectRow(view_row)
+        self.table.scrollTo(self.table_model.index(view_row, COL_EN), QAbstractItemView.ScrollHint.PositionAtCenter)
     
     def load_images_from_directory(self, path):
-        """加载指定目录中的所有图像文件"""
-        self.image_files = []
+        """在后台线程中扫描指定目录中的图像文件，扫描结果分批加入表格"""
+        self.cancel_scan()
         
-        # 获取目录中的所有图像文件
-        try:
-            for file in os.listdir(path):
-                if file.lower().endswith(('.png', '.jpg', '.jpeg', '.bmp', '.webp')):
-                    self.image_files.append(os.path.join(path, file))
-        except Exception as e:
-            QMessageBox.warning(self, "错误", f"无法读取目录内容: {str(e)}")
-                
-        # 更新表格
-        self.update_table()
+        # 先清空表格，扫描到的图像流式追加
+        self.image_files = []
+        self.bulk_undo = []
+        self.undo_bulk_btn.setEnabled(False)
+        self.table_model.reset_rows([])
+        self.content_modified = False
+        self.sidecar_loader.start()
+        
+        self.scan_generation += 1
+        recursive = config.get_ui_config().get('scan_recursive', False)
+        self.scanner = DirectoryScanner(path, self.scan_generation, recursive, self)
+        self.scanner.images_found.connect(self.on_images_found)
+        self.scanner.scan_finished.connect(self.on_scan_finished)
+        self.scanner.scan_failed.connect(self.on_scan_failed)
+        self.scanner.finished.connect(self.scanner.deleteLater)
+        self.scanner.start()
+    
+    def cancel_scan(self):
+        """取消正在进行的目录扫描"""
+        if self.scanner is not None:
+            try:
+                self.scanner.cancel()
+            except RuntimeError:
+                # 扫描线程已结束并被删除
+                pass
+            self.scanner = None
+        self.scan_generation += 1
+    
+    def is_scanning(self):
+        return self.scanner is not None
+    
+    def on_images_found(self, generation, paths):
+        """扫描到一批图像，追加到表格"""
+        if generation != self.scan_generation:
+            return
+        self.image_files.extend(paths)
+        self.table_model.append_rows(paths)
+        self.sidecar_loader.add_paths(paths)
+    
+    def on_scan_finished(self, generation, total):
+        """目录扫描完成"""
+        if generation != self.scan_generation:
+            return
+        self.scanner = None
+        self.sidecar_loader.finish_paths()
+    
+    def on_scan_failed(self, generation, error_msg):
+        """目录扫描失败"""
+        if generation != self.scan_generation:
+            return
+        self.scanner = None
+        self.sidecar_loader.finish_paths()
+        QMessageBox.warning(self, "错误", f"无法读取目录内容: {error_msg}")
+    
+    def on_recursive_toggled(self, checked):
+        """切换是否包含子目录，并重新加载当前目录"""
+        ui_config = config.get_ui_config()
+        ui_config['scan_recursive'] = checked
+        config.save_ui_config(ui_config)
+        if self.current_path and self.dir_list.currentItem():
+            self.on_directory_clicked(None)
         
     def update_table(self):
         """更新图像表格内容（支持懒加载）"""
-        try:
-            self.table.itemChanged.disconnect(self.on_table_item_changed)
-        except Exception:
-            pass
-        self.table.setRowCount(len(self.image_files))
-        for i, image_path in enumerate(self.image_files):
-            # 只创建空的 QTableWidgetItem，实际缩略图数据懒加载
-            try:
-                item = QTableWidgetItem()
-                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                self.table.setItem(i, 0, item)
-                txt_file_path = os.path.splitext(image_path)[0] + ".txt"
-                en_label = ""
-                if os.path.exists(txt_file_path):
-                    try:
-                        with open(txt_file_path, 'r', encoding='utf-8') as f:
-                            en_label = f.read().strip()
-                    except Exception as e:
-                        print(f"读取标签文件出错: {e}")
-                if en_label:
-                    item = QTableWidgetItem(en_label)
-                    item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-                    self.table.setItem(i, 1, item)
-                else:
-                    item = QTableWidgetItem("")
-                    item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-                    self.table.setItem(i, 1, item)
-                item = QTableWidgetItem("")
-                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-                self.table.setItem(i, 2, item)
-                translate_button = QPushButton("翻译")
-                translate_button.clicked.connect(lambda _, row=i: self.translate_label(row))
-                self.table.setCellWidget(i, 3, translate_button)
-                label_button = QPushButton("打标")
-                label_button.clicked.connect(lambda _, row=i: self.label_image(row))
-                self.table.setCellWidget(i, 4, label_button)
-            except Exception as e:
-                print(f"加载图像出错: {e}")
+        self.cancel_scan()
+        # 行先显示出来，标签文件由后台线程读取后逐批填入
+        self.table_model.reset_rows(self.image_files)
         self.content_modified = False
-        self.table.itemChanged.connect(self.on_table_item_changed)
-        # 懒加载首次触发
-        self.lazy_load_table_images()
-    
-    def eventFilter(self, obj, event):
-        # 针对表格的懒加载优化
-        if obj == self.table.viewport():
-            if event.type() in (QEvent.Type.Paint, QEvent.Type.Resize, QEvent.Type.Wheel, QEvent.Type.Scroll):
-                self.lazy_load_table_images()
-        return super().eventFilter(obj, event)
-
-    def lazy_load_table_images(self):
-        # 只加载当前可见区域的图像缩略图，提升大数据集性能
-        visible_rows = self.get_visible_rows()
-        for row in visible_rows:
-            item = self.table.item(row, 0)
-            if item and not item.data(Qt.ItemDataRole.UserRole):
-                # 只在未加载过缩略图时加载
-                image_path = self.image_files[row]
-                item.setData(Qt.ItemDataRole.UserRole, image_path)
-                item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)
-        # 强制刷新可见区域
-        self.table.viewport().update()
-
-    def get_visible_rows(self):
-        # 获取表格当前可见的行索引
-        viewport = self.table.viewport()
-        rect = viewport.rect()
-        first = self.table.rowAt(rect.top())
-        last = self.table.rowAt(rect.bottom())
-        if last == -1:
-            last = self.table.rowCount() - 1
-        return range(max(0, first), min(self.table.rowCount(), last + 1))
+        self.sidecar_loader.reset(self.image_files)
+    
+    def on_sidecar_labels_loaded(self, generation, results):
+        """一批标签文件读取完成"""
+        self.table_model.apply_loaded_labels(results)
+    
+    def on_all_sidecars_loaded(self, generation):
+        """全部标签文件读取完成后自动提取触发词"""
+        self.auto_extract_trigger_word()
+        # 筛选条件依赖标签内容，读取完成后重新筛选
+        if self.table_model.is_filtered():
+            self.apply_filter()
+        # 继续启动时选择的未完成批量打标
+        run = self.pending_resume
+        if run is not None and run['directory'] == self.current_path:
+            self.pending_resume = None
+            self.resume_run(run)
+    
+    def offer_resume_runs(self):
+        """启动时提示继续最近一次未完成的批量打标"""
+        runs = find_unfinished_runs()
+        if not runs:
+            return
+        run = runs[0]
+        done = len(run['results'])
+        total = len(run['items'])
+        result = QMessageBox.question(
+            self,
+            "继续批量打标",
+            f"发现未完成的批量打标：\n目录: {run['directory']}\n打标服务: {run['labeler_type']}\n已完成: {done} / {total}\n\n"
+            f"是否载入已完成的结果并继续标注剩余图像？选择\"否\"将放弃该任务。",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if result != QMessageBox.StandardButton.Yes:
+            mark_abandoned(run)
+            return
+        directory = run['directory']
+        if not os.path.isdir(directory):
+            QMessageBox.warning(self, "警告", f"目录不存在: {directory}")
+            mark_abandoned(run)
+            return
+        
+        # 切换到该目录，标签文件读取完成后再写入结果并继续
+        items = self.dir_list.findItems(directory, Qt.MatchFlag.MatchExactly)
+        if not items:
+            self.dir_list.addItem(directory)
+            self.save_data()
+            items = self.dir_list.findItems(directory, Qt.MatchFlag.MatchExactly)
+        self.dir_list.setCurrentItem(items[0])
+        self.pending_resume = run
+        self.on_directory_clicked(None)
+    
+    def resume_run(self, run):
+        """
+        写入日志中已完成的打标结果，并将剩余图像作为新任务继续写入同一日志；
+        程序退出后已有打标（标签文件在此期间被写入）的图像保持不变，不再重新标注
+        """
+        store = self.label_store
+        restored = 0
+        for image_path, (en_label, zh_label) in run['results'].items():
+            row = store.row_of(image_path)
+            if row < 0:
+                continue
+            if not store.en_labels[row]:
+                self.table_model.set_en_label(row, en_label)
+                restored += 1
+            if zh_label and not store.zh_labels[row]:
+                self.table_model.set_zh_label(row, zh_label)
+        if restored:
+            self.content_modified = True
+        
+        items = []
+        for image_path in remaining_items(run):
+            row = store.row_of(image_path)
+            if row >= 0 and not store.en_labels[row] and not store.has_flag(row, FLAG_LABELING):
+                items.append((row, image_path))
+                self.table_model.set_row_flag(row, FLAG_LABELING, True)
+        
+        journal = LabelJournal(run['path'])
+        try:
+            labeler_type = LabelerType(run['labeler_type'])
+        except ValueError:
+            labeler_type = self.labeler.labeler_type
+        if not items:
+            journal.finish(RUN_FINISHED)
+        else:
+            self.submit_label_job(items, labeler_type=labeler_type, journal=journal)
+        QMessageBox.information(
+            self, "继续批量打标",
+            f"已载入 {restored} 条已完成的打标结果（请记得保存），剩余 {len(items)} 张图像继续标注"
+        )
+    
+    def apply_filter(self):
+        """按筛选框的关键词和模式筛选表格"""
+        self.filter_timer.stop()
+        shown = self.table_model.set_filter(self.filter_input.text(), self.filter_mode_combo.currentData())
+        if self.table_model.is_filtered():
+            self.filter_count_label.setText(f"显示 {shown} / {len(self.label_store)}")
+        else:
+            self.filter_count_label.setText("")
+    
+    def check_labels_loaded(self):
+        """批量操作前检查目录扫描和标签文件读取是否已全部完成"""
+        if self.is_scanning() or self.sidecar_loader.is_loading():
+            QMessageBox.information(self, "提示", "正在读取目录和标签文件，请稍候再试")
+            return False
+        return True
+    
+    def on_visible_range_changed(self, visible_rows, new_rows, prefetch_rows):
+        """可见范围变化：新进入可见区域的行优先读取标签文件，并预加载滚动方向上的缩略图"""
+        store_row = self.table_model.store_row
+        self.sidecar_loader.prioritize([store_row(row) for row in new_rows])
+        self.prefetch_thumbnails([store_row(row) for row in prefetch_rows])
 
     def label_image(self, row):
-        """标注单个图像"""
-        
-        image_path = self.image_files[row]
+        """标注单个图像：作为单行任务提交，优先于正在进行的批量打标执行"""
+        image_path = self.label_store.paths[row]
         
-        # 禁用打标按钮并更改文本
-        label_button = self.table.cellWidget(row, 4)
-        label_button.setText("正在打标...")
-        label_button.setEnabled(False)
-        
-        # 同时禁用翻译按钮，避免用户在打标过程中尝试翻译
-        translate_button = self.table.cellWidget(row, 3)
-        if translate_button:
-            translate_button.setEnabled(False)
-        
-        # 创建并启动打标线程，传入当前目录
-        self.labeling_thread = LabelingThread(image_path, row, self.labeler, self.current_path)
-        self.labeling_thread.labeling_done.connect(self.on_labeling_done)
-        self.labeling_thread.labeling_failed.connect(self.on_labeling_failed)
-        self.labeling_thread.start()
+        # 禁用打标按钮并更改文本，同时禁用翻译按钮，避免用户在打标过程中尝试翻译
+        self.table_model.set_row_flag(row, FLAG_LABELING, True)
+        self.submit_label_job([(row, image_path)], interactive=True)
+    
+    def submit_label_job(self, items, interactive=False, labeler_type=None, journal=None):
+        """
+        提交打标任务，items 为 [(行号, 图片路径), ...]
+        批量任务写入打标日志，继续未完成的日志时传入 labeler_type 和已有的 journal
+        """
+        if labeler_type is None:
+            labeler_type = self.labeler.labeler_type
+            title = f"打标 ({self.model_combo.currentText()})"
+        else:
+            title = f"继续打标 ({labeler_type.value})"
+        if not interactive and journal is None:
+            try:
+                journal = LabelJournal.create(self.current_path, labeler_type.value, [path for _, path in items])
+            except OSError as e:
+                print(f"创建打标日志失败: {e}")
+        metrics = None if interactive else RunMetrics.create(len(items), labeler_type.value)
+        handler = make_label_handler(self.labeler, labeler_type, self.current_path, config.snapshot(), metrics)
+        job_id = self.scheduler.submit('label', labeler_type.value, title, items, handler, interactive)
+        self.job_rows[job_id] = [row for row, _ in items]
+        self.job_kinds[job_id] = ('label', interactive)
+        if journal is not None:
+            self.journals[job_id] = journal
+        if metrics is not None:
+            self.run_metrics[job_id] = metrics
+            self.job_panel.set_metrics(job_id, metrics)
+        return job_id
+    
+    def interrupt_jobs(self):
+        """
+        中断当前目录的任务（切换目录时），批量打标日志保留为未完成，下次启动时可以继续；
+        全部目录打标的结果直接写入标签文件，不受切换目录影响
+        """
+        self.interrupting_jobs = True
+        try:
+            for job in self.scheduler.active_jobs():
+                if job.kind != DATASET_JOB_KIND:
+                    # 行号不再对应原来的图片，正在处理的工作项结果一并丢弃
+                    self.scheduler.cancel(job.job_id, discard_results=True)
+        finally:
+            self.interrupting_jobs = False
+    
+    def submit_translate_job(self, items, interactive=False):
+        """提交翻译任务，items 为 [(行号, 英文文本), ...]，批量任务按块分为多个工作项"""
+        work_items = [items] if interactive else chunk_items(items)
+        job_id = self.scheduler.submit('translate', 'translate', "翻译", work_items, translate_handler, interactive)
+        self.job_rows[job_id] = [row for row, _ in items]
+        self.job_kinds[job_id] = ('translate', interactive)
+        return job_id
+    
+    def on_job_item_done(self, job_id, row, result):
+        """任务中一行处理成功"""
+        if job_id not in self.job_rows:
+            # 全部目录打标由 DatasetLabelRun 处理；切换目录而取消的任务结果尚在队列中时，行号已不再对应原来的图片
+            return
+        kind, _ = self.job_kinds[job_id]
+        if kind == 'label':
+            if is_failed_result(result):
+                # 错误信息不写入表格和打标日志，继续时重新标注
+                error = result.get('description') if isinstance(result, dict) else "返回结果格式不正确"
+                self.on_labeling_failed(row, f"打标失败: {error}")
+                return
+            self.on_labeling_done(row, result)
+            journal = self.journals.get(job_id)
+            if journal is not None:
+                store = self.label_store
+                journal.record_result(store.paths[row], store.en_labels[row], store.zh_labels[row])
+        else:
+            self.on_translation_done(row, result)
+    
+    def on_job_item_failed(self, job_id, row, error_msg):
+        """任务中一行处理失败"""
+        if job_id not in self.job_rows:
+            return
+        kind, _ = self.job_kinds[job_id]
+        if kind == 'label':
+            self.on_labeling_failed(row, error_msg)
+        else:
+            self.on_translation_failed(row, error_msg)
+    
+    def on_job_finished(self, job_id, success_count, state):
+        """任务完成或被取消：恢复未处理行的按钮，批量任务完成时提示结果"""
+        if job_id not in self.job_kinds:
+            # 全部目录打标由 DatasetLabelRun 处理
+            return
+        kind, interactive = self.job_kinds.pop(job_id)
+        rows = self.job_rows.pop(job_id, [])
+        journal = self.journals.pop(job_id, None)
+        if journal is not None:
+            if self.interrupting_jobs:
+                journal.close()
+            else:
+                journal.finish(RUN_CANCELLED if state == JOB_CANCELLED else RUN_FINISHED)
+        metrics = self.run_metrics.pop(job_id, None)
+        summary = metrics.close(state) if metrics is not None else None
+        flag = FLAG_LABELING if kind == 'label' else FLAG_TRANSLATING
+        for row in rows:
+            if row < len(self.label_store) and self.label_store.has_flag(row, flag):
+                self.table_model.set_row_flag(row, flag, False)
+        if interactive or state == JOB_CANCELLED:
+            return
+        if kind == 'label':
+            if success_count > 0:
+                message = f"成功标注了 {success_count} 张图像"
+                if summary is not None and summary['elapsed'] > 0:
+                    message += (
+                        f"\n耗时 {format_duration(summary['elapsed'])}，"
+                        f"平均 {summary['done'] / summary['elapsed']:.2f} 张/秒，错误率 {summary['error_rate'] or 0:.1%}"
+                    )
+                QMessageBox.information(self, "标注完成", message)
+            else:
+                QMessageBox.information(self, "标注完成", "没有图像被成功标注")
+        else:
+            if success_count > 0:
+                QMessageBox.information(self, "翻译完成", f"成功翻译了 {success_count} 个标签")
+            else:
+                QMessageBox.information(self, "翻译完成", "没有标签被成功翻译")
     
     def on_labeling_done(self, row, result):
         """打标成功的回调函数"""
@@ -702,176 +1059,91 @@ class ImageLabelAssistant(QMainWindow):
         if trigger_word:
             description = f"{trigger_word}, {description}"
         
-        # 临时断开信号连接，避免触发修改标记
-        self.table.itemChanged.disconnect(self.on_table_item_changed)
-        
         # 更新英文描述（只使用description部分）
-        item = QTableWidgetItem(description)
-        item.setFlags(item.flags() | Qt.ItemFlag.ItemIsEditable)
-        self.table.setItem(row, 1, item)
+        self.table_model.set_en_label(row, description)
         
         # 更新中文翻译，如果有的话
         if zh_translation:
             # Gemini已提供中文翻译
-            item = QTableWidgetItem(zh_translation)
-            item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)  # 设置为不可编辑
-            self.table.setItem(row, 2, item)
-
-        # 恢复信号连接
-        self.table.itemChanged.connect(self.on_table_item_changed)
+            self.table_model.set_zh_label(row, zh_translation)
         
         # 将打标也视为内容修改，以便在切换目录时得到保存提示
         self.content_modified = True
         
-        # 恢复打标按钮
-        label_button = self.table.cellWidget(row, 4)
-        label_button.setText("打标")
-        label_button.setEnabled(True)
-        
-        # 恢复翻译按钮
-        translate_button = self.table.cellWidget(row, 3)
-        if translate_button:
-            translate_button.setText("翻译")
-            translate_button.setEnabled(True)
+        # 恢复打标按钮和翻译按钮
+        self.table_model.set_row_flag(row, FLAG_LABELING | FLAG_TRANSLATING, False)
     
     def on_labeling_failed(self, row, error_msg):
         """打标失败的回调函数"""
-        # 恢复打标按钮
-        label_button = self.table.cellWidget(row, 4)
-        if label_button:
-            label_button.setText("打标")
-            label_button.setEnabled(True)
-            
-        # 恢复翻译按钮
-        translate_button = self.table.cellWidget(row, 3)
-        if translate_button:
-            translate_button.setText("翻译")
-            translate_button.setEnabled(True)
+        print(error_msg)
+        # 恢复打标按钮和翻译按钮
+        self.table_model.set_row_flag(row, FLAG_LABELING | FLAG_TRANSLATING, False)
     
     def translate_label(self, row):
         """翻译单个标签"""
-        en_label_item = self.table.item(row, 1)
+        # 获取英文标签
+        en_label = self.label_store.en_labels[row]
         
-        if not en_label_item or not en_label_item.text():
+        if not en_label:
             QMessageBox.warning(self, "警告", "请先添加英文标签")
             return
         
-        # 获取英文标签
-        en_label = en_label_item.text()
-        
         # 禁用翻译按钮并更改文本
-        translate_button = self.table.cellWidget(row, 3)
-        translate_button.setText("正在翻译...")
-        translate_button.setEnabled(False)
-        
-        # 创建并启动翻译线程
-        self.translate_thread = TranslateThread(en_label, row)
-        self.translate_thread.translation_done.connect(self.on_translation_done)
-        self.translate_thread.translation_failed.connect(self.on_translation_failed)
-        self.translate_thread.start()
+        self.table_model.set_row_flag(row, FLAG_TRANSLATING, True)
+        self.submit_translate_job([(row, en_label)], interactive=True)
     
     def on_translation_done(self, row, translated):
         """翻译成功的回调函数"""
-        # 临时断开信号连接，避免触发修改标记
-        self.table.itemChanged.disconnect(self.on_table_item_changed)
-        
         # 更新中文翻译
-        item = QTableWidgetItem(translated)
-        item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)  # 设置为不可编辑
-        self.table.setItem(row, 2, item)
-        
-        # 恢复信号连接
-        self.table.itemChanged.connect(self.on_table_item_changed)
+        self.table_model.set_zh_label(row, translated)
         
         # 将翻译也视为内容修改，以便在切换目录时得到保存提示
         self.content_modified = True
         
         # 恢复翻译按钮
-        translate_button = self.table.cellWidget(row, 3)
-        translate_button.setText("翻译")
-        translate_button.setEnabled(True)
+        self.table_model.set_row_flag(row, FLAG_TRANSLATING, False)
     
     def on_translation_failed(self, row, error_msg):
         """翻译失败的回调函数"""
         # 更新中文翻译为错误信息
-        item = QTableWidgetItem(error_msg)
-        item.setFlags(item.flags() & ~Qt.ItemFlag.ItemIsEditable)  # 设置为不可编辑
-        self.table.setItem(row, 2, item)
+        self.table_model.set_zh_label(row, error_msg)
         
         # 恢复翻译按钮
-        translate_button = self.table.cellWidget(row, 3)
-        translate_button.setText("翻译")
-        translate_button.setEnabled(True)
+        self.table_model.set_row_flag(row, FLAG_TRANSLATING, False)
         
     def translate_all_labels(self):
         """翻译所有标签"""
         if not self.image_files:
             QMessageBox.information(self, "提示", "没有可翻译的标签")
             return
-            
-        # 禁用一键翻译按钮
-        self.translate_all_btn.setText("正在翻译...")
-        self.translate_all_btn.setEnabled(False)
+        if not self.check_labels_loaded():
+            return
         
-        # 收集需要翻译的文本和对应的行号
+        # 收集需要翻译的文本和对应的行号，已在翻译中的行跳过
         translations_to_do = []
-        for row in range(len(self.image_files)):
-            en_label_item = self.table.item(row, 1)
-            
-            if en_label_item and en_label_item.text():
-                # 如果有英文标签但没有中文翻译或中文翻译为空
-                zh_label_item = self.table.item(row, 2)
-                if not zh_label_item or not zh_label_item.text():
-                    # 收集需要翻译的英文文本和行号
-                    translations_to_do.append((row, en_label_item.text()))
-                    
-                    # 禁用该行的翻译按钮
-                    translate_button = self.table.cellWidget(row, 3)
-                    translate_button.setText("正在翻译...")
-                    translate_button.setEnabled(False)
+        store = self.label_store
+        for row in range(len(store)):
+            # 如果有英文标签但没有中文翻译或中文翻译为空
+            if store.en_labels[row] and not store.zh_labels[row] and not store.has_flag(row, FLAG_TRANSLATING):
+                translations_to_do.append((row, store.en_labels[row]))
+                
+                # 禁用该行的翻译按钮
+                self.table_model.set_row_flag(row, FLAG_TRANSLATING, True)
         
         if not translations_to_do:
-            self.translate_all_btn.setText("一键翻译")
-            self.translate_all_btn.setEnabled(True)
             QMessageBox.information(self, "提示", "没有需要翻译的标签")
             return
         
-        # 创建批量翻译线程
-        self.batch_translate_thread = TranslateThread("", 0)
-        self.batch_translate_thread.set_batch_mode(translations_to_do)
-        
-        # 连接信号
-        self.batch_translate_thread.translation_done.connect(self.on_translation_done)
-        self.batch_translate_thread.translation_failed.connect(self.on_translation_failed)
-        self.batch_translate_thread.all_translations_completed.connect(self.on_all_translations_completed)
-        
-        # 启动线程
-        self.batch_translate_thread.start()
-    
-    def on_all_translations_completed(self, success_count):
-        """所有翻译完成时的处理"""
-        # 恢复按钮状态
-        self.translate_all_btn.setText("一键翻译")
-        self.translate_all_btn.setEnabled(True)
-        
-        # 确保所有翻译按钮都已启用
-        for row in range(len(self.image_files)):
-            translate_button = self.table.cellWidget(row, 3)
-            if translate_button and not translate_button.isEnabled():
-                translate_button.setText("翻译")
-                translate_button.setEnabled(True)
-        
-        # 根据是否有成功翻译的标签显示不同消息
-        if success_count > 0:
-            QMessageBox.information(self, "翻译完成", f"成功翻译了 {success_count} 个标签")
-        else:
-            QMessageBox.information(self, "翻译完成", "没有标签被成功翻译")
+        # 提交批量翻译任务，进度显示在任务面板中
+        self.submit_translate_job(translations_to_do)
     
     def label_all_images(self):
         """标注所有图像"""
         if not self.image_files:
             QMessageBox.information(self, "提示", "没有可标注的图像")
             return
+        if not self.check_labels_loaded():
+            return
             
         # 确认操作
         result = QMessageBox.question(
@@ -884,100 +1156,333 @@ class ImageLabelAssistant(QMainWindow):
         if result != QMessageBox.StandardButton.Yes:
             return
         
-        # 收集需要标注的图像
+        # 收集需要标注的图像，已在打标中的行跳过
         images_to_label = []
-        for row in range(len(self.image_files)):
-            # 获取英文标签
-            en_label_item = self.table.item(row, 1)
-            
+        store = self.label_store
+        for row in range(len(store)):
             # 如果英文标签为空，则需要标注
-            if not en_label_item or not en_label_item.text():
-                images_to_label.append((row, self.image_files[row]))
+            if not store.en_labels[row] and not store.has_flag(row, FLAG_LABELING):
+                images_to_label.append((row, store.paths[row]))
                 
                 # 禁用该行的打标按钮
-                label_button = self.table.cellWidget(row, 4)
-                if label_button:
-                    label_button.setText("正在打标...")
-                    label_button.setEnabled(False)
+                self.table_model.set_row_flag(row, FLAG_LABELING, True)
         
         if not images_to_label:
             QMessageBox.information(self, "提示", "所有图像已标注")
             return
         
-        # 禁用一键打标按钮
-        self.label_all_btn.setEnabled(False)
-        
-        # 创建批量打标线程，传入当前目录
-        self.batch_labeling_thread = LabelingThread("", 0, self.labeler, self.current_path)
-        self.batch_labeling_thread.set_batch_mode(images_to_label)
-        
-        # 连接信号
-        self.batch_labeling_thread.labeling_done.connect(self.on_labeling_done)
-        self.batch_labeling_thread.labeling_failed.connect(self.on_labeling_failed)
-        self.batch_labeling_thread.all_labeling_completed.connect(self.on_all_labeling_completed)
-        
-        # 启动线程
-        self.batch_labeling_thread.start()
-    
-    def on_all_labeling_completed(self, success_count):
-        """所有标注完成时的处理"""
-        # 恢复按钮状态
-        self.label_all_btn.setText("一键打标")
-        self.label_all_btn.setEnabled(True)
-        
-        # 检查所有行，确保所有翻译按钮和打标按钮都已启用
-        for row in range(len(self.image_files)):
-            # 恢复翻译按钮
-            translate_button = self.table.cellWidget(row, 3)
-            if translate_button and not translate_button.isEnabled():
-                translate_button.setText("翻译")
-                translate_button.setEnabled(True)
-                
-            # 恢复打标按钮
-            label_button = self.table.cellWidget(row, 4)
-            if label_button and not label_button.isEnabled():
-                label_button.setText("打标")
-                label_button.setEnabled(True)
-        
-        # 根据是否有成功标注的图像显示不同消息
-        if success_count > 0:
-            QMessageBox.information(self, "标注完成", f"成功标注了 {success_count} 张图像")
-        else:
-            QMessageBox.information(self, "标注完成", "没有图像被成功标注")
+        # 提交批量打标任务，进度显示在任务面板中
+        self.submit_label_job(images_to_label)
     
+    def label_all_datasets(self):
+        """
+        为目录列表中的全部目录打标：后台扫描出没有标签文件的图片，按目录提示词分组提交，
+        共用同一个调度器和模型，结果直接写入标签文件，进度按目录显示
+        """
+        if self.dataset_scan is not None or (self.dataset_run is not None and self.dataset_run.is_active()):
+            QMessageBox.information(self, "提示", "全部目录打标正在进行中")
+            if self.dataset_dialog is not None:
+                self.dataset_dialog.show()
+                self.dataset_dialog.raise_()
+            return
+        directories = [d['path'] for d in config.get_directories() if os.path.isdir(d['path'])]
+        if not directories:
+            QMessageBox.information(self, "提示", "目录列表中没有可打标的目录")
+            return
+        result = QMessageBox.question(
+            self,
+            "确认操作",
+            f"此操作将标注 {len(directories)} 个目录中所有没有标签文件的图像，结果直接写入标签文件，是否继续？",
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+        if result != QMessageBox.StandardButton.Yes:
+            return
+        self.label_datasets_btn.setEnabled(False)
+        self.label_datasets_btn.setText("正在扫描目录...")
+        self.dataset_scan = DatasetScanThread(directories, self.recursive_check.isChecked(), self)
+        self.dataset_scan.scan_finished.connect(self.on_dataset_scan_finished)
+        self.dataset_scan.finished.connect(self.on_dataset_scan_thread_finished)
+        self.dataset_scan.start()
+
+    def on_dataset_scan_thread_finished(self):
+        """扫描线程结束（完成或取消），没有开始打标时恢复按钮"""
+        self.dataset_scan = None
+        if self.dataset_run is None or not self.dataset_run.is_active():
+            self.label_datasets_btn.setEnabled(True)
+            self.label_datasets_btn.setText("全部目录打标")
+
+    def on_dataset_scan_finished(self, dataset_images):
+        """全部目录扫描完成：跳过当前表格中已有打标或正在打标的图片，提交打标任务"""
+        store = self.label_store
+        images_by_directory = []
+        self.dataset_paths = set()
+        for directory, images in dataset_images:
+            if directory == self.current_path:
+                # 当前目录中未保存的打标和正在进行的单行打标优先
+                selected = []
+                for image_path in images:
+                    row = store.row_of(image_path)
+                    if row >= 0 and (store.en_labels[row] or store.has_flag(row, FLAG_LABELING)):
+                        continue
+                    selected.append(image_path)
+                    if row >= 0:
+                        self.dataset_paths.add(image_path)
+                        self.table_model.set_row_flag(row, FLAG_LABELING, True)
+                images = selected
+            images_by_directory.append((directory, images))
+        if not any(images for _, images in images_by_directory):
+            QMessageBox.information(self, "提示", "所有目录的图像已标注")
+            return
+
+        # 触发词：目录配置中的 trigger_word，当前目录使用界面上填写的触发词
+        trigger_words = {d['path']: d.get('trigger_word', '') for d in config.get_directories()}
+        if self.current_path and self.trigger_input.text().strip():
+            trigger_words[self.current_path] = self.trigger_input.text().strip()
+
+        self.dataset_run = DatasetLabelRun(self.scheduler, images_by_directory, self)
+        self.dataset_run.image_labeled.connect(self.on_dataset_image_labeled)
+        self.dataset_run.image_failed.connect(self.on_dataset_image_failed)
+        self.dataset_run.run_finished.connect(self.on_dataset_run_finished)
+        if self.dataset_dialog is not None:
+            self.dataset_dialog.deleteLater()
+        self.dataset_dialog = DatasetProgressDialog(self.dataset_run, self)
+        self.dataset_run.submit(self.labeler, self.labeler.labeler_type, config.snapshot(), trigger_words)
+        for job_id, metrics in self.dataset_run.metrics.items():
+            self.job_panel.set_metrics(job_id, metrics)
+        self.label_datasets_btn.setText("全部目录打标中...")
+        self.dataset_dialog.show()
+
+    def on_dataset_image_labeled(self, image_path, description, zh_translation):
+        """全部目录打标完成一张图片：图片在当前表格中时同步显示（标签文件已写入，不标记为未保存）"""
+        if image_path not in self.dataset_paths:
+            # 不在当前目录中（或已切换目录）
+            return
+        self.dataset_paths.discard(image_path)
+        store = self.label_store
+        row = store.row_of(image_path)
+        if row < 0:
+            return
+        if not store.en_labels[row]:
+            self.table_model.set_en_label(row, description)
+            if zh_translation:
+                self.table_model.set_zh_label(row, zh_translation)
+            self.table_model.mark_saved([(row, image_path, description)])
+        self.table_model.set_row_flag(row, FLAG_LABELING, False)
+
+    def on_dataset_image_failed(self, directory, image_path, error_msg):
+        """全部目录打标一张图片失败（原因显示在进度对话框中）：恢复当前表格中该行的打标按钮"""
+        if image_path not in self.dataset_paths:
+            return
+        self.dataset_paths.discard(image_path)
+        row = self.label_store.row_of(image_path)
+        if row >= 0:
+            self.table_model.set_row_flag(row, FLAG_LABELING, False)
+
+    def on_dataset_run_finished(self, success_count, failed_count, cancelled):
+        """全部目录打标结束：恢复当前目录中未完成行的按钮并提示结果"""
+        store = self.label_store
+        for image_path in self.dataset_paths:
+            row = store.row_of(image_path)
+            if row >= 0 and store.has_flag(row, FLAG_LABELING):
+                self.table_model.set_row_flag(row, FLAG_LABELING, False)
+        self.dataset_paths = set()
+        self.label_datasets_btn.setEnabled(True)
+        self.label_datasets_btn.setText("全部目录打标")
+        if cancelled or self.interrupting_jobs:
+            return
+        QMessageBox.information(
+            self, "标注完成",
+            f"全部目录打标完成：成功标注了 {success_count} 张图像，失败 {failed_count} 张"
+        )
+
     def save_all_labels(self):
-        """保存所有标签到文本文件"""
+        """保存所有已修改的标签到文本文件"""
         if not self.image_files:
             QMessageBox.information(self, "提示", "没有可保存的标签")
             return
-            
-        saved_count = 0
-        for row in range(len(self.image_files)):
-            image_path = self.image_files[row]
-            filename = os.path.splitext(os.path.basename(image_path))[0] + ".txt"
-            save_path = os.path.join(os.path.dirname(image_path), filename)
-            
-            # 获取标签内容
-            en_label_item = self.table.item(row, 1)
-            
-            if en_label_item and en_label_item.text():
-                en_label = en_label_item.text()
-                
-                try:
-                    with open(save_path, 'w', encoding='utf-8') as f:
-                        f.write(en_label)
-                    saved_count += 1
-                except Exception as e:
-                    print(f"保存标签时出错: {e}")
-        
-        # 重置修改状态
-        self.content_modified = False
+        if self.is_saving():
+            QMessageBox.information(self, "提示", "正在保存，请稍候")
+            return
+        if not self.save_dirty_labels(silent=False):
+            # 没有需要写入的文件
+            self.content_modified = False
+            QMessageBox.information(self, "提示", "没有需要保存的修改")
+    
+    def save_dirty_labels(self, silent):
+        """
+        在后台线程中只保存已修改的行，返回是否启动了保存。
+        silent 为 True 时（自动保存）完成后不弹出提示
+        """
+        store = self.label_store
+        items = []
+        empty_rows = []
+        for row in self.table_model.dirty_rows():
+            en_label = store.en_labels[row]
+            if en_label:
+                items.append((row, store.paths[row], en_label))
+            else:
+                # 空标签不写入文件，保留磁盘上原有内容
+                empty_rows.append((row, store.paths[row], en_label))
+        self.table_model.mark_saved(empty_rows)
+        if not items:
+            return False
+        
+        self.save_all_btn.setEnabled(False)
+        self.save_all_btn.setText(f"正在保存 (0/{len(items)})")
+        self.save_thread = LabelSaveThread(items, self)
+        self.save_thread.progress.connect(self.on_save_progress)
+        self.save_thread.rows_saved.connect(self.table_model.mark_saved)
+        self.save_thread.save_finished.connect(lambda saved, failed: self.on_save_finished(saved, failed, silent))
+        self.save_thread.finished.connect(self.save_thread.deleteLater)
+        self.save_thread.start()
+        return True
+    
+    def is_saving(self):
+        return self.save_thread is not None
+    
+    def on_save_progress(self, done, total):
+        self.save_all_btn.setText(f"正在保存 ({done}/{total})")
+    
+    def on_save_finished(self, saved_count, failed_count, silent):
+        """保存完成，保存期间又有修改时继续自动保存"""
+        self.save_thread = None
+        self.save_all_btn.setText("一键保存")
+        self.save_all_btn.setEnabled(True)
+        has_dirty = bool(self.table_model.dirty_rows())
+        if not has_dirty:
+            # 重置修改状态
+            self.content_modified = False
+        elif self.autosave_check.isChecked():
+            self.autosave_timer.start()
+        
+        if failed_count:
+            QMessageBox.warning(self, "保存失败", f"已保存 {saved_count} 个标签文件，{failed_count} 个保存失败")
+        elif silent:
+            print(f"已自动保存 {saved_count} 个标签文件")
+        else:
+            QMessageBox.information(self, "保存成功", f"已成功保存 {saved_count} 个标签文件")
+    
+    def bulk_edit_labels(self):
+        """批量编辑英文打标：在后台线程中转换打标快照，完成后一次性写入表格"""
+        if not self.image_files:
+            QMessageBox.information(self, "提示", "没有可编辑的打标")
+            return
+        if not self.check_labels_loaded():
+            return
+        if self.bulk_edit_thread is not None:
+            QMessageBox.information(self, "提示", "正在执行批量编辑，请稍候")
+            return
         
-        QMessageBox.information(self, "保存成功", f"已成功保存 {saved_count} 个标签文件")
+        dialog = BulkEditDialog(self.trigger_input.text().strip(), self.table_model.is_filtered(), self)
+        if dialog.exec() != QDialog.DialogCode.Accepted:
+            return
+        
+        model = self.table_model
+        if dialog.only_filtered():
+            rows = [model.store_row(view_row) for view_row in range(model.rowCount())]
+        else:
+            rows = list(range(len(self.label_store)))
+        texts = [self.label_store.en_labels[row] for row in rows]
+        
+        self.bulk_edit_btn.setEnabled(False)
+        self.bulk_edit_btn.setText("正在编辑...")
+        self.bulk_edit_paths = list(self.label_store.paths)
+        self.bulk_edit_thread = BulkEditThread(build_transform(dialog.get_operation()), rows, texts, self)
+        self.bulk_edit_thread.edit_ready.connect(self.on_bulk_edit_ready)
+        self.bulk_edit_thread.edit_failed.connect(self.on_bulk_edit_failed)
+        self.bulk_edit_thread.finished.connect(self.bulk_edit_thread.deleteLater)
+        self.bulk_edit_thread.start()
+    
+    def finish_bulk_edit(self):
+        self.bulk_edit_thread = None
+        self.bulk_edit_btn.setEnabled(True)
+        self.bulk_edit_btn.setText("批量编辑")
+    
+    def on_bulk_edit_ready(self, changes):
+        """写入批量编辑结果并保存撤销记录"""
+        self.finish_bulk_edit()
+        # 转换期间切换了目录时放弃结果
+        if self.bulk_edit_paths != self.label_store.paths:
+            return
+        applied = self.apply_label_changes(changes)
+        if not applied:
+            QMessageBox.information(self, "批量编辑", "没有打标被修改")
+            return
+        self.bulk_undo = [(row, self.label_store.paths[row], old, new) for row, old, new in applied]
+        self.undo_bulk_btn.setEnabled(True)
+        QMessageBox.information(self, "批量编辑", f"已修改 {len(applied)} 条打标，可点击\"撤销批量编辑\"恢复")
+    
+    def on_bulk_edit_failed(self, error_msg):
+        self.finish_bulk_edit()
+        QMessageBox.warning(self, "批量编辑失败", error_msg)
+    
+    def apply_label_changes(self, changes):
+        """一次性写入多行打标修改，保持表格滚动位置"""
+        scroll_value = self.table.verticalScrollBar().value()
+        applied = self.table_model.apply_bulk_edit(changes)
+        if applied:
+            self.content_modified = True
+            self.table.verticalScrollBar().setValue(scroll_value)
+        return applied
+    
+    def undo_bulk_edit(self):
+        """撤销最近一次批量编辑，撤销后又被修改过的行保持不变"""
+        store = self.label_store
+        changes = [
+            (row, new, old) for row, image_path, old, new in self.bulk_undo
+            if row < len(store) and store.paths[row] == image_path
+        ]
+        self.bulk_undo = []
+        self.undo_bulk_btn.setEnabled(False)
+        applied = self.apply_label_changes(changes)
+        QMessageBox.information(self, "撤销批量编辑", f"已恢复 {len(applied)} 条打标")
+    
+    def on_row_dirtied(self, row):
+        """英文打标被修改，开启自动保存时重新开始计时"""
+        if self.autosave_check.isChecked():
+            self.autosave_timer.start()
+    
+    def autosave_labels(self):
+        """自动保存已修改的行，上一次保存尚未完成时稍后再试"""
+        if self.is_saving():
+            self.autosave_timer.start()
+            return
+        self.save_dirty_labels(silent=True)
+    
+    def on_autosave_toggled(self, checked):
+        """切换自动保存，开启时立即保存已有的修改"""
+        ui_config = config.get_ui_config()
+        ui_config['autosave'] = checked
+        config.save_ui_config(ui_config)
+        if checked:
+            self.autosave_timer.start()
+        else:
+            self.autosave_timer.stop()
+    
+    def closeEvent(self, event):
+        """关闭窗口前停止打标和翻译任务、等待后台保存完成，开启自动保存时写入尚未保存的修改"""
+        self.interrupting_jobs = True
+        if self.dataset_scan is not None:
+            self.dataset_scan.cancel()
+            self.dataset_scan.wait()
+        self.scheduler.shutdown()
+        self.thumbnail_loader.shutdown()
+        self.autosave_timer.stop()
+        if self.save_thread is not None:
+            self.save_thread.wait()
+        if self.autosave_check.isChecked():
+            store = self.label_store
+            for row in self.table_model.dirty_rows():
+                if store.en_labels[row]:
+                    try:
+                        write_sidecar(store.paths[row], store.en_labels[row])
+                    except Exception as e:
+                        print(f"保存标签时出错: {e}")
+        super().closeEvent(event)
 
-    def on_table_item_changed(self, item):
-        # 现在仅作占位，所有内容修改逻辑已交由 TextEditDelegate 处理
-        pass
+    def on_label_edited(self, row):
+        """英文打标被手动编辑时标记内容已修改"""
+        self.content_modified = True
 
     def on_model_changed(self):
         """模型选择变化时的回调函数"""
@@ -1023,30 +1528,47 @@ class ImageLabelAssistant(QMainWindow):
         print(f"当前选择的模型: {selected_model}")
 
     def get_thumbnail(self, image_path):
-        # 缓存大尺寸缩略图，避免放大导致模糊
-        max_thumb_size = 400
-        if image_path in self.thumbnail_cache:
-            return self.thumbnail_cache[image_path]
-        pixmap = QPixmap(image_path)
-        # 只缩小，不放大
-        if pixmap.width() > max_thumb_size or pixmap.height() > max_thumb_size:
-            thumbnail = pixmap.scaled(
-                max_thumb_size, max_thumb_size, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation
-            )
-        else:
-            thumbnail = pixmap
-        self.thumbnail_cache[image_path] = thumbnail
+        """从缓存获取缩略图，未缓存时提交后台解码并返回None"""
+        thumbnail = self.thumbnail_cache.get(image_path)
+        if thumbnail is None:
+            # 可见行优先于预加载行解码
+            self.thumbnail_loader.request(image_path, priority=1)
         return thumbnail
+    
+    def prefetch_thumbnails(self, rows):
+        """预加载可见区域之外若干行的缩略图，快速滚动时也能命中缓存"""
+        store = self.label_store
+        for row in rows:
+            image_path = store.paths[row]
+            if image_path not in self.thumbnail_cache:
+                self.thumbnail_loader.request(image_path, priority=0)
+    
+    def print_thumbnail_cache_stats(self):
+        """打印缩略图内存缓存的命中率统计"""
+        stats = self.thumbnail_cache.stats()
+        if stats['hits'] + stats['misses'] == 0:
+            return
+        print(
+            f"缩略图缓存: {stats['items']} 张, {stats['bytes'] / 1024 / 1024:.1f}/{stats['max_bytes'] / 1024 / 1024:.0f} MB, "
+            f"命中率 {stats['hit_rate']:.1%}, 淘汰 {stats['evictions']} 张"
+        )
+    
+    def on_thumbnail_ready(self, image_path, image):
+        """缩略图解码完成，转换为QPixmap并刷新对应行"""
+        # 解码失败时缓存空图，避免反复解码
+        self.thumbnail_cache.put(image_path, QPixmap.fromImage(image))
+        row = self.label_store.row_of(image_path)
+        if row >= 0:
+            self.table_model.refresh_image(row)
 
-    def on_table_cell_double_clicked(self, row, column):
+    def on_table_cell_double_clicked(self, index):
         # 仅对图片列（第0列）响应
-        if column == 0:
-            item = self.table.item(row, 0)
-            if item is not None:
-                image_path = item.data(Qt.ItemDataRole.UserRole)
-                if image_path:
-                    dlg = ImageDialog(image_path, self)
-                    dlg.exec()
+        if index.column() == COL_IMAGE:
+            image_path = index.data(Qt.ItemDataRole.UserRole)
+            if image_path:
+                # 缓存中的缩略图作为首帧，对话框打开时立即显示
+                dlg = ImageDialog(image_path, self, self.thumbnail_cache.get(image_path))
+                dlg.exec()
 
 def load_stylesheet():
     """加载QSS样式表"""
@@ -1058,6 +1580,8 @@ def load_stylesheet():
     return ""
 
 if __name__ == "__main__":
+    # 设置环境变量 IMAGE_LABEL_PROFILE=spans/cprofile/torch 开启性能分析
+    start_profiling()
     app = QApplication(sys.argv)
     
     # 应用样式表
@@ -1066,4 +1590,6 @@ if __name__ == "__main__":
     window = ImageLabelAssistant()
     window.show()
 
-    sys.exit(app.exec())
+    exit_code = app.exec()
+    stop_profiling()
+    sys.exit(exit_code)
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+
+class MemoryLRUCache:
+    """
+    按字节预算限制的LRU内存缓存。
+    size_fn 计算每个值占用的字节数，总量超过预算时淘汰最久未使用的条目，
+    并统计命中率，便于调整缓存大小。
+    未命中的键在放入之前（例如后台解码期间反复重绘）只计一次未命中。
+    """
+
+    def __init__(self, max_bytes, size_fn):
+        self.max_bytes = max_bytes
+        self.size_fn = size_fn
+        self.entries = OrderedDict()  # key -> (value, 字节数)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.missed = set()  # 已计入未命中、尚未放入的键
+
+    def __contains__(self, key):
+        # 只检查是否存在，不计入命中统计，也不改变使用顺序
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            if key not in self.missed:
+                self.missed.add(key)
+                self.misses += 1
+            return default
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, value):
+        size = self.size_fn(value)
+        self.missed.discard(key)
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= old[1]
+        self.entries[key] = (value, size)
+        self.total_bytes += size
+        # 至少保留刚放入的条目
+        while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+            self.evictions += 1
+
+    def clear(self):
+        self.entries.clear()
+        self.total_bytes = 0
+        self.missed.clear()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """返回缓存统计信息"""
+        requests = self.hits + self.misses
+        return {
+            'items': len(self.entries),
+            'bytes': self.total_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / requests if requests else 0.0,
+            'evictions': self.evictions,
+        }
@@ -0,0 +1,201 @@
+import os
+import json
+import math
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from label_journal import RUNS_DIR
+
+# 单张图片打标的阶段：读取解码、预处理/上传、模型推理（在线API为请求耗时）、解析结果
+STAGES = ('decode', 'upload', 'inference', 'parse')
+STAGE_NAMES = {
+    'decode': "解码",
+    'upload': "上传",
+    'inference': "推理",
+    'parse': "解析",
+}
+# 滚动统计使用最近多少张图片
+WINDOW_SIZE = 200
+# 最多保留多少个性能日志
+MAX_METRICS_LOGS = 20
+
+@contextmanager
+def stage(timings, name):
+    """记录一个阶段的耗时（秒）到 timings[name]，timings 为None时不计时"""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+def percentile(values, q):
+    """最近秩法百分位数，values 须已排序"""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, math.ceil(q / 100 * len(values)) - 1))
+    return values[index]
+
+class RunMetrics:
+    """
+    一次批量打标的性能统计（线程安全，工作线程调用 record，界面定时调用 snapshot）。
+    统计吞吐量、各阶段耗时的滚动 p50/p95、错误率和预计剩余时间，
+    并把每张图片的原始耗时写入 runs/ 目录下的JSONL性能日志。
+    """
+
+    def __init__(self, total, backend, log_path=None):
+        self.total = total
+        self.backend = backend
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+        self.done = 0
+        self.failed = 0
+        self.samples = deque(maxlen=WINDOW_SIZE)  # (完成时间, 总耗时, {阶段: 耗时})
+        self.log_file = None
+        if log_path:
+            try:
+                self.log_file = open(log_path, 'a', encoding='utf-8')
+            except OSError as e:
+                print(f"创建性能日志失败: {e}")
+        self.log({'type': 'start', 'time': self.start_time, 'backend': backend, 'total': total})
+
+    @classmethod
+    def create(cls, total, backend):
+        """创建统计并在 runs/ 目录下新建性能日志"""
+        path = None
+        try:
+            os.makedirs(RUNS_DIR, exist_ok=True)
+            prune_metrics_logs()
+            run_id = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+            path = os.path.join(RUNS_DIR, f"metrics-{run_id}-{backend}.jsonl")
+        except OSError as e:
+            print(f"创建性能日志失败: {e}")
+        return cls(total, backend, path)
+
+    def log(self, record):
+        if self.log_file is None:
+            return
+        try:
+            self.log_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            self.log_file.flush()
+        except (OSError, ValueError) as e:
+            print(f"写入性能日志失败: {e}")
+
+    def record(self, image_path, elapsed, timings, ok=True):
+        """记录一张图片的打标耗时（工作线程调用）"""
+        now = time.time()
+        with self.lock:
+            self.done += 1
+            if not ok:
+                self.failed += 1
+            self.samples.append((now, elapsed, dict(timings)))
+            self.log({
+                'type': 'image',
+                'time': now,
+                'path': image_path,
+                'ok': ok,
+                'total': round(elapsed, 4),
+                **{name: round(value, 4) for name, value in timings.items()},
+            })
+
+    def snapshot(self, queue_depth=None):
+        """
+        返回当前统计：{'done', 'total', 'failed', 'error_rate', 'images_per_sec', 'eta',
+        'queue_depth', 'latency': {'total'/阶段: (p50, p95)}}，没有数据的项为None
+        """
+        with self.lock:
+            samples = list(self.samples)
+            done, failed = self.done, self.failed
+        images_per_sec = None
+        if len(samples) >= 2 and samples[-1][0] > samples[0][0]:
+            # 用最近窗口的完成时间计算吞吐量（并发时反映整体速度）
+            images_per_sec = (len(samples) - 1) / (samples[-1][0] - samples[0][0])
+        elif done:
+            images_per_sec = done / max(time.time() - self.start_time, 1e-6)
+        remaining = max(self.total - done, 0)
+        eta = remaining / images_per_sec if images_per_sec else None
+        latency = {}
+        for name in ('total',) + STAGES:
+            if name == 'total':
+                values = sorted(elapsed for _, elapsed, _ in samples)
+            else:
+                values = sorted(timings[name] for _, _, timings in samples if name in timings)
+            if values:
+                latency[name] = (percentile(values, 50), percentile(values, 95))
+        return {
+            'done': done,
+            'total': self.total,
+            'failed': failed,
+            'error_rate': failed / done if done else None,
+            'images_per_sec': images_per_sec,
+            'eta': eta,
+            'queue_depth': remaining if queue_depth is None else queue_depth,
+            'latency': latency,
+        }
+
+    def close(self, status):
+        """写入汇总记录并关闭日志，返回最终统计（另含总耗时 elapsed）"""
+        summary = self.snapshot()
+        summary['elapsed'] = time.time() - self.start_time
+        self.log({
+            'type': 'end',
+            'time': time.time(),
+            'status': status,
+            'done': summary['done'],
+            'failed': summary['failed'],
+            'elapsed': round(summary['elapsed'], 3),
+            'latency': summary['latency'],
+        })
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+        return summary
+
+def format_duration(seconds):
+    """秒数格式化为 1:02:03 / 02:03"""
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
+
+def format_snapshot(summary):
+    """统计结果格式化为一行状态文本"""
+    parts = []
+    if summary['images_per_sec'] is not None:
+        parts.append(f"{summary['images_per_sec']:.2f} 张/秒")
+    parts.append(f"队列 {summary['queue_depth']}")
+    if summary['error_rate'] is not None:
+        parts.append(f"错误率 {summary['error_rate']:.1%}")
+    if summary['eta'] is not None:
+        parts.append(f"剩余 {format_duration(summary['eta'])}")
+    latency = summary['latency']
+    if 'total' in latency:
+        p50, p95 = latency['total']
+        parts.append(f"单张 p50 {p50:.2f}s / p95 {p95:.2f}s")
+    stages = [
+        f"{STAGE_NAMES[name]} {latency[name][0]:.2f}/{latency[name][1]:.2f}s"
+        for name in STAGES if name in latency
+    ]
+    if stages:
+        parts.append("（" + "，".join(stages) + "）")
+    return "  ".join(parts)
+
+def prune_metrics_logs():
+    """删除多余的性能日志，只保留最近的 MAX_METRICS_LOGS 个"""
+    if not os.path.isdir(RUNS_DIR):
+        return
+    paths = [
+        os.path.join(RUNS_DIR, name) for name in os.listdir(RUNS_DIR)
+        if name.startswith('metrics-') and name.endswith('.jsonl')
+    ]
+    paths.sort(key=os.path.getmtime, reverse=True)
+    for path in paths[MAX_METRICS_LOGS - 1:]:
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"删除性能日志出错: {e}")
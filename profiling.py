@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import atexit
+import threading
+from contextlib import nullcontext
+from label_journal import RUNS_DIR
+
+# 环境变量：开启性能分析
+#   spans    只记录命名计时区间，导出 Chrome trace
+#   cprofile 额外用 cProfile 采集打标线程的函数调用，导出 .prof
+#   torch    额外用 PyTorch profiler 采集算子（含CUDA），导出 PyTorch 的 Chrome trace
+PROFILE_ENV = 'IMAGE_LABEL_PROFILE'
+MODE_SPANS = 'spans'
+MODE_CPROFILE = 'cprofile'
+MODE_TORCH = 'torch'
+PROFILE_MODES = (MODE_SPANS, MODE_CPROFILE, MODE_TORCH)
+# 最多记录多少个计时区间，超出后丢弃（避免超长批量任务的trace文件过大）
+MAX_TRACE_EVENTS = 500000
+
+_NULL_SPAN = nullcontext()
+_session = None
+
+class _Span:
+    """一个计时区间，结束时记录为 Chrome trace 的完整事件（ph='X'）"""
+
+    def __init__(self, session, name, args):
+        self.session = session
+        self.name = name
+        self.args = args
+        self.record_function = None
+
+    def __enter__(self):
+        session = self.session
+        local = session.local
+        depth = getattr(local, 'depth', 0)
+        local.depth = depth + 1
+        if depth == 0 and session.mode == MODE_CPROFILE:
+            session.enable_thread_profiler()
+        if session.mode == MODE_TORCH:
+            self.record_function = session.torch_profiler_module.record_function(self.name)
+            self.record_function.__enter__()
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        session = self.session
+        if self.record_function is not None:
+            self.record_function.__exit__(exc_type, exc, tb)
+        session.add_event(self.name, self.start, end, self.args)
+        session.local.depth -= 1
+        if session.local.depth == 0 and session.mode == MODE_CPROFILE:
+            session.disable_thread_profiler()
+        return False
+
+class ProfileSession:
+    """
+    一次性能分析会话：收集各线程的计时区间，按模式启用 cProfile 或 PyTorch profiler，
+    stop() 时把结果写入 runs/ 目录并返回输出文件路径
+    """
+
+    def __init__(self, mode):
+        self.mode = mode
+        self.run_id = time.strftime("%Y%m%d-%H%M%S") + f"-{os.getpid()}"
+        self.origin = time.perf_counter_ns()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.events = []
+        self.dropped = 0
+        self.thread_names = {}
+        self.profilers = []   # cProfile：每个打标线程一个 Profile
+        self.torch_profiler = None
+        self.torch_profiler_module = None
+
+    def start(self):
+        if self.mode == MODE_TORCH:
+            import torch
+            import torch.profiler
+            activities = [torch.profiler.ProfilerActivity.CPU]
+            if torch.cuda.is_available():
+                activities.append(torch.profiler.ProfilerActivity.CUDA)
+            self.torch_profiler_module = torch.profiler
+            self.torch_profiler = torch.profiler.profile(activities=activities)
+            self.torch_profiler.__enter__()
+        print(f"性能分析已开启（{self.mode}），结果将写入 {RUNS_DIR}")
+
+    def span(self, name, args):
+        return _Span(self, name, args)
+
+    def add_event(self, name, start, end, args):
+        thread = threading.current_thread()
+        tid = thread.ident
+        event = {
+            'name': name,
+            'ph': 'X',
+            'ts': (start - self.origin) / 1000,
+            'dur': (end - start) / 1000,
+            'pid': os.getpid(),
+            'tid': tid,
+        }
+        if args:
+            event['args'] = args
+        with self.lock:
+            if tid not in self.thread_names:
+                self.thread_names[tid] = thread.name
+            if len(self.events) >= MAX_TRACE_EVENTS:
+                self.dropped += 1
+                return
+            self.events.append(event)
+
+    def enable_thread_profiler(self):
+        """在当前线程的最外层区间开始时启用 cProfile（cProfile 只采集启用它的线程）"""
+        import cProfile
+        profiler = getattr(self.local, 'profiler', None)
+        if profiler is None:
+            profiler = self.local.profiler = cProfile.Profile()
+            with self.lock:
+                self.profilers.append(profiler)
+        try:
+            profiler.enable()
+            self.local.profiling = True
+        except ValueError:
+            # Python 3.12+ 同一时间只能有一个分析器，已有其他线程在采集
+            self.local.profiling = False
+
+    def disable_thread_profiler(self):
+        if getattr(self.local, 'profiling', False):
+            self.local.profiler.disable()
+            self.local.profiling = False
+
+    def stop(self):
+        """结束采集并写入结果文件，返回输出文件路径列表"""
+        os.makedirs(RUNS_DIR, exist_ok=True)
+        outputs = []
+        if self.torch_profiler is not None:
+            self.torch_profiler.__exit__(None, None, None)
+            path = os.path.join(RUNS_DIR, f"torch-trace-{self.run_id}.json")
+            self.torch_profiler.export_chrome_trace(path)
+            outputs.append(path)
+        if self.profilers:
+            import pstats
+            for profiler in self.profilers:
+                profiler.disable()
+            stats = pstats.Stats(self.profilers[0])
+            for profiler in self.profilers[1:]:
+                stats.add(profiler)
+            path = os.path.join(RUNS_DIR, f"profile-{self.run_id}.prof")
+            stats.dump_stats(path)
+            outputs.append(path)
+        with self.lock:
+            events = list(self.events)
+            thread_names = dict(self.thread_names)
+        metadata = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': os.getpid(), 'tid': tid, 'args': {'name': name}}
+            for tid, name in thread_names.items()
+        ]
+        path = os.path.join(RUNS_DIR, f"trace-{self.run_id}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+        outputs.append(path)
+        if self.dropped:
+            print(f"计时区间超过 {MAX_TRACE_EVENTS} 个，已丢弃 {self.dropped} 个")
+        return outputs
+
+def profile_mode():
+    """从环境变量读取性能分析模式，未开启时返回None"""
+    mode = os.environ.get(PROFILE_ENV, '').strip().lower()
+    if not mode:
+        return None
+    if mode not in PROFILE_MODES:
+        print(f"未知的性能分析模式: {mode}，可选: {', '.join(PROFILE_MODES)}")
+        return None
+    return mode
+
+def start_profiling(mode=None):
+    """按参数或环境变量开启性能分析，程序退出时自动写入结果；未开启时返回None"""
+    global _session
+    if _session is not None:
+        return _session
+    mode = mode or profile_mode()
+    if mode is None:
+        return None
+    session = ProfileSession(mode)
+    try:
+        session.start()
+    except Exception as e:
+        print(f"开启性能分析失败: {e}")
+        return None
+    _session = session
+    atexit.register(stop_profiling)
+    return session
+
+def stop_profiling():
+    """结束性能分析并写入结果文件，返回输出文件路径列表"""
+    global _session
+    session, _session = _session, None
+    if session is None:
+        return []
+    try:
+        outputs = session.stop()
+    except Exception as e:
+        print(f"写入性能分析结果失败: {e}")
+        return []
+    for path in outputs:
+        print(f"性能分析结果: {path}")
+    return outputs
+
+def span(name, **args):
+    """
+    命名计时区间：with span('florence2.generate', path=image_path): ...
+    未开启性能分析时返回空的上下文管理器，几乎没有开销
+    """
+    if _session is None:
+        return _NULL_SPAN
+    return _session.span(name, args)
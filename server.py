@@ -0,0 +1,382 @@
+import os
+import sys
+import json
+import time
+import base64
+import tempfile
+import threading
+from collections import deque, Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import config
+from cli import BACKENDS, DEFAULT_WORKERS
+from metrics import percentile
+
+# 服务模式：在本地HTTP接口上提供打标，模型只加载一次，并发请求合并为批量推理
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_BATCH = 8       # 一次 generate 最多合并多少张图片
+DEFAULT_MAX_WAIT_MS = 20    # 第一个请求到达后最多等待多久凑批（毫秒）
+DEFAULT_MAX_QUEUE = 256     # 每个后端最多排队多少个请求，超出时返回503
+REQUEST_TIMEOUT = 600       # 单个请求最长等待时间（秒），超时返回504
+MAX_BODY_BYTES = 64 * 1024 * 1024
+# 滚动统计使用最近多少个请求/批次
+STATS_WINDOW = 1000
+
+class QueueFull(Exception):
+    """请求队列已满"""
+
+class LabelRequest:
+    """一个排队中的打标请求，工作线程完成后设置 result 并唤醒等待的HTTP线程"""
+
+    def __init__(self, image_path, directory=None):
+        self.image_path = image_path
+        self.directory = directory
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+        self.batch_size = 0
+        self.result = None
+        self.event = threading.Event()
+
+class DynamicBatcher:
+    """
+    单个打标后端的动态批处理队列。
+    工作线程取出第一个请求后，在 max_wait 秒内继续收集请求，最多凑满 max_batch 个后
+    一次调用 ImageLabeler.label_images；队列中已有足够请求时不等待。
+    在线API不支持批量推理，max_batch 为1，由多个工作线程并发请求。
+    """
+
+    def __init__(self, labeler, labeler_type, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT_MS / 1000,
+                 max_queue=DEFAULT_MAX_QUEUE, workers=1):
+        self.labeler = labeler
+        self.labeler_type = labeler_type
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait)
+        self.max_queue = max_queue
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.stopped = False
+        # 统计
+        self.requests = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.batches = 0
+        self.batched_images = 0
+        self.in_flight = 0
+        self.busy_seconds = 0.0
+        self.started_at = time.monotonic()
+        self.batch_sizes = Counter()
+        self.queue_waits = deque(maxlen=STATS_WINDOW)
+        self.latencies = deque(maxlen=STATS_WINDOW)
+        self.threads = [
+            threading.Thread(target=self.run, name=f"batcher-{labeler_type.value}-{index}", daemon=True)
+            for index in range(max(1, workers))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, image_path, directory=None):
+        """加入队列，队列已满时抛出 QueueFull"""
+        request = LabelRequest(image_path, directory)
+        with self.condition:
+            self.requests += 1
+            if len(self.queue) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFull(f"{self.labeler_type.value} 队列已满（{self.max_queue}）")
+            self.queue.append(request)
+            self.condition.notify()
+        return request
+
+    def next_batch(self):
+        """等待并取出下一批请求，停止时返回空列表"""
+        with self.condition:
+            while not self.queue and not self.stopped:
+                self.condition.wait()
+            if self.stopped:
+                return []
+            batch = [self.queue.popleft()]
+            deadline = batch[0].submitted + self.max_wait
+            while len(batch) < self.max_batch:
+                if self.queue:
+                    batch.append(self.queue.popleft())
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self.stopped:
+                    break
+                self.condition.wait(remaining)
+            self.in_flight += len(batch)
+            return batch
+
+    def run(self):
+        while True:
+            batch = self.next_batch()
+            if not batch:
+                return
+            started = time.monotonic()
+            for request in batch:
+                request.started = started
+                request.batch_size = len(batch)
+            try:
+                # Florence2 忽略目录（使用模型配置中的任务提示词）；在线API每批只有一个请求
+                results = self.labeler.label_images(
+                    [request.image_path for request in batch], batch[0].directory,
+                    config.snapshot(), self.labeler_type
+                )
+            except Exception as e:
+                results = [{"description": f"[调用失败] {e}", "zh": ""} for _ in batch]
+            finished = time.monotonic()
+            self.record_batch(batch, results, started, finished)
+            for request, result in zip(batch, results):
+                request.result = result
+                request.finished = finished
+                request.event.set()
+
+    def record_batch(self, batch, results, started, finished):
+        from image_labeler import is_failed_result
+
+        with self.condition:
+            self.in_flight -= len(batch)
+            self.batches += 1
+            self.batched_images += len(batch)
+            self.batch_sizes[len(batch)] += 1
+            self.busy_seconds += finished - started
+            for request, result in zip(batch, results):
+                if is_failed_result(result):
+                    self.failed += 1
+                else:
+                    self.completed += 1
+                self.queue_waits.append(started - request.submitted)
+                self.latencies.append(finished - request.submitted)
+
+    def stats(self):
+        with self.condition:
+            queue_waits = sorted(self.queue_waits)
+            latencies = sorted(self.latencies)
+            mean_batch = self.batched_images / self.batches if self.batches else None
+            elapsed = max(time.monotonic() - self.started_at, 1e-6)
+            return {
+                'queue_depth': len(self.queue),
+                'in_flight': self.in_flight,
+                'max_queue': self.max_queue,
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000,
+                'workers': len(self.threads),
+                'requests': self.requests,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'batches': self.batches,
+                'mean_batch_size': mean_batch,
+                # 批处理效率：平均批大小占最大批大小的比例
+                'batch_efficiency': mean_batch / self.max_batch if mean_batch else None,
+                'batch_size_histogram': {str(size): count for size, count in sorted(self.batch_sizes.items())},
+                # 工作线程忙于推理的时间占比
+                'utilization': self.busy_seconds / (elapsed * len(self.threads)),
+                'queue_wait_ms': {
+                    'p50': ms(percentile(queue_waits, 50)),
+                    'p95': ms(percentile(queue_waits, 95)),
+                },
+                'latency_ms': {
+                    'p50': ms(percentile(latencies, 50)),
+                    'p95': ms(percentile(latencies, 95)),
+                },
+            }
+
+    def shutdown(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+        for thread in self.threads:
+            thread.join()
+
+def ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 2)
+
+class LabelService:
+    """打标服务：共享一个 ImageLabeler，每个后端一个动态批处理队列（第一次使用时创建）"""
+
+    def __init__(self, labeler, default_backend='florence2', max_batch=DEFAULT_MAX_BATCH,
+                 max_wait_ms=DEFAULT_MAX_WAIT_MS, max_queue=DEFAULT_MAX_QUEUE):
+        self.labeler = labeler
+        self.default_backend = default_backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_queue = max_queue
+        self.batchers = {}
+        self.lock = threading.Lock()
+        self.started_at = time.time()
+
+    def batcher(self, backend):
+        from image_labeler import LabelerType
+
+        with self.lock:
+            batcher = self.batchers.get(backend)
+            if batcher is None:
+                labeler_type = LabelerType(backend)
+                if labeler_type == LabelerType.FLORENCE2:
+                    batcher = DynamicBatcher(self.labeler, labeler_type, self.max_batch, self.max_wait, self.max_queue)
+                else:
+                    batcher = DynamicBatcher(
+                        self.labeler, labeler_type, 1, 0.0, self.max_queue, DEFAULT_WORKERS.get(backend, 1)
+                    )
+                self.batchers[backend] = batcher
+            return batcher
+
+    def label(self, image_path, backend=None, directory=None, timeout=REQUEST_TIMEOUT):
+        """提交请求并等待结果，返回 LabelRequest；超时返回None，队列已满时抛出 QueueFull"""
+        request = self.batcher(backend or self.default_backend).submit(image_path, directory)
+        if not request.event.wait(timeout):
+            return None
+        return request
+
+    def health(self):
+        return {
+            'status': 'ok',
+            'default_backend': self.default_backend,
+            'model_loaded': self.labeler.hf_model is not None,
+            'uptime': round(time.time() - self.started_at, 1),
+            'queue_depth': {backend: batcher.stats()['queue_depth'] for backend, batcher in self.batchers.items()},
+        }
+
+    def metrics(self):
+        return {
+            'uptime': round(time.time() - self.started_at, 1),
+            'backends': {backend: batcher.stats() for backend, batcher in self.batchers.items()},
+        }
+
+    def shutdown(self):
+        for batcher in list(self.batchers.values()):
+            batcher.shutdown()
+
+class LabelRequestHandler(BaseHTTPRequestHandler):
+    """
+    GET  /health   服务状态和各后端队列深度
+    GET  /metrics  队列深度、批大小分布、批处理效率、排队和总延迟
+    POST /label    {"path": "图片路径"} 或 {"image": "base64图片", "filename": "a.png"}，
+                   可选 "backend"、"directory"（使用该目录配置的提示词）
+    """
+
+    server_version = "ImageLabelAssistant/0.1"
+    service = None  # LabelService，由 create_server 设置
+    verbose = False
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.send_json(200, self.service.health())
+        elif self.path == '/metrics':
+            self.send_json(200, self.service.metrics())
+        else:
+            self.send_json(404, {'error': f"未知的路径: {self.path}"})
+
+    def do_POST(self):
+        if self.path != '/label':
+            self.send_json(404, {'error': f"未知的路径: {self.path}"})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if length <= 0:
+            self.send_json(400, {'error': "请求体为空"})
+            return
+        if length > MAX_BODY_BYTES:
+            self.send_json(413, {'error': f"请求体超过 {MAX_BODY_BYTES // (1024 * 1024)} MB"})
+            return
+        try:
+            body = json.loads(self.rfile.read(length))
+        except ValueError as e:
+            self.send_json(400, {'error': f"请求体不是有效的JSON: {e}"})
+            return
+        if not isinstance(body, dict):
+            self.send_json(400, {'error': "请求体应为JSON对象"})
+            return
+        backend = body.get('backend') or self.service.default_backend
+        if backend not in BACKENDS:
+            self.send_json(400, {'error': f"未知的打标服务: {backend}，可选: {', '.join(BACKENDS)}"})
+            return
+
+        temp_path = None
+        try:
+            if body.get('image'):
+                # 上传的图片写入临时文件，打标后删除
+                try:
+                    data = base64.b64decode(body['image'], validate=True)
+                except ValueError as e:
+                    self.send_json(400, {'error': f"图片不是有效的base64: {e}"})
+                    return
+                suffix = os.path.splitext(body.get('filename') or '')[1] or '.png'
+                fd, temp_path = tempfile.mkstemp(prefix='label-', suffix=suffix)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                image_path = temp_path
+            elif body.get('path'):
+                image_path = body['path']
+                if not os.path.isfile(image_path):
+                    self.send_json(404, {'error': f"图片不存在: {image_path}"})
+                    return
+            else:
+                self.send_json(400, {'error': "需要 path 或 image 字段"})
+                return
+
+            try:
+                request = self.service.label(image_path, backend, body.get('directory'))
+            except QueueFull as e:
+                self.send_json(503, {'error': str(e)})
+                return
+            if request is None:
+                self.send_json(504, {'error': "打标超时"})
+                return
+            self.send_label_result(request, backend)
+        finally:
+            if temp_path is not None:
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+    def send_label_result(self, request, backend):
+        from image_labeler import is_failed_result
+
+        result = request.result
+        timing = {
+            'backend': backend,
+            'batch_size': request.batch_size,
+            'queue_ms': ms(request.started - request.submitted),
+            'total_ms': ms(request.finished - request.submitted),
+        }
+        if is_failed_result(result):
+            error = result.get('description') if isinstance(result, dict) else "返回结果格式不正确"
+            self.send_json(500, {'error': error, **timing})
+        else:
+            self.send_json(200, {**result, **timing})
+
+    def send_json(self, status, data):
+        payload = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        if self.verbose:
+            super().log_message(format, *args)
+
+def create_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False):
+    """创建HTTP服务器（每个连接一个线程，等待结果时不阻塞其他请求）"""
+    handler = type('BoundLabelRequestHandler', (LabelRequestHandler,), {'service': service, 'verbose': verbose})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT, verbose=False):
+    """运行服务直到 Ctrl+C"""
+    server = create_server(service, host, port, verbose)
+    print(f"打标服务已启动: http://{server.server_address[0]}:{server.server_address[1]}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        service.shutdown()
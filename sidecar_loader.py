@@ -0,0 +1,130 @@
+from collections import deque
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from label_io import read_sidecar
+
+class SidecarReadTask(QRunnable):
+    """在线程池中读取一组标签文件"""
+
+    def __init__(self, loader, generation, rows, paths):
+        super().__init__()
+        self.loader = loader
+        self.generation = generation
+        self.rows = rows
+        self.paths = paths
+
+    def run(self):
+        results = []
+        for row, path in zip(self.rows, self.paths):
+            # 已切换目录时立即放弃剩余读取
+            if self.loader.generation != self.generation:
+                return
+            text, exists = read_sidecar(path)
+            results.append((row, text, exists))
+        self.loader.chunk_done.emit(self.generation, results)
+
+class SidecarLoader(QObject):
+    """
+    后台读取标签文件（.txt）。
+    读取任务分块提交到线程池，可见行优先读取，
+    切换目录时通过递增generation使未完成的读取全部作废。
+    """
+
+    # 一批标签读取完成：generation, [(行号, 标签文本, 标签文件是否存在), ...]
+    labels_loaded = pyqtSignal(int, list)
+    # 全部标签读取完成：generation
+    all_loaded = pyqtSignal(int)
+    # 内部信号：工作线程读取完成一块
+    chunk_done = pyqtSignal(int, list)
+
+    CHUNK_SIZE = 64  # 每个读取任务包含的行数
+
+    def __init__(self, parent=None, max_threads=8):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(max_threads)
+        # 同时提交的任务数上限，其余任务在队列中等待，便于可见行插队
+        self.max_in_flight = max_threads * 2
+        self.generation = 0
+        self.paths = []
+        self.requested = bytearray()
+        self.urgent = deque()
+        self.pending = deque()
+        self.in_flight = 0
+        self.remaining = 0
+        self.adding = False  # 是否还会有新的图像加入（目录仍在扫描中）
+        self.chunk_done.connect(self.on_chunk_done)
+
+    def cancel(self):
+        """取消所有未完成的读取"""
+        self.generation += 1
+        self.pool.clear()
+        self.urgent.clear()
+        self.pending.clear()
+        self.in_flight = 0
+        self.remaining = 0
+        self.adding = False
+
+    def start(self):
+        """开始新一轮读取，之后通过 add_paths 逐批添加图像"""
+        self.cancel()
+        self.paths = []
+        self.requested = bytearray()
+        self.adding = True
+
+    def add_paths(self, paths):
+        """追加一批图像，其标签文件排队读取"""
+        start = len(self.paths)
+        self.paths.extend(paths)
+        self.requested.extend(bytearray(len(paths)))
+        self.remaining += len(paths)
+        for chunk_start in range(start, len(self.paths), self.CHUNK_SIZE):
+            self.pending.append(range(chunk_start, min(chunk_start + self.CHUNK_SIZE, len(self.paths))))
+        self.pump()
+
+    def finish_paths(self):
+        """图像已全部添加，全部读取完成后发送 all_loaded"""
+        self.adding = False
+        if self.remaining <= 0:
+            self.all_loaded.emit(self.generation)
+
+    def reset(self, paths):
+        """开始读取新的图像列表对应的标签文件"""
+        self.start()
+        self.add_paths(paths)
+        self.finish_paths()
+
+    def is_loading(self):
+        return self.adding or self.remaining > 0
+
+    def prioritize(self, rows):
+        """优先读取指定行（通常为当前可见行）"""
+        urgent_rows = [row for row in rows if row < len(self.requested) and not self.requested[row]]
+        if not urgent_rows:
+            return
+        for start in range(0, len(urgent_rows), self.CHUNK_SIZE):
+            self.urgent.append(urgent_rows[start:start + self.CHUNK_SIZE])
+        self.pump()
+
+    def pump(self):
+        """在并发上限内提交等待中的读取任务，优先提交可见行"""
+        while self.in_flight < self.max_in_flight and (self.urgent or self.pending):
+            queue = self.urgent if self.urgent else self.pending
+            rows = [row for row in queue.popleft() if not self.requested[row]]
+            if not rows:
+                continue
+            for row in rows:
+                self.requested[row] = 1
+            task = SidecarReadTask(self, self.generation, rows, [self.paths[row] for row in rows])
+            self.pool.start(task, 1 if queue is self.urgent else 0)
+            self.in_flight += 1
+
+    def on_chunk_done(self, generation, results):
+        if generation != self.generation:
+            return
+        self.in_flight -= 1
+        self.remaining -= len(results)
+        self.labels_loaded.emit(generation, results)
+        if self.remaining <= 0 and not self.adding:
+            self.all_loaded.emit(generation)
+        else:
+            self.pump()
@@ -0,0 +1,325 @@
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, pyqtSignal
+from caption_index import CaptionIndex
+from tag_stats import TagStats
+from label_store import (
+    LabelStore, FLAG_LABELING, FLAG_TRANSLATING, FLAG_DIRTY, FLAG_LABEL_LOADED, FLAG_HAS_SIDECAR
+)
+
+# 表格列
+COL_IMAGE = 0
+COL_EN = 1
+COL_ZH = 2
+COL_TRANSLATE = 3
+COL_LABEL = 4
+
+# 按钮列是否可点击
+ButtonEnabledRole = Qt.ItemDataRole.UserRole + 1
+
+# 筛选模式
+FILTER_ALL = 0             # 全部图像
+FILTER_MISSING_SIDECAR = 1 # 缺少标签文件
+FILTER_EMPTY_EN = 2        # 英文打标为空
+FILTER_EMPTY_ZH = 3        # 中文翻译为空
+FILTER_DIRTY = 4           # 已修改未保存
+
+class LabelTableModel(QAbstractTableModel):
+    """
+    图像打标表格模型。
+    数据保存在 LabelStore 中，视图只会请求可见行的数据，
+    按钮列由委托绘制，不为每行创建控件。
+    设置筛选条件后只显示匹配的行：模型行号（视图行）通过 store_row 映射为数据行号，
+    其余接口的行号参数均为数据行号。
+    """
+
+    # 英文打标被用户编辑，参数为行号
+    label_edited = pyqtSignal(int)
+    # 有行的英文打标被修改（需要保存），参数为行号
+    row_dirtied = pyqtSignal(int)
+
+    HEADERS = ["图像", "英文打标", "中文翻译", "翻译", "打标"]
+
+    def __init__(self, store=None, parent=None):
+        super().__init__(parent)
+        self.store = store if store is not None else LabelStore()
+        self.caption_index = CaptionIndex(self.row_text)
+        self.tag_stats = TagStats()
+        self.filter_query = ""
+        self.filter_mode = FILTER_ALL
+        self.filter_rows = None  # 筛选后显示的数据行号列表，None 表示不筛选
+        self.filter_pos = None   # 数据行号 -> 视图行号
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        if self.filter_rows is not None:
+            return len(self.filter_rows)
+        return len(self.store)
+
+    def row_text(self, row):
+        """用于全文检索的行文本（英文打标和中文翻译）"""
+        return self.store.en_labels[row] + "\n" + self.store.zh_labels[row]
+
+    def write_en_label(self, row, text):
+        """写入英文打标并增量更新全文索引和标签统计"""
+        store = self.store
+        old_en = store.en_labels[row]
+        old_text = self.row_text(row)
+        store.en_labels[row] = text
+        self.caption_index.update(row, old_text, self.row_text(row))
+        self.tag_stats.update(old_en, text)
+
+    def store_row(self, view_row):
+        """视图行号 -> 数据行号"""
+        if self.filter_rows is not None:
+            return self.filter_rows[view_row]
+        return view_row
+
+    def view_row(self, row):
+        """数据行号 -> 视图行号，被筛选掉的行返回-1"""
+        if self.filter_pos is not None:
+            return self.filter_pos.get(row, -1)
+        return row
+
+    def emit_rows_changed(self, rows, first_column, last_column):
+        """通知视图若干数据行的指定列已变化，被筛选掉的行不通知"""
+        view_rows = [self.view_row(row) for row in rows]
+        view_rows = [row for row in view_rows if row >= 0]
+        if view_rows:
+            self.dataChanged.emit(self.index(min(view_rows), first_column), self.index(max(view_rows), last_column))
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = self.store_row(index.row()), index.column()
+        store = self.store
+
+        if column == COL_IMAGE:
+            # 提供图片路径，视图只绘制可见行，由委托按需加载缩略图
+            if role == Qt.ItemDataRole.UserRole:
+                return store.paths[row]
+            return None
+
+        if column == COL_EN:
+            if role in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.EditRole):
+                return store.en_labels[row]
+            return None
+
+        if column == COL_ZH:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return store.zh_labels[row]
+            return None
+
+        if column == COL_TRANSLATE:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return "正在翻译..." if store.has_flag(row, FLAG_TRANSLATING) else "翻译"
+            if role == ButtonEnabledRole:
+                # 打标过程中同样禁用翻译按钮
+                return not store.has_flag(row, FLAG_TRANSLATING | FLAG_LABELING)
+            return None
+
+        if column == COL_LABEL:
+            if role == Qt.ItemDataRole.DisplayRole:
+                return "正在打标..." if store.has_flag(row, FLAG_LABELING) else "打标"
+            if role == ButtonEnabledRole:
+                return not store.has_flag(row, FLAG_LABELING)
+            return None
+
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.ItemFlag.NoItemFlags
+        flags = Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsSelectable
+        if index.column() == COL_EN:
+            flags |= Qt.ItemFlag.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.ItemDataRole.EditRole):
+        if not index.isValid() or index.column() != COL_EN or role != Qt.ItemDataRole.EditRole:
+            return False
+        row = self.store_row(index.row())
+        if self.store.en_labels[row] == value:
+            return False
+        self.write_en_label(row, value)
+        self.store.set_flag(row, FLAG_LABEL_LOADED | FLAG_DIRTY)
+        self.dataChanged.emit(index, index)
+        self.label_edited.emit(row)
+        self.row_dirtied.emit(row)
+        return True
+
+    def reset_rows(self, paths, en_labels=None):
+        """替换全部行数据"""
+        self.beginResetModel()
+        self.store.reset(paths, en_labels)
+        self.caption_index.clear()
+        self.tag_stats.clear()
+        for row in range(len(self.store)):
+            if self.store.en_labels[row]:
+                self.caption_index.update(row, "", self.row_text(row))
+                self.tag_stats.update("", self.store.en_labels[row])
+        if self.filter_rows is not None:
+            self.set_filter_rows(self.match_rows(range(len(self.store))))
+        self.endResetModel()
+
+    def append_rows(self, paths):
+        """在末尾追加一批行（目录扫描流式加入）"""
+        if not paths:
+            return
+        start = len(self.store)
+        if self.filter_rows is None:
+            self.beginInsertRows(QModelIndex(), start, start + len(paths) - 1)
+            self.store.extend(paths)
+            self.endInsertRows()
+            return
+
+        # 筛选中：新行数据行号最大，匹配的行追加到视图末尾
+        self.store.extend(paths)
+        matched = self.match_rows(range(start, len(self.store)))
+        if matched:
+            view_start = len(self.filter_rows)
+            self.beginInsertRows(QModelIndex(), view_start, view_start + len(matched) - 1)
+            self.filter_rows.extend(matched)
+            self.filter_pos.update((row, view_start + i) for i, row in enumerate(matched))
+            self.endInsertRows()
+
+    def set_en_label(self, row, text):
+        """设置英文打标（程序写入，不触发 label_edited）"""
+        self.write_en_label(row, text)
+        self.store.set_flag(row, FLAG_LABEL_LOADED | FLAG_DIRTY)
+        self.emit_rows_changed([row], COL_EN, COL_EN)
+        self.row_dirtied.emit(row)
+
+    def apply_loaded_labels(self, results):
+        """
+        写入后台读取到的标签文件内容 [(行号, 标签文本, 标签文件是否存在), ...]
+        已被编辑或打标覆盖的行不再写入
+        """
+        store = self.store
+        changed_rows = []
+        for row, text, exists in results:
+            if row >= len(store) or store.has_flag(row, FLAG_LABEL_LOADED):
+                continue
+            self.write_en_label(row, text)
+            store.set_flag(row, FLAG_LABEL_LOADED)
+            store.set_flag(row, FLAG_HAS_SIDECAR, exists)
+            changed_rows.append(row)
+        self.emit_rows_changed(changed_rows, COL_EN, COL_EN)
+        return changed_rows
+
+    def apply_bulk_edit(self, changes):
+        """
+        一次性写入批量编辑结果 [(行号, 原文本, 新文本), ...]，只触发一次模型重置。
+        当前文本已不是原文本的行（转换期间被编辑或打标）跳过，返回实际写入的修改
+        """
+        store = self.store
+        applied = [
+            (row, old, new) for row, old, new in changes
+            if row < len(store) and store.en_labels[row] == old
+        ]
+        if not applied:
+            return applied
+        self.beginResetModel()
+        for row, old, new in applied:
+            self.write_en_label(row, new)
+            store.set_flag(row, FLAG_LABEL_LOADED | FLAG_DIRTY)
+        self.endResetModel()
+        self.row_dirtied.emit(applied[0][0])
+        return applied
+
+    def set_zh_label(self, row, text):
+        """设置中文翻译"""
+        old_text = self.row_text(row)
+        self.store.zh_labels[row] = text
+        self.caption_index.update(row, old_text, self.row_text(row))
+        self.emit_rows_changed([row], COL_ZH, COL_ZH)
+
+    def refresh_image(self, row):
+        """刷新某行的图片单元格（缩略图加载完成后调用）"""
+        self.emit_rows_changed([row], COL_IMAGE, COL_IMAGE)
+
+    def set_row_flag(self, row, flag, on=True):
+        """设置行状态标志，并刷新该行的按钮"""
+        self.store.set_flag(row, flag, on)
+        self.emit_rows_changed([row], COL_TRANSLATE, COL_LABEL)
+
+    def dirty_rows(self):
+        """返回英文打标已修改但尚未保存的行"""
+        return self.store.rows_with_flag(FLAG_DIRTY)
+
+    def mark_saved(self, saved):
+        """
+        标记已保存的行 [(行号, 图片路径, 保存的文本), ...]
+        保存期间被切换目录或再次修改的行保持未保存状态
+        """
+        store = self.store
+        for row, image_path, text in saved:
+            if row < len(store) and store.paths[row] == image_path and store.en_labels[row] == text:
+                store.set_flag(row, FLAG_DIRTY, False)
+                store.set_flag(row, FLAG_HAS_SIDECAR)
+
+    def clear_row_flag(self, flag):
+        """清除所有行的状态标志，并刷新受影响的按钮"""
+        rows = self.store.clear_flag(flag)
+        self.emit_rows_changed(rows, COL_TRANSLATE, COL_LABEL)
+
+    def match_rows(self, rows):
+        """返回 rows 中符合当前筛选条件的数据行号"""
+        store = self.store
+        matched = self.caption_index.search(self.filter_query, len(store))
+        mode = self.filter_mode
+        result = []
+        for row in rows:
+            if matched is not None and row not in matched:
+                continue
+            if mode == FILTER_MISSING_SIDECAR:
+                # 标签文件尚未读取的行无法判断，不显示
+                if not store.has_flag(row, FLAG_LABEL_LOADED) or store.has_flag(row, FLAG_HAS_SIDECAR):
+                    continue
+            elif mode == FILTER_EMPTY_EN:
+                if store.en_labels[row] or not store.has_flag(row, FLAG_LABEL_LOADED):
+                    continue
+            elif mode == FILTER_EMPTY_ZH:
+                if store.zh_labels[row]:
+                    continue
+            elif mode == FILTER_DIRTY:
+                if not store.has_flag(row, FLAG_DIRTY):
+                    continue
+            result.append(row)
+        return result
+
+    def set_filter_rows(self, rows):
+        if rows is None:
+            self.filter_rows = None
+            self.filter_pos = None
+        else:
+            self.filter_rows = rows
+            self.filter_pos = {row: i for i, row in enumerate(rows)}
+
+    def set_filter(self, query, mode=FILTER_ALL):
+        """设置筛选条件（关键词和筛选模式）并重新筛选，返回显示的行数"""
+        self.filter_query = query.strip()
+        self.filter_mode = mode
+        self.refilter()
+        return self.rowCount()
+
+    def refilter(self):
+        """按当前筛选条件重新计算显示的行（数据加载或批量修改后调用）"""
+        self.beginResetModel()
+        if not self.filter_query and self.filter_mode == FILTER_ALL:
+            self.set_filter_rows(None)
+        else:
+            self.set_filter_rows(self.match_rows(range(len(self.store))))
+        self.endResetModel()
+
+    def is_filtered(self):
+        return self.filter_rows is not None
@@ -0,0 +1,92 @@
+from collections import Counter
+
+def split_tags(text):
+    """将英文打标按英文逗号拆分为标签（去除首尾空白和空标签）"""
+    tags = [tag.strip() for tag in text.split(",")]
+    return [tag for tag in tags if tag]
+
+class TagStats:
+    """
+    数据集标签频率统计。
+    每条打标拆分为逗号分隔的标签，统计每个标签出现在多少条打标中，以及作为第一个标签出现的次数。
+    打标变化时只按新旧文本的差异增减计数，不需要重新扫描整个表格。
+    """
+
+    def __init__(self):
+        self.tag_counts = Counter()    # 标签 -> 包含该标签的打标数量
+        self.first_counts = Counter()  # 标签 -> 以该标签开头的打标数量
+        self.caption_count = 0         # 非空打标数量
+
+    def clear(self):
+        self.tag_counts.clear()
+        self.first_counts.clear()
+        self.caption_count = 0
+
+    def add(self, text, sign):
+        tags = split_tags(text)
+        if not tags:
+            return
+        self.caption_count += sign
+        unique_tags = set(tags)
+        if sign > 0:
+            self.tag_counts.update(unique_tags)
+            self.first_counts[tags[0]] += 1
+            return
+        self.tag_counts.subtract(unique_tags)
+        self.first_counts[tags[0]] -= 1
+        # 计数归零的标签从统计中删除
+        for tag in unique_tags:
+            if self.tag_counts[tag] <= 0:
+                del self.tag_counts[tag]
+        if self.first_counts[tags[0]] <= 0:
+            del self.first_counts[tags[0]]
+
+    def update(self, old_text, new_text):
+        """一条打标从 old_text 变为 new_text 时更新计数"""
+        if old_text == new_text:
+            return
+        if old_text:
+            self.add(old_text, -1)
+        if new_text:
+            self.add(new_text, 1)
+
+    def suggest_trigger_word(self, min_ratio=0.5):
+        """
+        推荐触发词：出现次数最多的第一个标签，
+        且至少出现在两条打标和 min_ratio 比例的非空打标中，否则返回空字符串
+        """
+        if not self.first_counts:
+            return ""
+        tag, count = self.first_counts.most_common(1)[0]
+        if count >= 2 and count >= self.caption_count * min_ratio:
+            return tag
+        return ""
+
+    def most_common(self, n=None):
+        """按出现次数从高到低返回 [(标签, 打标数量), ...]"""
+        return self.tag_counts.most_common(n)
+
+    def rare_tags(self, max_count=1):
+        """只出现在不超过 max_count 条打标中的标签"""
+        return {tag for tag, count in self.tag_counts.items() if count <= max_count}
+
+    def outlier_reasons(self, text, trigger_word="", rare_tags=None):
+        """
+        判断一条打标是否异常，返回原因列表：
+        为空、缺少触发词、触发词不在开头、包含只出现一次的标签
+        """
+        tags = split_tags(text)
+        if not tags:
+            return ["打标为空"]
+        reasons = []
+        if trigger_word:
+            if trigger_word not in tags:
+                reasons.append("缺少触发词")
+            elif tags[0] != trigger_word:
+                reasons.append("触发词不在开头")
+        if rare_tags is None:
+            rare_tags = self.rare_tags()
+        rare = [tag for tag in tags if tag in rare_tags]
+        if rare:
+            reasons.append("罕见标签: " + "、".join(rare[:3]))
+        return reasons
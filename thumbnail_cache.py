@@ -0,0 +1,106 @@
+import os
+import sqlite3
+import threading
+import time
+
+# 缓存文件存放目录
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+# 缩略图缓存数据库
+THUMBNAIL_DB_PATH = os.path.join(CACHE_DIR, "thumbnails.sqlite3")
+
+# 命中时更新访问时间的最小间隔（秒），避免每次读取都产生写操作
+ACCESS_UPDATE_INTERVAL = 3600
+
+class ThumbnailDiskCache:
+    """
+    缩略图磁盘缓存，使用单个SQLite数据库保存压缩后的缩略图。
+    以图片路径为键，并校验文件修改时间和大小，文件变化后缓存自动失效；
+    总大小超过上限时按最近访问时间淘汰（LRU）。
+    各线程共用一个数据库连接并加锁访问，可在缩略图线程池中直接调用。
+    """
+
+    def __init__(self, db_path=THUMBNAIL_DB_PATH, max_bytes=512 * 1024 * 1024):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # 线程池的工作线程会被回收，每个线程一个连接时无法关闭，因此共用一个连接
+        self.conn = conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS thumbnails ("
+            "path TEXT PRIMARY KEY, mtime_ns INTEGER, file_size INTEGER, "
+            "data BLOB, bytes INTEGER, last_access REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_thumbnails_last_access ON thumbnails(last_access)")
+        conn.commit()
+        self.total_bytes = conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM thumbnails").fetchone()[0]
+
+    def close(self):
+        """关闭数据库连接，之后的读写直接返回"""
+        with self.lock:
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+
+    def get(self, path, mtime_ns, file_size):
+        """读取缩略图数据，不存在或文件已变化时返回None"""
+        try:
+            with self.lock:
+                conn = self.conn
+                if conn is None:
+                    return None
+                row = conn.execute(
+                    "SELECT data, last_access FROM thumbnails WHERE path = ? AND mtime_ns = ? AND file_size = ?",
+                    (path, mtime_ns, file_size)
+                ).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                if now - row[1] > ACCESS_UPDATE_INTERVAL:
+                    conn.execute("UPDATE thumbnails SET last_access = ? WHERE path = ?", (now, path))
+                    conn.commit()
+                return row[0]
+        except sqlite3.Error as e:
+            print(f"读取缩略图缓存出错: {e}")
+            return None
+
+    def put(self, path, mtime_ns, file_size, data):
+        """写入缩略图数据，超过容量上限时淘汰最久未访问的缩略图"""
+        try:
+            with self.lock:
+                conn = self.conn
+                if conn is None:
+                    return
+                old = conn.execute("SELECT bytes FROM thumbnails WHERE path = ?", (path,)).fetchone()
+                conn.execute(
+                    "INSERT OR REPLACE INTO thumbnails (path, mtime_ns, file_size, data, bytes, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, mtime_ns, file_size, sqlite3.Binary(data), len(data), time.time())
+                )
+                conn.commit()
+                self.total_bytes += len(data) - (old[0] if old else 0)
+                if self.total_bytes > self.max_bytes:
+                    self.evict(conn)
+        except sqlite3.Error as e:
+            print(f"写入缩略图缓存出错: {e}")
+
+    def evict(self, conn):
+        """按最近访问时间淘汰缩略图，直到总大小降到上限的90%以下"""
+        target = self.max_bytes * 0.9
+        while self.total_bytes > target:
+            rows = conn.execute(
+                "SELECT path, bytes FROM thumbnails ORDER BY last_access LIMIT 256"
+            ).fetchall()
+            if not rows:
+                self.total_bytes = 0
+                break
+            removed = []
+            for path, size in rows:
+                removed.append((path,))
+                self.total_bytes -= size
+                if self.total_bytes <= target:
+                    break
+            conn.executemany("DELETE FROM thumbnails WHERE path = ?", removed)
+            conn.commit()
@@ -0,0 +1,121 @@
+import os
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QSize, QBuffer, QByteArray, QIODevice, pyqtSignal
+from PyQt6.QtGui import QImage, QImageReader
+
+# 缩略图最大边长，缓存大尺寸缩略图，避免放大导致模糊
+MAX_THUMB_SIZE = 400
+
+def decode_thumbnail(image_path, max_size=MAX_THUMB_SIZE):
+    """
+    以缩小后的尺寸解码图像（只缩小，不放大）
+    对于JPEG，QImageReader 会在解码阶段直接按目标尺寸解码，无需先解码完整原图
+    """
+    reader = QImageReader(image_path)
+    size = reader.size()
+    if size.isValid() and (size.width() > max_size or size.height() > max_size):
+        reader.setScaledSize(size.scaled(max_size, max_size, Qt.AspectRatioMode.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        print(f"解码缩略图失败: {image_path}, {reader.errorString()}")
+    return image
+
+def pixmap_bytes(pixmap):
+    """估算QPixmap占用的内存字节数"""
+    return max(pixmap.width() * pixmap.height() * pixmap.depth() // 8, 64)
+
+def encode_thumbnail(image):
+    """将缩略图压缩为字节数据用于磁盘缓存，带透明通道的图像使用PNG，其余使用JPEG"""
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.OpenModeFlag.WriteOnly)
+    if image.hasAlphaChannel():
+        image.save(buffer, "PNG")
+    else:
+        image.save(buffer, "JPEG", 85)
+    buffer.close()
+    return bytes(data)
+
+def load_thumbnail(image_path, disk_cache=None):
+    """优先从磁盘缓存读取缩略图，未命中时解码原图并写入缓存"""
+    if disk_cache is None:
+        return decode_thumbnail(image_path)
+
+    try:
+        stat = os.stat(image_path)
+    except OSError:
+        return decode_thumbnail(image_path)
+
+    data = disk_cache.get(image_path, stat.st_mtime_ns, stat.st_size)
+    if data is not None:
+        image = QImage.fromData(data)
+        if not image.isNull():
+            return image
+
+    image = decode_thumbnail(image_path)
+    if not image.isNull():
+        disk_cache.put(image_path, stat.st_mtime_ns, stat.st_size, encode_thumbnail(image))
+    return image
+
+class ThumbnailTask(QRunnable):
+    """在线程池中解码一张缩略图"""
+
+    def __init__(self, loader, generation, image_path):
+        super().__init__()
+        self.loader = loader
+        self.generation = generation
+        self.image_path = image_path
+
+    def run(self):
+        # 已切换目录时放弃解码
+        if self.loader.generation != self.generation:
+            return
+        image = load_thumbnail(self.image_path, self.loader.disk_cache)
+        self.loader.task_done.emit(self.generation, self.image_path, image)
+
+class ThumbnailLoader(QObject):
+    """
+    后台缩略图加载器。
+    在线程池中优先读取磁盘缓存，未命中时以缩小尺寸解码图像（QImage 可在工作线程中使用），
+    解码完成后在主线程发送 thumbnail_ready，由主线程转换为 QPixmap。
+    """
+
+    # 缩略图解码完成：图片路径, 缩略图（解码失败时为空图像）
+    thumbnail_ready = pyqtSignal(str, QImage)
+    # 内部信号：工作线程解码完成
+    task_done = pyqtSignal(int, str, QImage)
+
+    def __init__(self, parent=None, max_threads=None, disk_cache=None):
+        super().__init__(parent)
+        self.disk_cache = disk_cache  # ThumbnailDiskCache，为None时不使用磁盘缓存
+        self.pool = QThreadPool(self)
+        if max_threads:
+            self.pool.setMaxThreadCount(max_threads)
+        self.generation = 0
+        self.pending = set()  # 已提交但尚未完成的图片路径
+        self.task_done.connect(self.on_task_done)
+
+    def request(self, image_path, priority=0):
+        """请求解码缩略图，已在队列中的请求不会重复提交"""
+        if image_path in self.pending:
+            return
+        self.pending.add(image_path)
+        self.pool.start(ThumbnailTask(self, self.generation, image_path), priority)
+
+    def cancel_all(self):
+        """取消所有尚未完成的解码"""
+        self.generation += 1
+        self.pool.clear()
+        self.pending.clear()
+
+    def shutdown(self):
+        """取消尚未开始的解码，等待正在解码的任务结束后关闭磁盘缓存（关闭窗口时调用）"""
+        self.cancel_all()
+        self.pool.waitForDone()
+        if self.disk_cache is not None:
+            self.disk_cache.close()
+
+    def on_task_done(self, generation, image_path, image):
+        if generation != self.generation:
+            return
+        self.pending.discard(image_path)
+        self.thumbnail_ready.emit(image_path, image)
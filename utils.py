@@ -1,9 +1,20 @@
+import os
 import translators as ts
 import re
+from huggingface_hub import snapshot_download
+import config
+
+# 本地模型存放目录
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
 
 # 输入长度限制
 INPUT_LIMIT = 1000
 
+# 批量打包翻译时的分隔标记，形如 [[0]]，独占一行，翻译后据此拆回各条
+PACK_MARKER = "[[{}]]"
+# 兼容翻译后括号变为全角或标记内出现空格的情况
+PACK_MARKER_PATTERN = re.compile(r'[\[【]{2}\s*(\d+)\s*[\]】]{2}')
+
 def split_text_for_translation(text):
     """
     按段落和完整句子拆分文本，返回句子列表（保持原有段落结构）。
@@ -60,15 +71,57 @@ def split_text_for_translation(text):
     
     return split_paragraphs
 
+def get_model_local_path(model_id, models_dir=MODELS_DIR):
+    """获取模型的本地路径，如果不存在则下载"""
+    # 模型ID的最后一部分作为目录名
+    model_name = model_id.split("/")[-1]
+    local_model_path = os.path.join(models_dir, model_name)
+    
+    # 检查本地是否已存在模型
+    if os.path.exists(local_model_path) and os.path.isdir(local_model_path):
+        # 检查是否是有效的模型目录(至少包含config.json文件)
+        if os.path.exists(os.path.join(local_model_path, "config.json")):
+            print(f"模型已存在于本地: {local_model_path}")
+            return local_model_path
+    
+    # 模型不存在，使用huggingface_hub下载
+    print(f"模型不存在，正在从HuggingFace下载到 {local_model_path}...")
+    try:
+        # 使用snapshot_download下载模型
+        snapshot_path = snapshot_download(
+            repo_id=model_id,
+            local_dir=local_model_path,
+            local_dir_use_symlinks=False
+        )
+        print(f"模型下载完成: {snapshot_path}")
+        return local_model_path
+    except Exception as e:
+        print(f"模型下载失败: {e}")
+        # 如果下载失败，返回原始model_id，让transformers自行处理
+        return model_id
+
+def get_translate_provider():
+    """获取当前配置的翻译服务：'bing'、'local' 或 'zhipu'"""
+    return config.get_translate_config().get('provider', 'bing')
+
 def translate_text(text, from_lang='en', to_lang='zh'):
     """
     自动处理长文本，按段落和句子拆分，逐句翻译，组合返回。
     对于短文本，直接翻译。
+    翻译服务配置为本地模型或智谱语言模型时，交由对应的翻译器处理。
     """
     if not text:
         return ""
     
     try:
+        provider = get_translate_provider()
+        if provider == 'local':
+            from local_translator import translate_texts_local
+            return translate_texts_local([text])[0]
+        if provider == 'zhipu':
+            from llm_translator import translate_texts_zhipu
+            return translate_texts_zhipu([text])[0]
+
         # 如果整个文本长度小于INPUT_LIMIT，直接翻译
         if len(text) < INPUT_LIMIT:
             return ts.translate_text(text, translator='bing', from_language=from_lang, to_language=to_lang)
@@ -96,3 +149,109 @@ def translate_text(text, from_lang='en', to_lang='zh'):
         return '\n'.join(translated_paragraphs)
     except Exception as e:
         return f"[翻译失败] {str(e)}"
+
+def pack_texts_for_translation(texts, limit=INPUT_LIMIT):
+    """
+    将多条短文本按长度打包成若干组，每组加上分隔标记后总长度不超过limit。
+    返回索引分组列表 [[0, 1, 2], [3], ...]；超长文本或包含分隔标记的文本单独成组。
+    """
+    groups = []
+    current_group = []
+    current_length = 0
+
+    for i, text in enumerate(texts):
+        # 分隔标记加换行的额外长度
+        item_length = len(text) + len(PACK_MARKER.format(i)) + 2
+
+        # 超长文本或自身含有类似标记的文本无法安全打包，单独翻译
+        if item_length >= limit or PACK_MARKER_PATTERN.search(text):
+            if current_group:
+                groups.append(current_group)
+                current_group = []
+                current_length = 0
+            groups.append([i])
+            continue
+
+        if current_length + item_length >= limit and current_group:
+            groups.append(current_group)
+            current_group = []
+            current_length = 0
+
+        current_group.append(i)
+        current_length += item_length
+
+    if current_group:
+        groups.append(current_group)
+
+    return groups
+
+def translate_packed_texts(texts, from_lang='en', to_lang='zh'):
+    """
+    将多条文本用分隔标记拼接后通过一次请求翻译，再按标记拆回各条。
+    分隔标记在翻译后丢失或错乱时返回None，由调用方回退为逐条翻译。
+    """
+    packed = '\n'.join(f"{PACK_MARKER.format(i)}\n{text.strip()}" for i, text in enumerate(texts))
+    translated = ts.translate_text(packed, translator='bing', from_language=from_lang, to_language=to_lang)
+
+    # 拆分结果为 [标记前内容, 序号0, 译文0, 序号1, 译文1, ...]
+    parts = PACK_MARKER_PATTERN.split(translated)
+    if parts[0].strip():
+        return None
+    indices = [int(idx) for idx in parts[1::2]]
+    if indices != list(range(len(texts))):
+        return None
+
+    results = [part.strip() for part in parts[2::2]]
+    # 原文非空而译文为空，说明拆分结果不可信
+    if any(text.strip() and not result for text, result in zip(texts, results)):
+        return None
+    return results
+
+def iter_translate_texts(texts, from_lang='en', to_lang='zh'):
+    """
+    批量翻译多条文本，将短文本打包为尽量少的请求。
+    每完成一次请求产出一批结果 [(索引, 译文), ...]，失败的条目译文以"[翻译失败]"开头。
+    翻译服务配置为本地模型时，按批次送入本地模型推理；
+    配置为智谱语言模型时，每次请求发送多条文本并发翻译。
+    """
+    provider = get_translate_provider()
+    if provider == 'local':
+        yield from _iter_translate_texts_local(texts)
+        return
+    if provider == 'zhipu':
+        from llm_translator import iter_translate_texts_zhipu
+        yield from iter_translate_texts_zhipu(texts)
+        return
+
+    for group in pack_texts_for_translation(texts):
+        # 单条文本直接走原有的长文本拆分翻译逻辑
+        if len(group) == 1:
+            yield [(group[0], translate_text(texts[group[0]], from_lang, to_lang))]
+            continue
+
+        try:
+            results = translate_packed_texts([texts[i] for i in group], from_lang, to_lang)
+        except Exception as e:
+            print(f"打包翻译失败，回退为逐条翻译: {e}")
+            results = None
+
+        if results is None:
+            # 分隔标记未能保留，逐条翻译
+            for i in group:
+                yield [(i, translate_text(texts[i], from_lang, to_lang))]
+        else:
+            yield list(zip(group, results))
+
+def _iter_translate_texts_local(texts):
+    """使用本地模型分块批量翻译，每块产出一批结果"""
+    from local_translator import translate_texts_local
+
+    # 每块包含若干个推理批次，既能批量推理又能及时反馈进度
+    chunk_size = max(1, config.get_translate_config().get('batch_size', 16)) * 4
+    for start in range(0, len(texts), chunk_size):
+        indices = list(range(start, min(start + chunk_size, len(texts))))
+        try:
+            results = translate_texts_local([texts[i] for i in indices])
+        except Exception as e:
+            results = [f"[翻译失败] {str(e)}"] * len(indices)
+        yield list(zip(indices, results))
@@ -0,0 +1,89 @@
+from PyQt6.QtCore import QObject, QEvent, QTimer, pyqtSignal
+
+class VisibleRangeTracker(QObject):
+    """
+    跟踪表格的可见行范围。
+    滚动、视口尺寸变化和行数变化只会启动一个短定时器，
+    定时器触发时计算一次可见范围，只通报新进入可见区域的行，
+    并根据滚动方向给出预加载行（向下滚动预加载下方，向上滚动预加载上方）。
+    """
+
+    # 参数：当前可见行(range)，新进入可见区域的行(list)，预加载行(list)
+    range_changed = pyqtSignal(object, list, list)
+
+    def __init__(self, view, prefetch_rows=10, interval_ms=50, parent=None):
+        super().__init__(parent)
+        self.view = view
+        self.prefetch_rows = prefetch_rows
+        self.visible = range(0)
+        self.direction = 1  # 1: 向下滚动，-1: 向上滚动
+
+        # 连续滚动时最多每 interval_ms 计算一次
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.update_range)
+
+        view.verticalScrollBar().valueChanged.connect(self.schedule)
+        view.viewport().installEventFilter(self)
+
+    def set_model(self, model):
+        """绑定表格模型，行数变化时重新计算可见范围"""
+        model.modelReset.connect(self.reset)
+        model.rowsInserted.connect(self.schedule)
+        model.rowsRemoved.connect(self.reset)
+        model.layoutChanged.connect(self.reset)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Resize:
+            self.schedule()
+        return super().eventFilter(obj, event)
+
+    def schedule(self, *args):
+        """请求重新计算可见范围，定时器已在等待时不重复启动"""
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def reset(self, *args):
+        """行数据整体变化后，所有可见行都视为新进入可见区域"""
+        self.visible = range(0)
+        self.direction = 1
+        self.schedule()
+
+    def compute_visible_rows(self):
+        """计算视口当前覆盖的行范围"""
+        row_count = self.view.model().rowCount() if self.view.model() is not None else 0
+        if row_count == 0:
+            return range(0)
+        rect = self.view.viewport().rect()
+        first = self.view.rowAt(rect.top())
+        last = self.view.rowAt(rect.bottom())
+        if first == -1:
+            return range(0)
+        if last == -1:
+            last = row_count - 1
+        return range(first, min(row_count, last + 1))
+
+    def update_range(self):
+        visible = self.compute_visible_rows()
+        previous = self.visible
+        if visible == previous:
+            return
+        if previous and visible:
+            if visible.start > previous.start:
+                self.direction = 1
+            elif visible.start < previous.start:
+                self.direction = -1
+        self.visible = visible
+
+        new_rows = [row for row in visible if row not in previous]
+        self.range_changed.emit(visible, new_rows, self.prefetch_range(visible))
+
+    def prefetch_range(self, visible):
+        """滚动方向上紧邻可见区域的若干行，离可见区域近的在前"""
+        if not visible or self.prefetch_rows <= 0:
+            return []
+        row_count = self.view.model().rowCount()
+        if self.direction > 0:
+            return list(range(visible.stop, min(row_count, visible.stop + self.prefetch_rows)))
+        return list(range(visible.start - 1, max(-1, visible.start - 1 - self.prefetch_rows), -1))
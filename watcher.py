@@ -0,0 +1,522 @@
+import os
+import sys
+import json
+import time
+import errno
+import select
+import struct
+import tempfile
+import threading
+import ctypes
+import ctypes.util
+import config
+from label_io import IMAGE_EXTENSIONS, read_sidecar
+from label_journal import RUNS_DIR
+from cli import DEFAULT_WORKERS, DEFAULT_INTERVALS, label_files
+
+# 监视目录的状态文件：记录每个目录上次处理完时的修改时间，重启后未变化的目录不再扫描
+DEFAULT_STATE_FILE = os.path.join(RUNS_DIR, "watch_state.json")
+# 同一张图片最多尝试打标的次数，超过后不再自动重试（避免坏图反复请求）
+MAX_ATTEMPTS = 3
+# 多久重新读取一次配置中的目录列表（秒）
+CONFIG_REFRESH_INTERVAL = 10.0
+
+# inotify 事件（见 <sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+def is_image_name(name):
+    return not name.startswith('.') and name.lower().endswith(IMAGE_EXTENSIONS)
+
+def list_subdirs(path):
+    """按名称顺序列出 path 下的全部子目录（不跟随符号链接，忽略隐藏目录）"""
+    result = []
+    try:
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        return result
+    for entry in entries:
+        try:
+            if not entry.name.startswith('.') and entry.is_dir(follow_symlinks=False):
+                result.append(entry.path)
+                result.extend(list_subdirs(entry.path))
+        except OSError:
+            continue
+    return result
+
+def directory_mtime(directory):
+    try:
+        return os.stat(directory).st_mtime_ns
+    except OSError:
+        return None
+
+class InotifyWatcher:
+    """
+    基于 Linux inotify 的目录监视（通过 ctypes 调用 libc，不需要额外依赖）。
+    poll() 返回 (新写入完成的图片路径集合, 需要重新扫描的目录集合)
+    """
+
+    def __init__(self, recursive=False):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.recursive = recursive
+        self.watches = {}  # wd -> 目录
+        self.paths = {}    # 目录 -> wd
+
+    def add_directory(self, path):
+        """监视目录（recursive 时包括全部子目录），返回新加入监视的目录列表"""
+        added = []
+        for directory in [path] + (list_subdirs(path) if self.recursive else []):
+            if directory in self.paths:
+                continue
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOSPC:
+                    raise OSError(error, "inotify 监视数量达到上限（fs.inotify.max_user_watches）")
+                print(f"监视目录失败: {directory}: {os.strerror(error)}", file=sys.stderr)
+                continue
+            self.watches[wd] = directory
+            self.paths[directory] = wd
+            added.append(directory)
+        return added
+
+    def remove_directory(self, path):
+        """取消监视目录及其子目录"""
+        prefix = os.path.join(path, '')
+        for directory in [d for d in self.paths if d == path or d.startswith(prefix)]:
+            wd = self.paths.pop(directory)
+            self.watches.pop(wd, None)
+            self.libc.inotify_rm_watch(self.fd, wd)
+
+    def poll(self, timeout):
+        images, rescan = set(), set()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return images, rescan
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return images, rescan
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].split(b'\0', 1)[0]
+            offset += length
+            name = os.fsdecode(name)
+            if mask & IN_Q_OVERFLOW:
+                # 事件队列溢出，可能丢失了事件，重新扫描全部目录
+                rescan.update(self.paths)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                # 目录被删除或移走
+                self.watches.pop(wd, None)
+                self.paths.pop(directory, None)
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if self.recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    # 新建或移入的子目录：加入监视，并扫描其中已有的图片
+                    rescan.update(self.add_directory(path))
+                continue
+            if mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and is_image_name(name):
+                images.add(path)
+        return images, rescan
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class PollingWatcher:
+    """
+    轮询方式的目录监视（非Linux系统或 inotify 不可用时使用）。
+    只在目录修改时间变化时列出目录，比较文件名集合找出新出现的图片。
+    """
+
+    def __init__(self, recursive=False, interval=5.0):
+        self.recursive = recursive
+        self.interval = interval
+        self.known = {}  # 目录 -> (目录修改时间, 图片文件名集合)
+        self.last_poll = 0.0
+
+    def add_directory(self, path):
+        added = []
+        for directory in [path] + (list_subdirs(path) if self.recursive else []):
+            if directory not in self.known:
+                self.known[directory] = self.list_directory(directory)
+                added.append(directory)
+        return added
+
+    def remove_directory(self, path):
+        prefix = os.path.join(path, '')
+        for directory in [d for d in self.known if d == path or d.startswith(prefix)]:
+            del self.known[directory]
+
+    def list_directory(self, directory):
+        try:
+            mtime = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as it:
+                names = {entry.name for entry in it if is_image_name(entry.name)}
+        except OSError:
+            return None, set()
+        return mtime, names
+
+    def poll(self, timeout):
+        images, rescan = set(), set()
+        wait = self.last_poll + self.interval - time.monotonic()
+        if wait > 0:
+            time.sleep(min(wait, timeout))
+            if wait > timeout:
+                return images, rescan
+        self.last_poll = time.monotonic()
+        for directory, (mtime, names) in list(self.known.items()):
+            try:
+                current_mtime = os.stat(directory).st_mtime_ns
+            except OSError:
+                # 目录被删除
+                del self.known[directory]
+                continue
+            if current_mtime == mtime:
+                continue
+            current_mtime, current_names = self.list_directory(directory)
+            self.known[directory] = (current_mtime, current_names)
+            images.update(os.path.join(directory, name) for name in current_names - names)
+            if self.recursive:
+                rescan.update(self.add_directory(directory))
+        return images, rescan
+
+    def close(self):
+        pass
+
+def create_watcher(recursive=False, force_polling=False, poll_interval=5.0):
+    """优先使用 inotify，不可用时退回轮询"""
+    if not force_polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(recursive)
+        except (OSError, AttributeError) as e:
+            print(f"inotify 不可用（{e}），改用轮询监视", file=sys.stderr)
+    return PollingWatcher(recursive, poll_interval)
+
+class WatchState:
+    """
+    监视状态文件：{'directories': {目录: 目录处理完时的修改时间}, 'failed': {图片路径: 失败次数}}
+    目录修改时间（新增、删除、重命名文件时变化）与记录一致时，重启后跳过该目录的扫描
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.directories = {}
+        self.failed = {}
+        self.lock = threading.Lock()
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self.directories = data.get('directories', {})
+            self.failed = data.get('failed', {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"读取监视状态文件出错，将重新扫描全部目录: {e}", file=sys.stderr)
+
+    def is_unchanged(self, directory):
+        return self.directories.get(directory) == directory_mtime(directory)
+
+    def mark_processed(self, directory, mtime):
+        """
+        记录目录已处理，mtime 为开始列出目录之前取得的修改时间：
+        列出目录之后才写入的图片会使修改时间与记录不一致，重启后重新扫描
+        """
+        if mtime is None:
+            self.directories.pop(directory, None)
+        else:
+            self.directories[directory] = mtime
+
+    def forget(self, directory):
+        """目录仍有未处理的图片，重启后重新扫描"""
+        self.directories.pop(directory, None)
+
+    def record_failure(self, image_path):
+        self.failed[image_path] = self.failed.get(image_path, 0) + 1
+
+    def should_retry(self, image_path):
+        return self.failed.get(image_path, 0) < MAX_ATTEMPTS
+
+    def save(self):
+        """原子写入状态文件"""
+        with self.lock:
+            data = {'directories': self.directories, 'failed': self.failed}
+            directory = os.path.dirname(self.path) or '.'
+            try:
+                os.makedirs(directory, exist_ok=True)
+                fd, temp_path = tempfile.mkstemp(prefix='.watch_state.', suffix='.tmp', dir=directory)
+                try:
+                    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                        json.dump(data, f, ensure_ascii=False)
+                    os.replace(temp_path, self.path)
+                except Exception:
+                    if os.path.exists(temp_path):
+                        os.remove(temp_path)
+                    raise
+            except OSError as e:
+                print(f"保存监视状态文件出错: {e}", file=sys.stderr)
+
+class WatchDaemon:
+    """
+    监视配置中登记的全部目录，为新出现且没有标签文件的图片打标。
+    新图片在 debounce 秒内没有新的写入（大小和修改时间不再变化）后才处理，
+    同一批图片按所属目录分组，使用该目录配置的提示词和打标服务（目录项的 backend 字段，未设置时用默认服务）。
+    """
+
+    def __init__(self, labeler, default_backend='florence2', recursive=False, debounce=2.0,
+                 workers=None, interval=None, state_path=None, force_polling=False,
+                 poll_interval=5.0, quiet=False):
+        self.labeler = labeler
+        self.default_backend = default_backend
+        self.recursive = recursive
+        self.debounce = debounce
+        self.workers = workers
+        self.interval = interval
+        self.quiet = quiet
+        self.state = WatchState(state_path or DEFAULT_STATE_FILE)
+        self.poll_interval = poll_interval
+        self.watcher = create_watcher(recursive, force_polling, poll_interval)
+        self.roots = {}    # 登记的目录 -> 目录配置项
+        self.pending = {}  # 图片路径 -> (最后一次变化的时间, (大小, 修改时间))
+        # 目录 -> 已列出或已加入过队列的图片文件名，打标后据此找出打标期间新出现的图片（排除本程序写入的标签文件）
+        self.known_images = {}
+        self.stop_event = threading.Event()
+        self.last_refresh = 0.0
+
+    def log(self, message):
+        if not self.quiet:
+            print(f"[{time.strftime('%H:%M:%S')}] {message}", file=sys.stderr)
+
+    def refresh_directories(self):
+        """根据配置更新监视的目录：新登记的目录加入监视并扫描，删除的目录取消监视"""
+        self.last_refresh = time.monotonic()
+        entries = {}
+        for entry in config.get_directories():
+            path = entry.get('path')
+            if path and os.path.isdir(path) and entry.get('watch', True):
+                entries[path] = entry
+        for path in list(self.roots):
+            if path not in entries:
+                self.watcher.remove_directory(path)
+                self.log(f"停止监视: {path}")
+        for path, entry in entries.items():
+            if path not in self.roots:
+                try:
+                    added = self.watcher.add_directory(path)
+                except OSError as e:
+                    added = self.fall_back_to_polling(e, path)
+                self.log(f"开始监视: {path}（{entry.get('backend') or self.default_backend}）")
+                for directory in added:
+                    self.scan_directory(directory)
+        self.roots = entries
+
+    def fall_back_to_polling(self, error, path):
+        """inotify 监视数量达到上限时改用轮询监视全部目录，返回新加入监视的目录列表"""
+        print(f"{error}，改用轮询监视", file=sys.stderr)
+        self.watcher.close()
+        self.watcher = PollingWatcher(self.recursive, self.poll_interval)
+        for root in self.roots:
+            self.watcher.add_directory(root)
+        return self.watcher.add_directory(path)
+
+    def scan_directory(self, directory, force=False):
+        """把目录中没有标签文件的图片加入待处理（目录自上次处理后没有变化时跳过）"""
+        if not force and self.state.is_unchanged(directory):
+            return
+        # 先取修改时间再列出目录，列出之后写入的图片会使记录的修改时间失效
+        mtime = directory_mtime(directory)
+        try:
+            names = self.list_images(directory)
+        except OSError as e:
+            print(f"扫描目录出错: {directory}: {e}", file=sys.stderr)
+            return
+        self.known_images[directory] = set(names)
+        count = 0
+        for name in names:
+            if self.add_pending(os.path.join(directory, name), settled=True):
+                count += 1
+        if count:
+            self.log(f"{directory}: 发现 {count} 张未打标的图片")
+        elif not self.has_pending(directory):
+            self.state.mark_processed(directory, mtime)
+
+    def list_images(self, directory):
+        with os.scandir(directory) as it:
+            return sorted(entry.name for entry in it if is_image_name(entry.name))
+
+    def check_new_images(self, directory):
+        """
+        打标结束后检查目录：打标期间新出现、尚未收到监视事件的图片加入队列（需要防抖），
+        没有待处理图片时以检查前的修改时间记录为已处理
+        """
+        mtime = directory_mtime(directory)
+        try:
+            names = self.list_images(directory)
+        except OSError as e:
+            print(f"扫描目录出错: {directory}: {e}", file=sys.stderr)
+            self.state.forget(directory)
+            return
+        known = self.known_images.setdefault(directory, set())
+        for name in names:
+            if name not in known:
+                self.add_pending(os.path.join(directory, name))
+        if not self.has_pending(directory):
+            self.state.mark_processed(directory, mtime)
+
+    def has_pending(self, directory):
+        return any(os.path.dirname(path) == directory for path in self.pending)
+
+    def file_signature(self, image_path):
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def add_pending(self, image_path, settled=False):
+        """加入待处理队列，已有标签或多次失败的图片跳过；settled 为 True 时不等待防抖（启动扫描的已有文件）"""
+        directory, name = os.path.split(image_path)
+        self.known_images.setdefault(directory, set()).add(name)
+        if read_sidecar(image_path)[0] or not self.state.should_retry(image_path):
+            return False
+        signature = self.file_signature(image_path)
+        if signature is None:
+            return False
+        changed_at = 0.0 if settled else time.monotonic()
+        self.pending[image_path] = (changed_at, signature)
+        return True
+
+    def ready_paths(self):
+        """返回已经稳定 debounce 秒的待处理图片，仍在写入的图片重新计时"""
+        now = time.monotonic()
+        ready = []
+        for image_path, (changed_at, signature) in list(self.pending.items()):
+            if now - changed_at < self.debounce:
+                continue
+            current = self.file_signature(image_path)
+            if current is None:
+                # 文件已被删除或移走
+                del self.pending[image_path]
+            elif current != signature:
+                self.pending[image_path] = (now, current)
+            else:
+                ready.append(image_path)
+        return ready
+
+    def root_of(self, image_path):
+        """图片所属的登记目录（递归监视时取最长匹配）"""
+        directory = os.path.dirname(image_path)
+        best = None
+        for root in self.roots:
+            if directory == root or directory.startswith(os.path.join(root, '')):
+                if best is None or len(root) > len(best):
+                    best = root
+        return best
+
+    def label_ready(self, ready):
+        from image_labeler import LabelerType
+
+        groups = {}
+        unfinished_dirs = set()
+        for image_path in ready:
+            del self.pending[image_path]
+            # 防抖期间可能已被其他程序打标
+            if read_sidecar(image_path)[0]:
+                continue
+            root = self.root_of(image_path)
+            if root is not None:
+                groups.setdefault(root, []).append(image_path)
+        for root, image_paths in groups.items():
+            if self.stop_event.is_set():
+                # 停止时尚未开始的目录重启后重新扫描
+                unfinished_dirs.update(os.path.dirname(path) for path in image_paths)
+                continue
+            entry = self.roots[root]
+            backend = entry.get('backend') or self.default_backend
+            try:
+                labeler_type = LabelerType(backend)
+            except ValueError:
+                print(f"目录 {root} 配置了未知的打标服务: {backend}", file=sys.stderr)
+                continue
+            self.log(f"{root}: 开始标注 {len(image_paths)} 张图片（{backend}）")
+            succeeded, failed, outcomes = label_files(
+                self.labeler, labeler_type, sorted(image_paths), root, config.snapshot(),
+                self.workers or DEFAULT_WORKERS[backend],
+                DEFAULT_INTERVALS.get(backend, 0.0) if self.interval is None else self.interval,
+                entry.get('trigger_word', ''), progress=not self.quiet, stop_event=self.stop_event
+            )
+            for image_path in image_paths:
+                if image_path not in outcomes:
+                    # 停止时没有处理到的图片不计为失败
+                    unfinished_dirs.add(os.path.dirname(image_path))
+                elif outcomes[image_path] is None:
+                    self.state.failed.pop(image_path, None)
+                else:
+                    # 失败的图片计数后重新加入队列，防抖时间过后在本次运行中重试，达到上限后不再重试
+                    self.state.record_failure(image_path)
+                    self.add_pending(image_path)
+            self.log(f"{root}: 成功 {succeeded} 张，失败 {failed} 张")
+        # 没有待处理图片的目录记录为已处理，重启后不再扫描；有未处理的图片时保留，重启后重新扫描
+        for directory in {os.path.dirname(path) for path in ready} - unfinished_dirs:
+            if self.has_pending(directory):
+                self.state.forget(directory)
+            else:
+                self.check_new_images(directory)
+        for directory in unfinished_dirs:
+            self.state.forget(directory)
+        self.state.save()
+
+    def run(self, once=False):
+        """
+        运行监视循环，stop() 后返回；once 为 True 时只处理启动时扫描到的图片后退出
+        （适合定时任务）
+        """
+        self.refresh_directories()
+        self.state.save()
+        try:
+            while not self.stop_event.is_set():
+                if once:
+                    if not self.pending:
+                        break
+                    ready = list(self.pending)
+                else:
+                    images, rescan = self.watcher.poll(0.5)
+                    for image_path in images:
+                        self.add_pending(image_path)
+                    for directory in rescan:
+                        self.scan_directory(directory, force=True)
+                    if time.monotonic() - self.last_refresh >= CONFIG_REFRESH_INTERVAL:
+                        self.refresh_directories()
+                    ready = self.ready_paths()
+                if ready:
+                    self.label_ready(ready)
+        finally:
+            self.watcher.close()
+            # 仍有待处理图片的目录重启后重新扫描
+            for directory in {os.path.dirname(path) for path in self.pending}:
+                self.state.forget(directory)
+            self.state.save()
+
+    def stop(self):
+        self.stop_event.set()
@@ -0,0 +1,114 @@
+import re
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QFormLayout, QComboBox, QLineEdit, QCheckBox, QSpinBox, QDialogButtonBox, QMessageBox
+)
+from PyQt6.QtCore import Qt
+from bulk_ops import (
+    OP_REGEX_REPLACE, OP_PREPEND_TAG, OP_APPEND_TAG, OP_REMOVE_TAG, OP_DEDUPE_TAGS, OP_TRUNCATE
+)
+
+class BulkEditDialog(QDialog):
+    """批量编辑英文打标：选择操作和参数"""
+
+    OPERATIONS = [
+        ("正则查找替换", OP_REGEX_REPLACE),
+        ("在开头添加标签", OP_PREPEND_TAG),
+        ("在末尾添加标签", OP_APPEND_TAG),
+        ("删除标签", OP_REMOVE_TAG),
+        ("删除重复标签", OP_DEDUPE_TAGS),
+        ("截断到最大长度", OP_TRUNCATE),
+    ]
+
+    def __init__(self, trigger_word="", filtered=False, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("批量编辑打标")
+        self.setWindowFlag(Qt.WindowType.WindowContextHelpButtonHint, False)
+        self.setMinimumWidth(500)
+        layout = QVBoxLayout(self)
+        form = QFormLayout()
+
+        self.op_combo = QComboBox()
+        for text, op in self.OPERATIONS:
+            self.op_combo.addItem(text, op)
+        self.op_combo.currentIndexChanged.connect(self.update_fields)
+        form.addRow("操作:", self.op_combo)
+
+        self.pattern_input = QLineEdit()
+        self.pattern_input.setPlaceholderText("Python 正则表达式")
+        form.addRow("查找:", self.pattern_input)
+        self.replacement_input = QLineEdit()
+        self.replacement_input.setPlaceholderText("替换为（可使用 \\1 引用分组）")
+        form.addRow("替换为:", self.replacement_input)
+        self.ignore_case_check = QCheckBox("忽略大小写")
+        form.addRow("", self.ignore_case_check)
+
+        self.tag_input = QLineEdit(trigger_word)
+        self.tag_input.setPlaceholderText("标签文本，如触发词")
+        form.addRow("标签:", self.tag_input)
+
+        self.max_length_spin = QSpinBox()
+        self.max_length_spin.setRange(1, 100000)
+        self.max_length_spin.setValue(300)
+        self.max_length_spin.setSuffix(" 字符")
+        form.addRow("最大长度:", self.max_length_spin)
+
+        self.filtered_check = QCheckBox("只修改当前筛选显示的行")
+        self.filtered_check.setChecked(filtered)
+        self.filtered_check.setEnabled(filtered)
+        form.addRow("", self.filtered_check)
+
+        layout.addLayout(form)
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Ok | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+        self.form = form
+        self.update_fields()
+
+    def update_fields(self):
+        """只显示当前操作需要的参数"""
+        op = self.op_combo.currentData()
+        visible = {
+            self.pattern_input: op == OP_REGEX_REPLACE,
+            self.replacement_input: op == OP_REGEX_REPLACE,
+            self.ignore_case_check: op == OP_REGEX_REPLACE,
+            self.tag_input: op in (OP_PREPEND_TAG, OP_APPEND_TAG, OP_REMOVE_TAG),
+            self.max_length_spin: op == OP_TRUNCATE,
+        }
+        for widget, show in visible.items():
+            self.form.setRowVisible(widget, show)
+
+    def get_operation(self):
+        """返回批量编辑操作配置"""
+        op = self.op_combo.currentData()
+        spec = {'op': op}
+        if op == OP_REGEX_REPLACE:
+            spec.update({
+                'pattern': self.pattern_input.text(),
+                'replacement': self.replacement_input.text(),
+                'ignore_case': self.ignore_case_check.isChecked(),
+            })
+        elif op in (OP_PREPEND_TAG, OP_APPEND_TAG, OP_REMOVE_TAG):
+            spec['tag'] = self.tag_input.text().strip()
+        elif op == OP_TRUNCATE:
+            spec['max_length'] = self.max_length_spin.value()
+        return spec
+
+    def only_filtered(self):
+        return self.filtered_check.isChecked()
+
+    def accept(self):
+        spec = self.get_operation()
+        if spec['op'] == OP_REGEX_REPLACE:
+            if not spec['pattern']:
+                QMessageBox.warning(self, "警告", "请输入查找内容")
+                return
+            try:
+                re.compile(spec['pattern'])
+            except re.error as e:
+                QMessageBox.warning(self, "警告", f"正则表达式无效: {e}")
+                return
+        if 'tag' in spec and not spec['tag']:
+            QMessageBox.warning(self, "警告", "请输入标签")
+            return
+        super().accept()
@@ -0,0 +1,105 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QProgressBar,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QSplitter
+)
+from PyQt6.QtCore import Qt
+
+class DatasetProgressDialog(QDialog):
+    """
+    全部目录打标的进度：每个目录一行，显示进度条和失败数量，下方列出失败的图像和原因
+    （非模态，打标期间可以继续操作主窗口）
+    """
+
+    def __init__(self, run, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("全部目录打标")
+        self.setWindowFlag(Qt.WindowType.WindowContextHelpButtonHint, False)
+        self.resize(700, 500)
+        self.run = run
+        self.rows = {}  # 目录 -> 表格行号
+
+        layout = QVBoxLayout(self)
+        self.summary_label = QLabel()
+        layout.addWidget(self.summary_label)
+
+        directories = run.directories()
+        self.table = self.create_table(["目录", "进度", "失败"])
+        self.table.setRowCount(len(directories))
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Fixed)
+        self.table.setColumnWidth(1, 200)
+        for row, directory in enumerate(directories):
+            self.rows[directory] = row
+            self.table.setItem(row, 0, QTableWidgetItem(directory))
+            progress_bar = QProgressBar()
+            progress_bar.setRange(0, max(run.totals[directory], 1))
+            progress_bar.setFormat("%v / %m")
+            self.table.setCellWidget(row, 1, progress_bar)
+            self.table.setItem(row, 2, QTableWidgetItem("0"))
+
+        # 失败的图像，错误信息较长时悬停查看完整内容
+        self.failure_table = self.create_table(["失败的图像", "原因"])
+        self.failure_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        splitter = QSplitter(Qt.Orientation.Vertical)
+        splitter.addWidget(self.table)
+        splitter.addWidget(self.failure_table)
+        layout.addWidget(splitter)
+
+        button_layout = QHBoxLayout()
+        button_layout.addStretch()
+        self.cancel_btn = QPushButton("取消打标")
+        self.cancel_btn.clicked.connect(run.cancel)
+        button_layout.addWidget(self.cancel_btn)
+        close_btn = QPushButton("关闭")
+        close_btn.clicked.connect(self.close)
+        button_layout.addWidget(close_btn)
+        layout.addLayout(button_layout)
+
+        run.directory_progress.connect(self.update_directory)
+        run.image_failed.connect(self.add_failure)
+        run.run_finished.connect(self.on_run_finished)
+        self.update_summary()
+
+    def create_table(self, headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        for column in range(1, len(headers)):
+            table.horizontalHeader().setSectionResizeMode(column, QHeaderView.ResizeMode.ResizeToContents)
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        table.verticalHeader().setVisible(False)
+        return table
+
+    def add_failure(self, directory, image_path, error_msg):
+        row = self.failure_table.rowCount()
+        self.failure_table.insertRow(row)
+        self.failure_table.setItem(row, 0, QTableWidgetItem(image_path))
+        reason = QTableWidgetItem(error_msg)
+        reason.setToolTip(error_msg)
+        self.failure_table.setItem(row, 1, reason)
+
+    def update_directory(self, directory, succeeded, failed, total):
+        row = self.rows.get(directory)
+        if row is None:
+            return
+        progress_bar = self.table.cellWidget(row, 1)
+        progress_bar.setMaximum(max(total, 1))
+        progress_bar.setValue(succeeded + failed)
+        self.table.item(row, 2).setText(str(failed))
+        self.update_summary()
+
+    def update_summary(self):
+        run = self.run
+        total = sum(run.totals.values())
+        succeeded = sum(run.succeeded.values())
+        failed = sum(run.failed.values())
+        finished = sum(1 for directory in run.totals if run.succeeded[directory] + run.failed[directory] >= run.totals[directory])
+        self.summary_label.setText(
+            f"{len(run.totals)} 个目录，已完成 {finished} 个；共 {total} 张图片，成功 {succeeded} 张，失败 {failed} 张"
+        )
+
+    def on_run_finished(self, succeeded, failed, cancelled):
+        self.update_summary()
+        self.cancel_btn.setEnabled(False)
+        state = "已取消" if cancelled else "已完成"
+        self.setWindowTitle(f"全部目录打标（{state}）")
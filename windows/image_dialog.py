@@ -1,38 +1,379 @@
+import math
 from PyQt6.QtWidgets import (
-    QDialog, QVBoxLayout, QLabel
+    QDialog, QVBoxLayout, QLabel, QWidget, QApplication
 )
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QPixmap
+from PyQt6.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, QRect, QRectF, QPointF, QSize, pyqtSignal
+from PyQt6.QtGui import QPixmap, QImage, QImageReader, QPainter, QColor
+from memory_cache import MemoryLRUCache
+from thumbnail_loader import decode_thumbnail, pixmap_bytes
+
+# 瓦片边长（像素），瓦片金字塔第 level 层的缩放比例为 1 / 2^level
+TILE_SIZE = 512
+# 瓦片内存缓存上限
+TILE_CACHE_BYTES = 128 * 1024 * 1024
+# 首次显示时同步解码的小图边长（没有现成缩略图时使用）
+QUICK_PREVIEW_SIZE = 400
+# 最大放大倍数（相对原图像素）
+MAX_ZOOM = 8.0
+# 支持区域解码的格式：setClipRect 只对 JPEG 跳过区域外的数据，其他格式每次都要解码整张图
+REGION_DECODING_FORMATS = (b'jpeg', b'jpg')
+
+class DecodeTask(QRunnable):
+    """在线程池中解码原图的一个区域，clip_rect 为原图坐标（为None时解码整张图），scaled_size 为输出尺寸"""
+
+    def __init__(self, loader, generation, key, image_path, clip_rect=None, scaled_size=None, max_size=None):
+        super().__init__()
+        self.loader = loader
+        self.generation = generation
+        self.key = key
+        self.image_path = image_path
+        self.clip_rect = clip_rect
+        self.scaled_size = scaled_size
+        self.max_size = max_size
+
+    def run(self):
+        if self.loader.generation != self.generation:
+            return
+        if self.max_size is not None:
+            image = decode_thumbnail(self.image_path, self.max_size)
+        else:
+            reader = QImageReader(self.image_path)
+            # 先裁剪原图区域再缩小，JPEG 可以跳过区域外的数据并在解码阶段缩小
+            if self.clip_rect is not None:
+                reader.setClipRect(self.clip_rect)
+            reader.setScaledSize(self.scaled_size)
+            image = reader.read()
+        self.loader.task_done.emit(self.generation, self.key, image)
+
+class ImageTileLoader(QObject):
+    """
+    原图预览的后台解码器，负责整图预览的精细解码和瓦片解码。
+    JPEG 按瓦片区域解码；其他格式无法只解码一个区域，每个层级整体解码一次后从中切分瓦片
+    """
+
+    # 解码完成：key（"preview" 或 (level, tx, ty)）, 图像
+    decoded = pyqtSignal(object, QImage)
+    # 不支持区域解码的格式整体解码完一个层级：level
+    level_decoded = pyqtSignal(int)
+    # 内部信号：工作线程解码完成
+    task_done = pyqtSignal(int, object, QImage)
 
-class ImageDialog(QDialog):
     def __init__(self, image_path, parent=None):
+        super().__init__(parent)
+        self.image_path = image_path
+        reader = QImageReader(image_path)
+        self.image_size = reader.size()
+        self.region_decoding = bytes(reader.format()).lower() in REGION_DECODING_FORMATS
+        # 不支持区域解码时只保留最近解码的一个层级
+        self.level_image = None
+        self.level_image_level = None
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self.generation = 0
+        self.pending = set()
+        self.task_done.connect(self.on_task_done)
+
+    def request_preview(self, max_size):
+        """以不超过 max_size 的尺寸解码整张图"""
+        self.pending.add("preview")
+        self.pool.start(DecodeTask(self, self.generation, "preview", self.image_path, max_size=max_size), 1)
+
+    def request_tile(self, key, clip_rect, scaled_size):
+        """
+        请求一个瓦片：能从已解码的层级中直接切出时返回瓦片图像，
+        否则提交后台解码并返回None，解码完成后通过 decoded 或 level_decoded 通知
+        """
+        if not self.region_decoding:
+            return self.request_level_tile(key, clip_rect, scaled_size)
+        if key in self.pending:
+            return None
+        self.pending.add(key)
+        self.pool.start(DecodeTask(self, self.generation, key, self.image_path, clip_rect, scaled_size))
+        return None
+
+    def request_level_tile(self, key, clip_rect, scaled_size):
+        """不支持区域解码的格式：从整体解码的层级图像中切分瓦片，层级尚未解码时提交一次整体解码"""
+        level = key[0]
+        if self.level_image is not None and self.level_image_level == level:
+            factor = 1 << level
+            rect = QRect(clip_rect.x() // factor, clip_rect.y() // factor, scaled_size.width(), scaled_size.height())
+            return self.level_image.copy(rect.intersected(self.level_image.rect()))
+        level_key = ('level', level)
+        if level_key not in self.pending:
+            self.pending.add(level_key)
+            size = QSize(max(1, self.image_size.width() >> level), max(1, self.image_size.height() >> level))
+            self.pool.start(DecodeTask(self, self.generation, level_key, self.image_path, scaled_size=size))
+        return None
+
+    def cancel_queued(self):
+        """丢弃尚未开始的瓦片解码（缩放层级变化时调用），正在解码的瓦片完成后仍会写入缓存"""
+        self.pool.clear()
+        self.pending.clear()
+
+    def shutdown(self):
+        """关闭预览时取消所有解码并等待工作线程结束"""
+        self.generation += 1
+        self.pool.clear()
+        self.pool.waitForDone()
+        self.pending.clear()
+
+    def on_task_done(self, generation, key, image):
+        if generation != self.generation:
+            return
+        self.pending.discard(key)
+        if isinstance(key, tuple) and key[0] == 'level':
+            if not image.isNull():
+                self.level_image = image
+                self.level_image_level = key[1]
+                self.level_decoded.emit(key[1])
+            return
+        self.decoded.emit(key, image)
+
+class ImageCanvas(QWidget):
+    """
+    原图预览画布。
+    先显示缩小的整图预览，放大到预览分辨率不够时按瓦片金字塔解码可见区域，
+    瓦片按 LRU 缓存，无需在内存中保存完整原图。
+    """
+
+    # 缩放比例变化（显示像素 / 原图像素）
+    zoom_changed = pyqtSignal(float)
+
+    def __init__(self, image_path, preview=None, parent=None):
+        super().__init__(parent)
+        self.setMouseTracking(False)
+        self.setMinimumSize(100, 100)
+
+        self.image_size = QImageReader(image_path).size()
+        self.zoom = None  # None 表示适应窗口
+        self.center = QPointF(self.image_size.width() / 2, self.image_size.height() / 2)
+        self.drag_pos = None
+        self.tile_level = None
+
+        # 没有现成缩略图时同步解码一张小图，保证对话框打开时立即有内容
+        if preview is None or preview.isNull():
+            preview = QPixmap.fromImage(decode_thumbnail(image_path, QUICK_PREVIEW_SIZE))
+        self.preview = preview
+
+        self.tiles = MemoryLRUCache(TILE_CACHE_BYTES, pixmap_bytes)
+        self.loader = ImageTileLoader(image_path, self)
+        self.loader.decoded.connect(self.on_decoded)
+        self.loader.level_decoded.connect(lambda level: self.update())
+
+        # 调整窗口大小、缩放或拖动时先用快速变换绘制，停止操作后再平滑绘制一次
+        self.fast_mode = False
+        self.smooth_timer = QTimer(self)
+        self.smooth_timer.setSingleShot(True)
+        self.smooth_timer.setInterval(150)
+        self.smooth_timer.timeout.connect(self.on_interaction_settled)
+
+    def is_valid(self):
+        return self.image_size.isValid() and not self.image_size.isEmpty()
+
+    def start_refine(self):
+        """后台按屏幕尺寸解码整图预览，替换初始的小图"""
+        if not self.is_valid():
+            return
+        screen = QApplication.primaryScreen().availableGeometry()
+        max_size = min(max(screen.width(), screen.height()), max(self.image_size.width(), self.image_size.height()))
+        if max_size > max(self.preview.width(), self.preview.height()):
+            self.loader.request_preview(max_size)
+
+    def fit_scale(self):
+        return min(self.width() / self.image_size.width(), self.height() / self.image_size.height())
+
+    def current_scale(self):
+        return self.fit_scale() if self.zoom is None else self.zoom
+
+    def image_to_widget_rect(self, scale):
+        """原图在画布坐标中的位置"""
+        if self.zoom is None:
+            center = QPointF(self.image_size.width() / 2, self.image_size.height() / 2)
+        else:
+            center = self.center
+        left = self.width() / 2 - center.x() * scale
+        top = self.height() / 2 - center.y() * scale
+        return QRectF(left, top, self.image_size.width() * scale, self.image_size.height() * scale)
+
+    def mark_interaction(self):
+        self.fast_mode = True
+        self.smooth_timer.start()
+        self.update()
+
+    def on_interaction_settled(self):
+        self.fast_mode = False
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        if not self.is_valid():
+            painter.setPen(QColor("#9e9e9e"))
+            painter.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "无法加载")
+            return
+
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform, not self.fast_mode)
+        scale = self.current_scale()
+        target = self.image_to_widget_rect(scale)
+        if not self.preview.isNull():
+            painter.drawPixmap(target, self.preview, QRectF(self.preview.rect()))
+
+        # 预览图分辨率足够时不需要瓦片
+        preview_scale = self.preview.width() / self.image_size.width() if not self.preview.isNull() else 0
+        if scale <= preview_scale * 1.01:
+            return
+        self.paint_tiles(painter, scale, target)
+
+    def paint_tiles(self, painter, scale, target):
+        """绘制可见区域的瓦片，缺失的瓦片提交后台解码，先由预览图占位"""
+        level = max(0, int(math.floor(math.log2(1 / scale)))) if scale < 1 else 0
+        if level != self.tile_level:
+            # 缩放层级变化，之前层级排队中的瓦片已不再需要
+            self.loader.cancel_queued()
+            self.tile_level = level
+        factor = 1 << level
+        span = TILE_SIZE * factor  # 一个瓦片覆盖的原图像素
+
+        visible = QRectF(self.rect()).intersected(target)
+        if visible.isEmpty():
+            return
+        image_left = (visible.left() - target.left()) / scale
+        image_top = (visible.top() - target.top()) / scale
+        image_right = (visible.right() - target.left()) / scale
+        image_bottom = (visible.bottom() - target.top()) / scale
+        width, height = self.image_size.width(), self.image_size.height()
+
+        for ty in range(int(image_top // span), min(int(image_bottom // span), (height - 1) // span) + 1):
+            for tx in range(int(image_left // span), min(int(image_right // span), (width - 1) // span) + 1):
+                clip = QRect(tx * span, ty * span, min(span, width - tx * span), min(span, height - ty * span))
+                key = (level, tx, ty)
+                tile = self.tiles.get(key)
+                if tile is None:
+                    scaled_size = QSize(max(1, clip.width() // factor), max(1, clip.height() // factor))
+                    image = self.loader.request_tile(key, clip, scaled_size)
+                    if image is None or image.isNull():
+                        continue
+                    tile = QPixmap.fromImage(image)
+                    self.tiles.put(key, tile)
+                painter.drawPixmap(
+                    QRectF(target.left() + clip.left() * scale, target.top() + clip.top() * scale,
+                           clip.width() * scale, clip.height() * scale),
+                    tile, QRectF(tile.rect())
+                )
+
+    def on_decoded(self, key, image):
+        if image.isNull():
+            return
+        if key == "preview":
+            self.preview = QPixmap.fromImage(image)
+        else:
+            self.tiles.put(key, QPixmap.fromImage(image))
+        self.update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.mark_interaction()
+
+    def set_zoom(self, zoom, anchor=None):
+        """设置缩放比例，anchor 为保持不动的画布坐标点"""
+        if not self.is_valid():
+            return
+        old_scale = self.current_scale()
+        old_target = self.image_to_widget_rect(old_scale)
+        if anchor is None:
+            anchor = QPointF(self.width() / 2, self.height() / 2)
+        # 锚点对应的原图坐标
+        image_point = QPointF((anchor.x() - old_target.left()) / old_scale, (anchor.y() - old_target.top()) / old_scale)
+
+        fit = self.fit_scale()
+        zoom = min(zoom, max(MAX_ZOOM, fit))
+        if zoom <= fit:
+            self.zoom = None
+        else:
+            self.zoom = zoom
+            self.center = QPointF(
+                image_point.x() - (anchor.x() - self.width() / 2) / zoom,
+                image_point.y() - (anchor.y() - self.height() / 2) / zoom
+            )
+            self.clamp_center()
+        self.zoom_changed.emit(self.current_scale())
+        self.mark_interaction()
+
+    def clamp_center(self):
+        """限制平移范围，避免图像被拖出画布"""
+        scale = self.current_scale()
+        half_w = min(self.width() / 2 / scale, self.image_size.width() / 2)
+        half_h = min(self.height() / 2 / scale, self.image_size.height() / 2)
+        self.center = QPointF(
+            min(max(self.center.x(), half_w), self.image_size.width() - half_w),
+            min(max(self.center.y(), half_h), self.image_size.height() - half_h)
+        )
+
+    def wheelEvent(self, event):
+        steps = event.angleDelta().y() / 120
+        if steps:
+            self.set_zoom(self.current_scale() * (1.25 ** steps), event.position())
+
+    def mouseDoubleClickEvent(self, event):
+        # 双击在适应窗口和原始大小之间切换
+        if self.zoom is None:
+            self.set_zoom(1.0, event.position())
+        else:
+            self.set_zoom(0)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.MouseButton.LeftButton and self.zoom is not None:
+            self.drag_pos = event.position()
+            self.setCursor(Qt.CursorShape.ClosedHandCursor)
+
+    def mouseMoveEvent(self, event):
+        if self.drag_pos is None:
+            return
+        delta = event.position() - self.drag_pos
+        self.drag_pos = event.position()
+        self.center = QPointF(self.center.x() - delta.x() / self.zoom, self.center.y() - delta.y() / self.zoom)
+        self.clamp_center()
+        self.mark_interaction()
+
+    def mouseReleaseEvent(self, event):
+        self.drag_pos = None
+        self.unsetCursor()
+
+class ImageDialog(QDialog):
+    def __init__(self, image_path, parent=None, preview=None):
         super().__init__(parent)
         self.setWindowTitle("原图预览")
         self.setWindowFlags(self.windowFlags() & ~Qt.WindowType.WindowContextHelpButtonHint)
         layout = QVBoxLayout(self)
-        self.label = QLabel()
-        self.label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-        layout.addWidget(self.label)
+        # 先显示缩略图或快速解码的小图，清晰的整图和放大瓦片在后台解码
+        self.canvas = ImageCanvas(image_path, preview, self)
+        layout.addWidget(self.canvas, 1)
+        self.info_label = QLabel()
+        self.info_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(self.info_label)
         self.setMinimumSize(300, 200)
+        self.canvas.zoom_changed.connect(self.update_info)
 
-        # 加载原图并自适应窗口显示全部内容
-        self.pixmap = QPixmap(image_path)
-        self.update_pixmap()
         # 根据图片宽高比例设置窗口初始大小，最大不超过1200x900
-        if not self.pixmap.isNull():
+        size = self.canvas.image_size
+        if self.canvas.is_valid():
             max_w, max_h = 1200, 900
-            w, h = self.pixmap.width(), self.pixmap.height()
+            w, h = size.width(), size.height()
             scale = min(max_w / w, max_h / h, 1.0)
-            self.resize(int(w * scale) + 40, int(h * scale) + 40)
+            self.resize(int(w * scale) + 40, int(h * scale) + 70)
+        self.canvas.start_refine()
 
-    def resizeEvent(self, event):
-        # 窗口大小变化时，图片自适应缩放，保证完整显示
-        self.update_pixmap()
-        super().resizeEvent(event)
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_info(self.canvas.current_scale())
+
+    def update_info(self, scale):
+        if not self.canvas.is_valid():
+            self.info_label.setText("")
+            return
+        size = self.canvas.image_size
+        self.info_label.setText(f"{size.width()} × {size.height()}  {scale:.0%}  （滚轮缩放，拖动平移，双击切换适应窗口/原始大小）")
 
-    def update_pixmap(self):
-        if not self.pixmap.isNull():
-            w = max(self.width() - 40, 100)
-            h = max(self.height() - 40, 100)
-            scaled = self.pixmap.scaled(w, h, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-            self.label.setPixmap(scaled)
\ No newline at end of file
+    def done(self, result):
+        # 关闭前停止后台解码，避免工作线程访问已销毁的对象
+        self.canvas.loader.shutdown()
+        super().done(result)
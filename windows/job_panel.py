@@ -0,0 +1,144 @@
+from PyQt6.QtWidgets import (
+    QWidget, QVBoxLayout, QHBoxLayout, QLabel, QProgressBar, QPushButton, QFrame
+)
+from PyQt6.QtCore import QTimer
+from job_scheduler import JOB_QUEUED, JOB_RUNNING, JOB_PAUSED, JOB_CANCELLED, JOB_FINISHED
+from metrics import format_snapshot
+
+STATE_TEXT = {
+    JOB_QUEUED: "等待中",
+    JOB_RUNNING: "进行中",
+    JOB_PAUSED: "已暂停",
+    JOB_CANCELLED: "已取消",
+    JOB_FINISHED: "已完成",
+}
+
+# 任务结束后在面板中保留多久（毫秒）
+FINISHED_JOB_VISIBLE_MS = 5000
+# 性能统计刷新间隔（毫秒）
+METRICS_REFRESH_MS = 1000
+
+class JobRow(QFrame):
+    """任务面板中的一行：任务名称、进度条、状态以及暂停/继续、取消按钮，打标任务下方显示性能统计"""
+
+    def __init__(self, scheduler, job, parent=None):
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.job_id = job.job_id
+        row_layout = QVBoxLayout(self)
+        row_layout.setContentsMargins(0, 0, 0, 0)
+        row_layout.setSpacing(2)
+        layout = QHBoxLayout()
+        row_layout.addLayout(layout)
+        self.title_label = QLabel(job.title)
+        layout.addWidget(self.title_label)
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, max(job.total, 1))
+        self.progress_bar.setFormat("%v / %m")
+        layout.addWidget(self.progress_bar, 1)
+        self.state_label = QLabel()
+        layout.addWidget(self.state_label)
+        self.pause_btn = QPushButton("暂停")
+        self.pause_btn.clicked.connect(self.toggle_pause)
+        layout.addWidget(self.pause_btn)
+        self.cancel_btn = QPushButton("取消")
+        self.cancel_btn.clicked.connect(lambda: self.scheduler.cancel(self.job_id))
+        layout.addWidget(self.cancel_btn)
+        self.metrics_label = QLabel()
+        self.metrics_label.setStyleSheet("color: gray;")
+        self.metrics_label.setVisible(False)
+        row_layout.addWidget(self.metrics_label)
+        self.set_state(job.state)
+
+    def toggle_pause(self):
+        job = self.scheduler.job(self.job_id)
+        if job is None:
+            return
+        if job.state == JOB_PAUSED:
+            self.scheduler.resume(self.job_id)
+        else:
+            self.scheduler.pause(self.job_id)
+
+    def set_progress(self, done, total):
+        self.progress_bar.setMaximum(max(total, 1))
+        self.progress_bar.setValue(done)
+
+    def set_metrics_text(self, text):
+        self.metrics_label.setText(text)
+        self.metrics_label.setVisible(bool(text))
+
+    def set_state(self, state):
+        self.state_label.setText(STATE_TEXT.get(state, state))
+        active = state in (JOB_QUEUED, JOB_RUNNING, JOB_PAUSED)
+        self.pause_btn.setText("继续" if state == JOB_PAUSED else "暂停")
+        self.pause_btn.setEnabled(active)
+        self.cancel_btn.setEnabled(active)
+
+class JobPanel(QWidget):
+    """显示调度器中每个批量任务的进度和性能统计，没有任务时自动隐藏"""
+
+    def __init__(self, scheduler, parent=None):
+        super().__init__(parent)
+        self.scheduler = scheduler
+        self.rows = {}  # 任务ID -> JobRow
+        self.metrics = {}  # 任务ID -> RunMetrics
+        self.layout = QVBoxLayout(self)
+        self.layout.setContentsMargins(0, 0, 0, 0)
+        self.setVisible(False)
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.setInterval(METRICS_REFRESH_MS)
+        self.metrics_timer.timeout.connect(self.refresh_metrics)
+        scheduler.job_state_changed.connect(self.on_job_state_changed)
+        scheduler.job_progress.connect(self.on_job_progress)
+        scheduler.job_finished.connect(self.on_job_finished)
+
+    def set_metrics(self, job_id, metrics):
+        """为任务显示性能统计（吞吐量、分阶段延迟、队列深度、错误率、预计剩余时间）"""
+        self.metrics[job_id] = metrics
+        self.refresh_metrics()
+        if not self.metrics_timer.isActive():
+            self.metrics_timer.start()
+
+    def refresh_metrics(self):
+        for job_id, metrics in list(self.metrics.items()):
+            row = self.rows.get(job_id)
+            # 任务结束后调度器不再保留，队列深度为0
+            job = self.scheduler.job(job_id)
+            if row is not None:
+                row.set_metrics_text(format_snapshot(metrics.snapshot(len(job.items) if job is not None else 0)))
+            if job is None:
+                # 任务结束后保留最终统计，不再刷新
+                del self.metrics[job_id]
+        if not self.metrics:
+            self.metrics_timer.stop()
+
+    def on_job_state_changed(self, job_id, state):
+        row = self.rows.get(job_id)
+        if row is None:
+            # 提交任务时创建；单行任务的状态直接显示在行按钮上
+            job = self.scheduler.job(job_id)
+            if state != JOB_QUEUED or job is None or job.interactive:
+                return
+            row = JobRow(self.scheduler, job, self)
+            self.rows[job_id] = row
+            self.layout.addWidget(row)
+            self.setVisible(True)
+        row.set_state(state)
+
+    def on_job_finished(self, job_id, success_count, state):
+        if job_id not in self.rows:
+            return
+        if job_id in self.metrics:
+            self.refresh_metrics()
+        QTimer.singleShot(FINISHED_JOB_VISIBLE_MS, lambda: self.remove_row(job_id))
+
+    def on_job_progress(self, job_id, done, total):
+        row = self.rows.get(job_id)
+        if row is not None:
+            row.set_progress(done, total)
+
+    def remove_row(self, job_id):
+        row = self.rows.pop(job_id, None)
+        if row is not None:
+            row.deleteLater()
+        self.setVisible(bool(self.rows))
@@ -19,10 +19,12 @@ class ModelConfigDialog(QDialog):
         self.gemini_tab = QWidget()
         self.zhipu_tab = QWidget()
         self.florence2_tab = QWidget()
+        self.translate_tab = QWidget()
         
         self.tabs.addTab(self.gemini_tab, "Gemini配置")
         self.tabs.addTab(self.zhipu_tab, "智谱AI配置")
         self.tabs.addTab(self.florence2_tab, "Florence2配置")
+        self.tabs.addTab(self.translate_tab, "翻译配置")
         
         self.layout.addWidget(self.tabs)
         
@@ -31,6 +33,7 @@ class ModelConfigDialog(QDialog):
         self.zhipu_llm_config = config.get_zhipu_llm_config()
         self.zhipu_label_config = config.get_zhipu_label_config()
         self.florence2_config = config.get_florence2_config()
+        self.translate_config = config.get_translate_config()
 
         # 如果没有提供当前配置，使用默认配置
         if not self.gemini_config:
@@ -54,6 +57,9 @@ class ModelConfigDialog(QDialog):
         # 设置Florence2选项卡
         self.setup_florence2_tab(self.florence2_config)
         
+        # 设置翻译选项卡
+        self.setup_translate_tab(self.translate_config)
+        
         # 按钮
         buttons_layout = QHBoxLayout()
         self.cancel_btn = QPushButton("取消")
@@ -219,7 +225,7 @@ class ModelConfigDialog(QDialog):
         features_layout = QVBoxLayout(features_group_box)
         
         # 语言模型功能说明
-        llm_label = QLabel("• 语言模型：系统使用智谱AI进行高质量文本生成。")
+        llm_label = QLabel("• 语言模型：在\"翻译配置\"中选择智谱AI语言模型后，用于批量翻译打标结果。")
         llm_label.setWordWrap(True)
         features_layout.addWidget(llm_label)
         
@@ -290,6 +296,53 @@ class ModelConfigDialog(QDialog):
         florence2_layout.addWidget(config_group)
         florence2_layout.addStretch(1)
 
+    def setup_translate_tab(self, current_config):
+        """设置翻译选项卡"""
+        translate_layout = QVBoxLayout(self.translate_tab)
+        config_group = QGroupBox("翻译服务配置")
+        config_layout = QFormLayout(config_group)
+        # 翻译服务选择
+        self.translate_provider_combo = QComboBox()
+        self.translate_provider_combo.addItem("Bing翻译（在线）", "bing")
+        self.translate_provider_combo.addItem("本地模型（离线）", "local")
+        self.translate_provider_combo.addItem("智谱AI语言模型（批量）", "zhipu")
+        index = self.translate_provider_combo.findData(current_config.get('provider', 'bing'))
+        if index >= 0:
+            self.translate_provider_combo.setCurrentIndex(index)
+        config_layout.addRow(QLabel("翻译服务："), self.translate_provider_combo)
+        # 本地模型选择
+        self.translate_local_model_combo = QComboBox()
+        self.translate_local_model_combo.setEditable(True)
+        self.translate_local_model_combo.addItems(config.LOCAL_TRANSLATE_MODELS)
+        self.translate_local_model_combo.setCurrentText(current_config.get('local_model', 'Helsinki-NLP/opus-mt-en-zh'))
+        config_layout.addRow(QLabel("本地模型："), self.translate_local_model_combo)
+        # 批大小
+        self.translate_batch_size = QSpinBox()
+        self.translate_batch_size.setRange(1, 256)
+        self.translate_batch_size.setValue(current_config.get('batch_size', 16))
+        config_layout.addRow(QLabel("本地批大小："), self.translate_batch_size)
+        # 智谱语言模型每次请求的条数
+        self.translate_llm_batch_size = QSpinBox()
+        self.translate_llm_batch_size.setRange(1, 100)
+        self.translate_llm_batch_size.setValue(current_config.get('llm_batch_size', 20))
+        config_layout.addRow(QLabel("智谱每次请求条数："), self.translate_llm_batch_size)
+        # 智谱语言模型并发数
+        self.translate_llm_concurrency = QSpinBox()
+        self.translate_llm_concurrency.setRange(1, 32)
+        self.translate_llm_concurrency.setValue(current_config.get('llm_concurrency', 4))
+        config_layout.addRow(QLabel("智谱并发请求数："), self.translate_llm_concurrency)
+        # 智谱语言模型速率限制
+        self.translate_llm_rpm = QSpinBox()
+        self.translate_llm_rpm.setRange(1, 10000)
+        self.translate_llm_rpm.setValue(current_config.get('llm_requests_per_minute', 60))
+        config_layout.addRow(QLabel("智谱每分钟请求数上限："), self.translate_llm_rpm)
+        translate_layout.addWidget(config_group)
+        # 添加提示说明
+        note_label = QLabel("注意: 本地模型首次使用时会下载到models目录；无网络环境请预先将模型文件放入models目录下同名文件夹。智谱AI语言模型使用\"智谱AI配置\"中的API密钥和语言模型配置。")
+        note_label.setWordWrap(True)
+        translate_layout.addWidget(note_label)
+        translate_layout.addStretch(1)
+
     def get_gemini_config(self):
         """获取Gemini配置"""
         return {
@@ -330,6 +383,18 @@ class ModelConfigDialog(QDialog):
             'top_p': self.florence2_top_p.value(),
         }
     
+    def get_translate_config(self):
+        """获取翻译服务配置"""
+        return {
+            'provider': self.translate_provider_combo.currentData(),
+            'local_model': self.translate_local_model_combo.currentText().strip(),
+            'batch_size': self.translate_batch_size.value(),
+            'max_length': self.translate_config.get('max_length', 512),
+            'llm_batch_size': self.translate_llm_batch_size.value(),
+            'llm_concurrency': self.translate_llm_concurrency.value(),
+            'llm_requests_per_minute': self.translate_llm_rpm.value(),
+        }
+    
     def save_config(self):
         """保存所有配置"""
         # 保存Gemini配置
@@ -347,5 +412,9 @@ class ModelConfigDialog(QDialog):
         florence2_config = self.get_florence2_config()
         config.save_florence2_config(florence2_config)
         
+        # 保存翻译配置
+        translate_config = self.get_translate_config()
+        config.save_translate_config(translate_config)
+        
         QMessageBox.information(self, "成功", "配置已保存")
         self.close()
\ No newline at end of file
@@ -0,0 +1,130 @@
+import os
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QTabWidget, QWidget, QLabel, QLineEdit, QPushButton,
+    QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
+)
+from PyQt6.QtCore import Qt, pyqtSignal
+
+# 标签频率表最多显示的标签数量
+MAX_TAG_ROWS = 2000
+
+class TagStatsDialog(QDialog):
+    """数据集标签统计：标签频率、触发词推荐和异常打标"""
+
+    # 请求按关键词筛选主表格
+    filter_requested = pyqtSignal(str)
+    # 请求在主表格中定位某一行（数据行号）
+    row_requested = pyqtSignal(int)
+    # 请求使用推荐的触发词
+    trigger_word_requested = pyqtSignal(str)
+
+    def __init__(self, tag_stats, store, trigger_word="", parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("标签统计")
+        self.setWindowFlag(Qt.WindowType.WindowContextHelpButtonHint, False)
+        self.resize(700, 600)
+        self.tag_stats = tag_stats
+        self.store = store
+        self.trigger_word = trigger_word
+
+        layout = QVBoxLayout(self)
+
+        # 触发词推荐
+        suggest_layout = QHBoxLayout()
+        self.suggest_label = QLabel()
+        suggest_layout.addWidget(self.suggest_label, 1)
+        self.use_suggest_btn = QPushButton("使用推荐触发词")
+        self.use_suggest_btn.clicked.connect(lambda: self.trigger_word_requested.emit(self.suggested))
+        suggest_layout.addWidget(self.use_suggest_btn)
+        refresh_btn = QPushButton("刷新")
+        refresh_btn.clicked.connect(self.refresh)
+        suggest_layout.addWidget(refresh_btn)
+        layout.addLayout(suggest_layout)
+
+        self.tabs = QTabWidget()
+        layout.addWidget(self.tabs)
+
+        # 标签频率
+        freq_tab = QWidget()
+        freq_layout = QVBoxLayout(freq_tab)
+        self.tag_filter_input = QLineEdit()
+        self.tag_filter_input.setPlaceholderText("输入关键词过滤标签，双击标签在表格中筛选包含该标签的图像")
+        self.tag_filter_input.textChanged.connect(self.update_tag_table)
+        freq_layout.addWidget(self.tag_filter_input)
+        self.tag_table = self.create_table(["标签", "打标数", "占比"])
+        self.tag_table.cellDoubleClicked.connect(self.on_tag_double_clicked)
+        freq_layout.addWidget(self.tag_table)
+        self.tabs.addTab(freq_tab, "标签频率")
+
+        # 异常打标
+        outlier_tab = QWidget()
+        outlier_layout = QVBoxLayout(outlier_tab)
+        outlier_layout.addWidget(QLabel("为空、缺少触发词、触发词不在开头或包含只出现一次的标签的打标，双击在表格中定位"))
+        self.outlier_table = self.create_table(["图像", "原因"])
+        self.outlier_table.cellDoubleClicked.connect(self.on_outlier_double_clicked)
+        outlier_layout.addWidget(self.outlier_table)
+        self.tabs.addTab(outlier_tab, "异常打标")
+
+        self.refresh()
+
+    def create_table(self, headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        for column in range(1, len(headers)):
+            table.horizontalHeader().setSectionResizeMode(column, QHeaderView.ResizeMode.ResizeToContents)
+        table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        table.verticalHeader().setVisible(False)
+        return table
+
+    def set_trigger_word(self, trigger_word):
+        self.trigger_word = trigger_word
+        self.refresh()
+
+    def refresh(self):
+        """重新读取统计结果（统计本身由表格模型增量维护）"""
+        stats = self.tag_stats
+        self.suggested = stats.suggest_trigger_word()
+        if self.suggested:
+            self.suggest_label.setText(
+                f"推荐触发词: {self.suggested}（{stats.first_counts[self.suggested]} / {stats.caption_count} 条打标以其开头）"
+            )
+        else:
+            self.suggest_label.setText(f"没有可推荐的触发词（共 {stats.caption_count} 条非空打标）")
+        self.use_suggest_btn.setEnabled(bool(self.suggested))
+        self.update_tag_table()
+        self.update_outlier_table()
+
+    def update_tag_table(self):
+        keyword = self.tag_filter_input.text().strip().lower()
+        total = max(self.tag_stats.caption_count, 1)
+        rows = [
+            (tag, count) for tag, count in self.tag_stats.most_common()
+            if not keyword or keyword in tag.lower()
+        ][:MAX_TAG_ROWS]
+        self.tag_table.setRowCount(len(rows))
+        for i, (tag, count) in enumerate(rows):
+            self.tag_table.setItem(i, 0, QTableWidgetItem(tag))
+            self.tag_table.setItem(i, 1, QTableWidgetItem(str(count)))
+            self.tag_table.setItem(i, 2, QTableWidgetItem(f"{count / total:.1%}"))
+
+    def update_outlier_table(self):
+        rare_tags = self.tag_stats.rare_tags()
+        outliers = []
+        for row, text in enumerate(self.store.en_labels):
+            reasons = self.tag_stats.outlier_reasons(text, self.trigger_word, rare_tags)
+            if reasons:
+                outliers.append((row, "; ".join(reasons)))
+        self.outlier_rows = [row for row, _ in outliers]
+        self.outlier_table.setRowCount(len(outliers))
+        for i, (row, reason) in enumerate(outliers):
+            self.outlier_table.setItem(i, 0, QTableWidgetItem(os.path.basename(self.store.paths[row])))
+            self.outlier_table.setItem(i, 1, QTableWidgetItem(reason))
+        self.tabs.setTabText(1, f"异常打标 ({len(outliers)})")
+
+    def on_tag_double_clicked(self, table_row, column):
+        self.filter_requested.emit(self.tag_table.item(table_row, 0).text())
+
+    def on_outlier_double_clicked(self, table_row, column):
+        self.row_requested.emit(self.outlier_rows[table_row])